@@ -0,0 +1,32 @@
+'''
+Сравнение бэкендов инференса (inference-backend): время запуска (загрузка, экспорт, прогрев)
+и установившаяся скорость инференса и обработки. Первый запуск onnx/openvino включает экспорт,
+повторный берет модель из кэша (model-cache-dir).
+
+Запуск из корня репозитория (аргументы те же, что у main.py):
+python -m benchmarks.backend_benchmark --backends torch onnx openvino --frames 1000 --video-path ... \
+    --model-path ... --output-path ... --report-path ... --sector_path ...
+'''
+import argparse
+import logging
+
+from traffic_observer.backends import BACKENDS
+from benchmarks.common import compare_variants
+
+
+def inference_speed(sector_manager) -> str:
+    detector = sector_manager.detector
+    return f"запуск {detector.startup_time:.2f} с, инференс {detector.inference_fps():.2f} FPS"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", type=str, nargs="+", default=list(BACKENDS), help="Проверяемые бэкенды")
+    parser.add_argument("--frames", type=int, default=1000, help="Кол-во кадров для замера")
+    args, rest = parser.parse_known_args()
+
+    compare_variants(
+        rest, args.frames, {backend: {"inference_backend": backend} for backend in args.backends}, describe=inference_speed
+    )
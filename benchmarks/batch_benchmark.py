@@ -0,0 +1,30 @@
+'''
+Пакетная детекция (batch-size): пропускная способность и задержка кадра для разных размеров пакета.
+Задержка - время от декодирования кадра до окончания его учета (стадия "latency" профилировщика),
+кадр ждет, пока наберется весь пакет. Итоги по секторам сравниваются с пакетом из одного кадра.
+
+Запуск из корня репозитория (аргументы те же, что у main.py):
+python -m benchmarks.batch_benchmark --batch-sizes 1 2 4 8 --frames 1000 --video-path ... --model-path ... \
+    --output-path ... --report-path ... --sector_path ...
+'''
+import argparse
+import logging
+
+from benchmarks.common import compare_variants
+
+
+def latency(sector_manager) -> str:
+    stage = sector_manager.profiler.summary()["stages"]["latency"]
+    return f"задержка p50 {stage['p50_ms']:.1f} мс, p95 {stage['p95_ms']:.1f} мс, max {stage['max_ms']:.1f} мс"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8], help="Проверяемые размеры пакета")
+    parser.add_argument("--frames", type=int, default=1000, help="Кол-во кадров для замера")
+    args, rest = parser.parse_known_args()
+
+    batch_sizes = sorted(set([1] + args.batch_sizes))
+    compare_variants(rest, args.frames, {f"пакет {size}": {"batch_size": size} for size in batch_sizes}, describe=latency)
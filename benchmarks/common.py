@@ -0,0 +1,233 @@
+import json
+import time
+
+import numpy as np
+
+from data_loader.data_sector import DataSector
+
+VEHICLE_CLASSES = ["bus", "car", "motobike", "road_train", "truck"]
+VEHICLE_SIZE_COEFFS = {"car": 1, "motorbike": 0.5, "truck": 1.8, "road_train": 2.7, "bus": 2.2}
+
+
+class LimitedCapture:
+    # Ограничивает число кадров, отдаваемых VideoCapture
+    def __init__(self, cap, max_frames: int):
+        self.cap = cap
+        self.remaining = max_frames
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        if self.remaining <= 0:
+            return False, None
+        self.remaining -= 1
+        return self.cap.read()
+
+    @property
+    def frame_timestamp(self):
+        # Метка времени захвата у живого потока (LiveCapture)
+        return getattr(self.cap, "frame_timestamp", None)
+
+
+def sector_summary(sector_manager) -> list[dict]:
+    # Итоги по каждому сектору за все закрытые периоды
+    summaries = []
+    for sector in sector_manager.sectors:
+        classwise = {class_name: 0 for class_name in sector_manager.vehicle_classes}
+        travel_times = []
+        for period in sector.periods_data:
+            for class_name, count in period.classwise_traveled_count.items():
+                classwise[class_name] += count
+            travel_times.extend(period.ids_travel_time.values())
+
+        summaries.append({
+            "classwise_traveled_count": classwise,
+            "traveled_count": sum(classwise.values()),
+            "mean_travel_time": sum(travel_times) / len(travel_times) if travel_times else float("nan"),
+        })
+    return summaries
+
+
+def print_summary_diff(base: list[dict], other: list[dict], label: str):
+    # Отклонение итогов other от эталонного прогона base
+    for i, (b, o) in enumerate(zip(base, other)):
+        count_diff = o["traveled_count"] - b["traveled_count"]
+        time_diff = o["mean_travel_time"] - b["mean_travel_time"]
+        print(f"[{label}] Сектор #{i + 1}: проехало {o['traveled_count']} ({count_diff:+d}), "
+              f"ср. время проезда {o['mean_travel_time']:.2f} с ({time_diff:+.2f} с)")
+        for class_name, count in o["classwise_traveled_count"].items():
+            base_count = b["classwise_traveled_count"][class_name]
+            if count or base_count:
+                print(f"    {class_name}: {count} ({count - base_count:+d})")
+
+
+class SyntheticDetector:
+    '''
+    Замена Detector без модели: машины появляются у левого края кадра в случайной
+    горизонтальной полосе и едут вправо с постоянной скоростью. id треков растут монотонно.
+    '''
+
+    def __init__(self, frame_size: tuple[int, int], bands: int, vehicles_per_second: float, fps: float, seed: int = 0):
+        self.class_names = dict(enumerate(VEHICLE_CLASSES))
+        self.width, self.height = frame_size
+        self.bands = bands
+        self.spawn_rate = vehicles_per_second / fps
+        self.rng = np.random.default_rng(seed)
+        self.next_id = 1
+
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.size = np.empty(0)
+        self.speed = np.empty(0)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.classes = np.empty(0, dtype=np.int64)
+
+    def track(self, frame):
+        self.x = self.x + self.speed
+        keep = self.x - self.size / 2 < self.width
+        self.x, self.y, self.size, self.speed = self.x[keep], self.y[keep], self.size[keep], self.speed[keep]
+        self.ids, self.classes = self.ids[keep], self.classes[keep]
+
+        spawned = self.rng.poisson(self.spawn_rate)
+        if spawned:
+            band_height = self.height / self.bands
+            bands = self.rng.integers(0, self.bands, spawned)
+            self.x = np.concatenate([self.x, np.zeros(spawned)])
+            self.y = np.concatenate([self.y, (bands + self.rng.uniform(0.2, 0.8, spawned)) * band_height])
+            self.size = np.concatenate([self.size, self.rng.uniform(0.03, 0.08, spawned) * self.width])
+            self.speed = np.concatenate([self.speed, self.rng.uniform(0.002, 0.01, spawned) * self.width])
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + spawned)])
+            self.classes = np.concatenate([self.classes, self.rng.integers(0, len(VEHICLE_CLASSES), spawned)])
+            self.next_id += spawned
+
+        if len(self.ids) == 0:
+            return None
+        half = self.size / 2
+        boxes = np.stack([self.x - half, self.y - half, self.x + half, self.y + half], axis=1).astype(np.float32)
+        return boxes, self.ids.tolist(), self.classes.tolist()
+
+    def track_batch(self, frames):
+        return [self.track(frame) for frame in frames]
+
+
+def synthetic_sectors(frame_size: tuple[int, int], sectors_count: int, lanes_per_sector: int) -> list[DataSector]:
+    # Сектора - горизонтальные полосы кадра: старт слева, полосы движения справа
+    width, height = frame_size
+    band_height = height // sectors_count
+
+    def rect(x0, y0, x1, y1):
+        return [[int(x0), int(y0)], [int(x1), int(y0)], [int(x1), int(y1)], [int(x0), int(y1)]]
+
+    sectors = []
+    for i in range(sectors_count):
+        y0, y1 = i * band_height, (i + 1) * band_height - 1
+        lane_height = band_height / lanes_per_sector
+        lanes = [rect(0.75 * width, y0 + j * lane_height, 0.9 * width, y0 + (j + 1) * lane_height - 1)
+                 for j in range(lanes_per_sector)]
+        sectors.append(DataSector(
+            i + 1,
+            rect(0.1 * width, y0, 0.25 * width, y1),
+            rect(0.75 * width, y0, 0.9 * width, y1),
+            lanes,
+            lanes_per_sector,
+            0.1,
+            60
+        ))
+    return sectors
+
+
+class ReplayDetector:
+    # Замена Detector: отдает заранее записанные детекции кадр за кадром
+    def __init__(self, detections: list, class_names: dict[int, str]):
+        self.detections = detections
+        self.class_names = class_names
+        self.frame_index = 0
+
+    def track(self, frame):
+        result = self.detections[self.frame_index % len(self.detections)]
+        self.frame_index += 1
+        return result
+
+    def track_batch(self, frames):
+        return [self.track(frame) for frame in frames]
+
+
+def record_detections(detector, frames: int) -> list:
+    # Детекции detector на frames кадрах, чтобы генерация не входила в замер
+    return [detector.track(None) for _ in range(frames)]
+
+
+def load_scripted_tracks(path: str) -> list:
+    '''
+    Детекции из JSON: {"frames": [[{"id": 1, "cls": 1, "box": [x1, y1, x2, y2]}, ...], ...]}
+    '''
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+
+    detections = []
+    for frame in data["frames"]:
+        if not frame:
+            detections.append(None)
+            continue
+        boxes = np.array([track["box"] for track in frame], dtype=np.float32)
+        detections.append((boxes, [track["id"] for track in frame], [track["cls"] for track in frame]))
+    return detections
+
+
+def run_headless(argv, max_frames: int, overrides: dict|None = None, prepare=None):
+    '''
+    Прогон видео с аргументами main.py без отрисовки; overrides - значения атрибутов Settings,
+    меняемые перед запуском, prepare(sector_manager) - доработка SectorManager перед обработкой.
+    Возвращает FPS, итоги по секторам (sector_summary) и сам SectorManager.
+    '''
+    from data_loader.data_constructor import DataConstructor
+    from traffic_observer.pipeline import run_serial
+
+    data_constructor = DataConstructor(argv)
+    settings = data_constructor.settings
+    settings.headless = True
+    for name, value in (overrides or {}).items():
+        setattr(settings, name, value)
+    cap, _ = data_constructor.get_video()
+    sector_manager = data_constructor.get_sector_manager()
+    if prepare is not None:
+        prepare(sector_manager)
+    frame_size = data_constructor.get_frame_size()
+
+    start = time.perf_counter()
+    frames = run_serial(
+        LimitedCapture(cap, max_frames), sector_manager, None, frame_size, show=False, batch_size=settings.batch_size
+    )
+    elapsed = time.perf_counter() - start
+    sector_manager.new_period()
+    cap.release()
+
+    return frames / elapsed, sector_summary(sector_manager), sector_manager
+
+
+def compare_variants(argv, max_frames: int, variants: dict[str, dict], describe=None, prepare=None) -> dict:
+    '''
+    Прогон run_headless для каждого варианта настроек {подпись: overrides}; первый вариант - эталон.
+    Печатается FPS (и отношение к эталону), describe(sector_manager) - дополнительные показатели варианта,
+    и отклонение итогов по секторам от эталона. Возвращает {подпись: (fps, summary, sector_manager)}.
+    '''
+    results = {}
+    base_fps, base_summary = None, None
+    for label, overrides in variants.items():
+        fps, summary, sector_manager = run_headless(argv, max_frames, overrides, prepare)
+        results[label] = fps, summary, sector_manager
+        details = f", {describe(sector_manager)}" if describe is not None else ""
+        if base_fps is None:
+            base_fps, base_summary = fps, summary
+            print(f"{label}: {fps:.2f} FPS{details}")
+        else:
+            print(f"{label}: {fps:.2f} FPS (x{fps / base_fps:.2f}){details}")
+            print_summary_diff(base_summary, summary, label)
+    return results
+
+
+def stage_p50(sector_manager, name: str) -> float:
+    # Медиана стадии профилировщика в мс; 0 - стадия не замерялась
+    stages = sector_manager.profiler.summary()["stages"]
+    return stages[name]["p50_ms"] if name in stages else 0.0
@@ -0,0 +1,130 @@
+'''
+Декодер в отдельном процессе с кольцевым буфером в общей памяти (decoder-process) против
+последовательного цикла main.py (pipelined = false).
+
+1. Только передача кадров, без модели: декодирование в том же процессе, через FrameRing
+   и через multiprocessing.Queue (кадр сериализуется pickle).
+2. Сквозная обработка: FPS и совпадение итоговых количеств и времени проезда с последовательным циклом.
+
+Запуск из корня репозитория (аргументы те же, что у main.py):
+python -m benchmarks.decoder_process_benchmark --frames 3000 --video-path ... --model-path ... \
+    --output-path ... --report-path ... --sector_path ...
+'''
+import argparse
+import logging
+import multiprocessing
+import time
+
+import cv2
+
+from benchmarks.common import run_headless, sector_summary, print_summary_diff
+from data_loader.frame_ring import FrameRing, decode_to_ring
+from data_loader.video_loader import CaptureSource
+
+
+def read_frames(source: CaptureSource, frame_size: tuple[int, int], max_frames: int):
+    cap, _ = source.open()
+    frames = 0
+    while frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame.shape[1::-1] != frame_size:
+            frame = cv2.resize(frame, frame_size)
+        frames += 1
+        yield frame
+    cap.release()
+
+
+def decode_to_queue(frames_queue, source: CaptureSource, frame_size: tuple[int, int], max_frames: int):
+    for frame in read_frames(source, frame_size, max_frames):
+        frames_queue.put(frame)
+    frames_queue.put(None)
+
+
+def transport_in_process(source: CaptureSource, frame_size: tuple[int, int], max_frames: int) -> float:
+    start = time.perf_counter()
+    frames = sum(1 for _ in read_frames(source, frame_size, max_frames))
+    return frames / (time.perf_counter() - start)
+
+
+def transport_ring(source: CaptureSource, frame_size: tuple[int, int], max_frames: int, slots: int) -> float:
+    width, height = frame_size
+    context = multiprocessing.get_context("spawn")
+    ring = FrameRing(slots, (height, width, 3), context)
+    decoder = context.Process(target=decode_to_ring, args=(ring, source, 0, max_frames), daemon=True)
+    start = time.perf_counter()
+    decoder.start()
+    frames = 0
+    while ring.get(decoder) is not None:
+        ring.release()
+        frames += 1
+    elapsed = time.perf_counter() - start
+    ring.close()
+    decoder.join()
+    return frames / elapsed
+
+
+def transport_queue(source: CaptureSource, frame_size: tuple[int, int], max_frames: int, slots: int) -> float:
+    context = multiprocessing.get_context("spawn")
+    frames_queue = context.Queue(maxsize=slots)
+    decoder = context.Process(target=decode_to_queue, args=(frames_queue, source, frame_size, max_frames), daemon=True)
+    start = time.perf_counter()
+    decoder.start()
+    frames = 0
+    while frames_queue.get() is not None:
+        frames += 1
+    elapsed = time.perf_counter() - start
+    decoder.join()
+    return frames / elapsed
+
+
+def run_decoder_process(argv, max_frames: int):
+    from data_loader.data_constructor import DataConstructor
+    from traffic_observer.pipeline import SharedMemoryPipeline
+
+    data_constructor = DataConstructor(argv)
+    settings = data_constructor.settings
+    settings.headless = True
+    sector_manager = data_constructor.get_sector_manager()
+
+    start = time.perf_counter()
+    frames = SharedMemoryPipeline(
+        data_constructor.get_capture_source(),
+        sector_manager,
+        None,
+        data_constructor.get_decoded_frame_size(),
+        slots=settings.queue_size,
+        show=False,
+        batch_size=settings.batch_size,
+        max_frames=max_frames
+    ).run()
+    elapsed = time.perf_counter() - start
+    sector_manager.new_period()
+    return frames / elapsed, sector_summary(sector_manager)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=3000, help="Кол-во кадров для замера")
+    parser.add_argument("--slots", type=int, default=8, help="Кол-во слотов буфера (и размер очереди) для замера передачи")
+    args, rest = parser.parse_known_args()
+
+    from data_loader.data_constructor import DataConstructor
+    data_constructor = DataConstructor(rest)
+    source = data_constructor.get_capture_source()
+    frame_size = data_constructor.get_decoded_frame_size()
+
+    in_process = transport_in_process(source, frame_size, args.frames)
+    ring_fps = transport_ring(source, frame_size, args.frames, args.slots)
+    queue_fps = transport_queue(source, frame_size, args.frames, args.slots)
+    print(f"Передача кадров {frame_size[0]}x{frame_size[1]} без модели: в процессе {in_process:.1f} FPS, "
+          f"общая память {ring_fps:.1f} FPS, multiprocessing.Queue {queue_fps:.1f} FPS")
+
+    serial_fps, serial_summary, _ = run_headless(rest, args.frames)
+    shared_fps, shared_summary = run_decoder_process(rest, args.frames)
+    print(f"Последовательный цикл: {serial_fps:.2f} FPS")
+    print(f"Процесс декодера:      {shared_fps:.2f} FPS (x{shared_fps / serial_fps:.2f})")
+    print_summary_diff(serial_summary, shared_summary, "decoder-process")
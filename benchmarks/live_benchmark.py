@@ -0,0 +1,89 @@
+'''
+Живой поток: локальный ffmpeg раздает видеофайл по HTTP в реальном времени (-re), обработка читает поток
+через LiveCapture. Выводятся FPS обработки, доля пропущенных кадров, задержка кадра и расхождение таймера
+секторов (по меткам времени захвата) с реальным временем прогона.
+--delay-ms добавляет задержку к каждому инференсу, чтобы проверить поведение при обработке медленнее потока.
+
+Запуск из корня репозитория (нужен ffmpeg в PATH; остальные аргументы те же, что у main.py, кроме --video-path):
+python -m benchmarks.live_benchmark --source video/test_720p.mp4 --seconds 60 --delay-ms 50 --model-path ... \
+    --output-path ... --report-path ... --sector_path ...
+'''
+import argparse
+import logging
+import subprocess
+import time
+
+from benchmarks.common import LimitedCapture
+
+
+class StreamDuration(LimitedCapture):
+    # Остановка по времени потока вместо кол-ва кадров
+    def __init__(self, cap, seconds: float):
+        super().__init__(cap, max_frames=1 << 62)
+        self.seconds = seconds
+
+    def isOpened(self):
+        return super().isOpened() and (self.frame_timestamp or 0) < self.seconds
+
+
+def serve_stream(source: str, port: int) -> tuple[subprocess.Popen, str]:
+    url = f"http://127.0.0.1:{port}/live.ts"
+    command = [
+        "ffmpeg", "-v", "error", "-re", "-stream_loop", "-1", "-i", source, "-an",
+        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
+        "-f", "mpegts", "-listen", "1", url
+    ]
+    return subprocess.Popen(command), url
+
+
+def run_live(argv, seconds: float, delay_ms: float):
+    from data_loader.data_constructor import DataConstructor
+    from traffic_observer.pipeline import run_serial
+
+    data_constructor = DataConstructor(argv)
+    settings = data_constructor.settings
+    settings.headless = True
+    cap, _ = data_constructor.get_video()
+    sector_manager = data_constructor.get_sector_manager()
+    frame_size = (settings.target_width, settings.target_height)
+
+    if delay_ms > 0:
+        track = sector_manager.detector.track
+
+        def slow_track(frame):
+            time.sleep(delay_ms / 1000)
+            return track(frame)
+        sector_manager.detector.track = slow_track
+
+    start = time.perf_counter()
+    frames = run_serial(StreamDuration(cap, seconds), sector_manager, None, frame_size, show=False)
+    elapsed = time.perf_counter() - start
+    sector_manager.new_period()
+    cap.release()
+
+    latency = sector_manager.profiler.summary()["stages"]["latency"]
+    print(f"Обработано {frames} кадров за {elapsed:.1f} с: {frames / elapsed:.2f} FPS")
+    print(f"Получено {cap.frames_grabbed} кадров, пропущено {cap.frames_dropped} ({cap.dropped_share() * 100:.1f}%)")
+    print(f"Задержка кадра: p50 {latency['p50_ms']:.1f} мс, p95 {latency['p95_ms']:.1f} мс, max {latency['max_ms']:.1f} мс")
+    print(f"Время по таймеру секторов {sector_manager.period_timer.unresettable_time:.1f} с, "
+          f"по меткам захвата {cap.frame_timestamp:.1f} с")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", required=True, help="Видеофайл, раздаваемый как живой поток")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--seconds", type=float, default=60, help="Длительность прогона по времени потока")
+    parser.add_argument("--delay-ms", type=float, default=0, help="Дополнительная задержка каждого инференса")
+    parser.add_argument("--startup-delay", type=float, default=2, help="Ожидание запуска сервера ffmpeg")
+    args, rest = parser.parse_known_args()
+
+    server, url = serve_stream(args.source, args.port)
+    try:
+        time.sleep(args.startup_delay)
+        run_live(rest + ["--video-path", url], args.seconds, args.delay_ms)
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,34 @@
+'''
+Пропуск инференса без движения в секторах (motion-gate): доля пропущенных инференсов, FPS
+и изменение итоговых количеств и времени проезда относительно прогона без проверки движения.
+
+Запуск из корня репозитория (аргументы те же, что у main.py):
+python -m benchmarks.motion_gate_benchmark --frames 5000 --video-path ... --model-path ... \
+    --output-path ... --report-path ... --sector_path ...
+'''
+import argparse
+import logging
+
+from benchmarks.common import compare_variants
+
+
+def skipped(sector_manager) -> str:
+    gate = sector_manager.detector.motion_gate
+    return f"пропущено {(gate.skipped_share() if gate is not None else 0.0) * 100:.1f}% инференсов"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=5000, help="Кол-во кадров для замера")
+    parser.add_argument("--thresholds", type=int, nargs="+", default=[25], help="Проверяемые пороги яркости")
+    parser.add_argument("--max-skip", type=int, default=25, help="Максимум подряд пропущенных инференсов")
+    args, rest = parser.parse_known_args()
+
+    variants = {"без проверки движения": {"motion_gate": False}}
+    for threshold in args.thresholds:
+        variants[f"порог {threshold}"] = {
+            "motion_gate": True, "motion_gate_threshold": threshold, "motion_gate_max_skip": args.max_skip
+        }
+    compare_variants(rest, args.frames, variants, describe=skipped)
@@ -0,0 +1,50 @@
+'''
+Сравнение последовательного цикла main.py и конвейерной обработки.
+
+Запуск из корня репозитория (аргументы те же, что у main.py):
+python -m benchmarks.pipeline_benchmark --frames 500 --video-path ... --model-path ... \
+    --output-path ... --report-path ... --sector_path ...
+'''
+import argparse
+import logging
+import time
+
+from data_loader.data_constructor import DataConstructor
+from traffic_observer.pipeline import FramePipeline, run_serial
+from benchmarks.common import LimitedCapture
+
+
+def run_mode(argv, max_frames: int, pipelined: bool) -> float:
+    data_constructor = DataConstructor(argv)
+    cap, output = data_constructor.get_video()
+    sector_manager = data_constructor.get_sector_manager()
+    settings = data_constructor.settings
+    frame_size = (settings.target_width, settings.target_height)
+    cap = LimitedCapture(cap, max_frames)
+
+    start = time.perf_counter()
+    if pipelined:
+        frames = FramePipeline(cap, sector_manager, output, frame_size, settings.queue_size, show=False).run()
+    else:
+        frames = run_serial(cap, sector_manager, output, frame_size, show=False)
+    elapsed = time.perf_counter() - start
+
+    cap.cap.release()
+    if output is not None:
+        output.release()
+    return frames / elapsed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300, help="Кол-во кадров для замера")
+    args, rest = parser.parse_known_args()
+
+    serial_fps = run_mode(rest, args.frames, pipelined=False)
+    pipelined_fps = run_mode(rest, args.frames, pipelined=True)
+
+    print(f"Последовательно: {serial_fps:.2f} FPS")
+    print(f"Конвейер:        {pipelined_fps:.2f} FPS")
+    print(f"Ускорение:       x{pipelined_fps / serial_fps:.2f}")
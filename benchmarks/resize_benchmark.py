@@ -0,0 +1,30 @@
+'''
+Одно масштабирование кадра сразу во вход модели (single-resize) против масштабирования
+до target-width x target-height и letterbox в ultralytics: FPS, время стадий resize и track (p50)
+и отличие итоговых количеств и времени проезда.
+
+Запуск из корня репозитория (аргументы те же, что у main.py):
+python -m benchmarks.resize_benchmark --frames 3000 --video-path ... --model-path ... \
+    --output-path ... --report-path ... --sector_path ...
+'''
+import argparse
+import logging
+
+from benchmarks.common import compare_variants, stage_p50
+
+
+def stage_times(sector_manager) -> str:
+    return f"resize p50 {stage_p50(sector_manager, 'resize'):.2f} мс, track p50 {stage_p50(sector_manager, 'track'):.2f} мс"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=3000, help="Кол-во кадров для замера")
+    args, rest = parser.parse_known_args()
+
+    compare_variants(rest, args.frames, {
+        "Два масштабирования": {"single_resize": False},
+        "Одно масштабирование": {"single_resize": True},
+    }, describe=stage_times)
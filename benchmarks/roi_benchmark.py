@@ -0,0 +1,22 @@
+'''
+Инференс в области секторов (roi-inference) против инференса по всему кадру:
+скорость и отличие итоговых количеств и времени проезда.
+
+Запуск из корня репозитория (аргументы те же, что у main.py):
+python -m benchmarks.roi_benchmark --frames 3000 --video-path ... --model-path ... \
+    --output-path ... --report-path ... --sector_path ...
+'''
+import argparse
+import logging
+
+from benchmarks.common import compare_variants
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=3000, help="Кол-во кадров для замера")
+    args, rest = parser.parse_known_args()
+
+    compare_variants(rest, args.frames, {"весь кадр": {"roi_inference": False}, "область": {"roi_inference": True}})
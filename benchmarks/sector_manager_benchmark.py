@@ -0,0 +1,177 @@
+'''
+Замер горячих путей SectorManager без модели и GPU.
+Детекции генерируются (SyntheticDetector) или берутся из JSON-сценария,
+записываются заранее и воспроизводятся, поэтому в замер попадает только SectorManager.
+
+Стадии:
+    geometry     - центры боксов и принадлежность зонам через пространственный индекс (ZoneIndex)
+    geometry_full - то же полным перебором зон (classify_centers), для сравнения
+    bookkeeping  - update без отрисовки за вычетом geometry
+    annotation   - update с отрисовкой за вычетом update без отрисовки
+    traffic_stats - traffic_stats и classwise_stats по всем закрытым периодам
+
+python -m benchmarks.sector_manager_benchmark --sectors 8 --lanes 3 --vehicles-per-second 4 \
+    --frames 5000 --output bench.json
+'''
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+from traffic_observer.sector_manager import SectorManager
+from traffic_observer.zone import box_centers, classify_centers
+from benchmarks.common import (
+    SyntheticDetector, ReplayDetector, synthetic_sectors, record_detections, load_scripted_tracks,
+    VEHICLE_CLASSES, VEHICLE_SIZE_COEFFS
+)
+
+
+def latency_stats(samples: list[float]) -> dict:
+    samples = np.asarray(samples)
+    return {
+        "frames": len(samples),
+        "mean_ms": float(samples.mean() * 1000),
+        "p50_ms": float(np.percentile(samples, 50) * 1000),
+        "p95_ms": float(np.percentile(samples, 95) * 1000),
+        "max_ms": float(samples.max() * 1000),
+        "fps": float(len(samples) / samples.sum()) if samples.sum() > 0 else float("inf"),
+    }
+
+
+def git_revision() -> str|None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_sector_manager(args, detections, render: bool) -> SectorManager:
+    frame_size = (args.width, args.height)
+    return SectorManager(
+        synthetic_sectors(frame_size, args.sectors, args.lanes),
+        VEHICLE_CLASSES,
+        1 / args.fps,
+        args.observation_time,
+        VEHICLE_SIZE_COEFFS,
+        (args.height, args.width),
+        None,
+        render=render,
+        detector=ReplayDetector(detections, dict(enumerate(VEHICLE_CLASSES)))
+    )
+
+
+def time_geometry(sector_manager: SectorManager, detections) -> tuple[list[float], list[int]]:
+    samples, tests = [], []
+    for detection in detections:
+        boxes = detection[0] if detection is not None else np.empty((0, 4), dtype=np.float32)
+        start = time.perf_counter()
+        centers = box_centers(boxes)
+        sector_manager.start_index.classify(centers)
+        sector_manager.lane_index.classify(centers)
+        samples.append(time.perf_counter() - start)
+        tests.append(sector_manager.start_index.tests + sector_manager.lane_index.tests)
+    return samples, tests
+
+
+def time_geometry_full(sector_manager: SectorManager, detections) -> tuple[list[float], list[int]]:
+    samples, tests = [], []
+    zones_count = len(sector_manager.start_zones) + len(sector_manager.lane_zones)
+    for detection in detections:
+        boxes = detection[0] if detection is not None else np.empty((0, 4), dtype=np.float32)
+        start = time.perf_counter()
+        centers = box_centers(boxes)
+        classify_centers(sector_manager.start_zones, centers)
+        classify_centers(sector_manager.lane_zones, centers)
+        samples.append(time.perf_counter() - start)
+        tests.append(zones_count * len(centers))
+    return samples, tests
+
+
+def time_updates(sector_manager: SectorManager, frames: list[np.ndarray], count: int) -> list[float]:
+    samples = []
+    for i in range(count):
+        # Копия вне замера: отрисовка меняет кадр
+        frame = frames[i % len(frames)].copy()
+        start = time.perf_counter()
+        sector_manager.update(frame)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--sectors", type=int, default=4)
+    parser.add_argument("--lanes", type=int, default=2, help="Полос на сектор")
+    parser.add_argument("--vehicles-per-second", type=float, default=2)
+    parser.add_argument("--fps", type=float, default=25)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--observation-time", type=float, default=30, help="Длина периода, секунды")
+    parser.add_argument("--tracks", type=str, default=None, help="JSON-сценарий детекций вместо генерации")
+    parser.add_argument("--no-render", action="store_true", help="Не замерять отрисовку")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None, help="Путь для JSON с результатами")
+    args = parser.parse_args()
+
+    if args.tracks:
+        detections = load_scripted_tracks(args.tracks)
+        args.frames = len(detections)
+    else:
+        generator = SyntheticDetector((args.width, args.height), args.sectors, args.vehicles_per_second, args.fps, args.seed)
+        detections = record_detections(generator, args.frames)
+
+    rng = np.random.default_rng(args.seed)
+    frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(4)]
+
+    headless_manager = make_sector_manager(args, detections, render=False)
+    geometry, zone_tests = time_geometry(headless_manager, detections)
+    geometry_full, zone_tests_full = time_geometry_full(headless_manager, detections)
+    headless = time_updates(headless_manager, frames, args.frames)
+
+    stages = {
+        "geometry": latency_stats(geometry),
+        "geometry_full": latency_stats(geometry_full),
+        "bookkeeping": latency_stats(np.maximum(np.subtract(headless, geometry), 0)),
+        "update_headless": latency_stats(headless),
+    }
+
+    if not args.no_render:
+        render_manager = make_sector_manager(args, detections, render=True)
+        rendered = time_updates(render_manager, frames, args.frames)
+        stages["annotation"] = latency_stats(np.maximum(np.subtract(rendered, headless), 0))
+        stages["update_render"] = latency_stats(rendered)
+
+    headless_manager.new_period()
+    periods = len(headless_manager.sectors[0].periods_data)
+    start = time.perf_counter()
+    headless_manager.traffic_stats()
+    headless_manager.classwise_stats()
+    stats_elapsed = time.perf_counter() - start
+
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "detections_per_frame": float(np.mean([len(d[1]) if d is not None else 0 for d in detections])),
+        "stages": stages,
+        "zone_tests_per_frame": {"index": float(np.mean(zone_tests)), "full": float(np.mean(zone_tests_full))},
+        "traffic_stats": {"periods_per_sector": periods, "sectors": args.sectors, "total_ms": stats_elapsed * 1000},
+    }
+
+    for name, stage in stages.items():
+        print(f"{name:16s} mean {stage['mean_ms']:8.3f} мс | p50 {stage['p50_ms']:8.3f} | "
+              f"p95 {stage['p95_ms']:8.3f} | max {stage['max_ms']:8.3f} | {stage['fps']:10.1f} кадров/с")
+    print(f"Проверок точка-зона на кадр: {np.mean(zone_tests):.1f} с индексом, {np.mean(zone_tests_full):.1f} полным перебором")
+    print(f"traffic_stats    {stats_elapsed * 1000:.2f} мс на {periods} периодов x {args.sectors} секторов")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.output}")
@@ -0,0 +1,108 @@
+'''
+Длительный прогон SectorManager на синтетических треках без модели.
+Проверяет, что состояние треков секторов и память процесса не растут со временем.
+Периоды, как в режиме 24/7, пишутся потоковым отчетом (CSV во временный каталог) и не хранятся в памяти
+(keep_periods = false). Первый интервал вывода - прогрев; затем текущий RSS не должен вырасти больше,
+чем на --max-rss-growth МБ, иначе прогон завершается с кодом 1.
+
+python -m benchmarks.soak_benchmark --hours 24 --fps 25 --vehicles-per-second 2
+'''
+import argparse
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from data_manager.report_sink import PeriodReportSink
+from traffic_observer.sector_manager import SectorManager
+from benchmarks.common import SyntheticDetector, synthetic_sectors, VEHICLE_CLASSES, VEHICLE_SIZE_COEFFS
+
+FRAME_SIZE = (1280, 720)
+
+
+def track_state_size(sector_manager: SectorManager) -> int:
+    # Суммарное кол-во записей о треках во всех секторах
+    total = 0
+    for sector in sector_manager.sectors:
+        total += len(sector.start_region.counted_ids) + len(sector.ids_start_time) + len(sector.ids_blacklist)
+        total += sum(len(lane.counted_ids) for lane in sector.lanes)
+    return total
+
+
+def crossings_size(sector_manager: SectorManager) -> int:
+    # Записи журналов проездов, еще не закрытых в периоды
+    return sum(len(sector.crossings) for sector in sector_manager.sectors)
+
+
+def current_rss_mb() -> float:
+    # Текущий RSS процесса (Linux); иначе - максимальный за прогон
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=24, help="Моделируемое время, часы")
+    parser.add_argument("--fps", type=float, default=25)
+    parser.add_argument("--vehicles-per-second", type=float, default=2)
+    parser.add_argument("--sectors", type=int, default=4)
+    parser.add_argument("--lanes", type=int, default=2)
+    parser.add_argument("--track-ttl", type=float, default=30, help="TTL трека, секунды")
+    parser.add_argument("--report-every", type=float, default=1, help="Интервал вывода, часы")
+    parser.add_argument("--max-rss-growth", type=float, default=50, help="Допустимый рост RSS после прогрева, МБ")
+    args = parser.parse_args()
+
+    stream_dir = tempfile.TemporaryDirectory()
+    detector = SyntheticDetector(FRAME_SIZE, args.sectors, args.vehicles_per_second, args.fps)
+    sector_manager = SectorManager(
+        synthetic_sectors(FRAME_SIZE, args.sectors, args.lanes),
+        VEHICLE_CLASSES,
+        1 / args.fps,
+        30,
+        VEHICLE_SIZE_COEFFS,
+        FRAME_SIZE[::-1],
+        None,
+        render=False,
+        track_ttl=args.track_ttl,
+        detector=detector,
+        report_sink=PeriodReportSink(stream_dir.name, "csv"),
+        keep_periods=False
+    )
+
+    frame = np.zeros((1, 1, 3), dtype=np.uint8)
+    total_frames = int(args.hours * 3600 * args.fps)
+    report_frames = max(1, int(args.report_every * 3600 * args.fps))
+
+    print("часы | записей о треках | проездов в журнале | треков всего | RSS МБ | кадров/с")
+    warmup_rss = None
+    max_rss = 0.0
+    start = time.perf_counter()
+    for i in range(1, total_frames + 1):
+        sector_manager.update(frame)
+        if i % report_frames == 0:
+            elapsed = time.perf_counter() - start
+            rss = current_rss_mb()
+            if warmup_rss is None:
+                warmup_rss = rss
+            max_rss = max(max_rss, rss)
+            print(f"{i / args.fps / 3600:5.1f} | {track_state_size(sector_manager):16d} | "
+                  f"{crossings_size(sector_manager):18d} | {detector.next_id - 1:12d} | {rss:6.1f} | {i / elapsed:8.0f}")
+    sector_manager.new_period()
+    stream_dir.cleanup()
+
+    if warmup_rss is None:
+        print("Прогон короче интервала вывода: рост памяти не проверялся")
+        sys.exit(0)
+    growth = max_rss - warmup_rss
+    print(f"Рост RSS после прогрева: {growth:.1f} МБ (допустимо {args.max_rss_growth:.1f} МБ)")
+    if growth > args.max_rss_growth:
+        sys.exit(1)
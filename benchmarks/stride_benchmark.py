@@ -0,0 +1,24 @@
+'''
+Влияние шага инференса (inference-stride) на скорость и точность статистики.
+Каждый шаг прогоняется на одном и том же видео, результат сравнивается с шагом 1.
+
+Запуск из корня репозитория (аргументы те же, что у main.py):
+python -m benchmarks.stride_benchmark --strides 1 2 3 5 --frames 3000 --video-path ... --model-path ... \
+    --output-path ... --report-path ... --sector_path ...
+'''
+import argparse
+import logging
+
+from benchmarks.common import compare_variants
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 2, 3, 5], help="Проверяемые шаги инференса")
+    parser.add_argument("--frames", type=int, default=3000, help="Кол-во кадров для замера")
+    args, rest = parser.parse_known_args()
+
+    strides = [1] + [stride for stride in args.strides if stride != 1]
+    compare_variants(rest, args.frames, {f"шаг {stride}": {"inference_stride": stride} for stride in strides})
@@ -0,0 +1,122 @@
+'''
+Собственный трекер (tracker = "iou") против ByteTrack ultralytics.
+
+1. Сквозной прогон с каждым трекером: FPS и изменение итоговых количеств и времени проезда
+   относительно ultralytics.
+2. На детекциях, записанных во время прогона с tracker = "iou", оба трекера запускаются без модели:
+   время обновления трекера на кадр и согласованность треков относительно ByteTrack - доля его боксов,
+   найденных трекером iou (IoU >= 0.5), и переключения id (сколько лишних id iou приходится на один id ByteTrack).
+
+Запуск из корня репозитория (аргументы те же, что у main.py):
+python -m benchmarks.tracker_benchmark --frames 3000 --video-path ... --model-path ... \
+    --output-path ... --report-path ... --sector_path ...
+'''
+import argparse
+import logging
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from benchmarks.common import compare_variants
+from traffic_observer.iou_tracker import IouTracker, iou_matrix, greedy_match
+
+
+class RecordingTracker(IouTracker):
+    # Сохраняет входные детекции каждого кадра для прогона трекеров без модели
+    def __init__(self, tracker: IouTracker):
+        super().__init__(tracker.high_threshold, tracker.low_threshold, tracker.new_track_threshold,
+                         tracker.match_iou, tracker.max_lost, tracker.min_hits)
+        self.detections = []
+
+    def update(self, boxes, scores, classes):
+        self.detections.append((np.array(boxes), np.array(scores), np.array(classes)))
+        return super().update(boxes, scores, classes)
+
+
+def record_detections(sector_manager):
+    # Запись детекций для прогона трекеров без модели (только для tracker = "iou")
+    detector = sector_manager.detector
+    if detector.tracker is not None:
+        detector.tracker = RecordingTracker(detector.tracker)
+
+
+def run_iou_tracker(detections: list) -> tuple[list, float]:
+    tracker = IouTracker()
+    outputs = []
+    start = time.perf_counter()
+    for boxes, scores, classes in detections:
+        outputs.append(tracker.update(boxes, scores, classes))
+    return outputs, time.perf_counter() - start
+
+
+def run_byte_tracker(detections: list, frame_size: tuple[int, int], fps: float) -> tuple[list, float]:
+    from ultralytics.engine.results import Boxes
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    from ultralytics.utils import IterableSimpleNamespace, yaml_load
+    from ultralytics.utils.checks import check_yaml
+
+    config = IterableSimpleNamespace(**yaml_load(check_yaml("bytetrack.yaml")))
+    tracker = BYTETracker(config, frame_rate=round(fps))
+    width, height = frame_size
+    # Boxes собираются до замера: так же, как в ultralytics, трекер получает готовые результаты
+    inputs = [
+        Boxes(np.column_stack([boxes, scores, classes]).astype(np.float32), (height, width))
+        for boxes, scores, classes in detections
+    ]
+    outputs = []
+    start = time.perf_counter()
+    for boxes in inputs:
+        tracks = tracker.update(boxes)
+        if len(tracks) == 0:
+            outputs.append(None)
+        else:
+            outputs.append((tracks[:, :4], tracks[:, 4].astype(np.int64).tolist(), tracks[:, 6].tolist()))
+    return outputs, time.perf_counter() - start
+
+
+def agreement(reference: list, other: list) -> tuple[float, int, int, int]:
+    # Доля боксов reference, сопоставленных с other, и переключения id other на треках reference
+    matched = total = 0
+    other_ids = defaultdict(set)
+    for ref_result, other_result in zip(reference, other):
+        if ref_result is None:
+            continue
+        ref_boxes, ref_ids, _ = ref_result
+        total += len(ref_ids)
+        if other_result is None:
+            continue
+        boxes, ids, _ = other_result
+        rows, cols = greedy_match(iou_matrix(np.asarray(ref_boxes), np.asarray(boxes)), 0.5)
+        matched += len(rows)
+        for row, col in zip(rows, cols):
+            other_ids[ref_ids[row]].add(ids[col])
+
+    switches = sum(len(ids) - 1 for ids in other_ids.values())
+    reference_ids = len({track_id for result in reference if result is not None for track_id in result[1]})
+    ids = len({track_id for result in other if result is not None for track_id in result[1]})
+    return matched / total if total else 1.0, switches, reference_ids, ids
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=3000, help="Кол-во кадров для замера")
+    parser.add_argument("--fps", type=float, default=25, help="Частота кадров для буфера ByteTrack")
+    args, rest = parser.parse_known_args()
+
+    results = compare_variants(
+        rest, args.frames, {"ultralytics": {"tracker": "ultralytics"}, "iou": {"tracker": "iou"}}, prepare=record_detections
+    )
+    iou_detector = results["iou"][2].detector
+    detections, frame_size = iou_detector.tracker.detections, iou_detector.frame_size
+
+    byte_outputs, byte_time = run_byte_tracker(detections, frame_size, args.fps)
+    iou_outputs, iou_time = run_iou_tracker(detections)
+    frames = len(detections)
+    print(f"Трекер на {frames} записанных кадрах: ByteTrack {byte_time / frames * 1000:.3f} мс/кадр, "
+          f"iou {iou_time / frames * 1000:.3f} мс/кадр (x{byte_time / iou_time:.2f})")
+    share, switches, byte_ids, iou_ids = agreement(byte_outputs, iou_outputs)
+    print(f"Совпадение с ByteTrack: {share * 100:.1f}% боксов, переключений id {switches}, "
+          f"треков ByteTrack {byte_ids}, iou {iou_ids}")
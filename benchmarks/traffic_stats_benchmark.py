@@ -0,0 +1,105 @@
+'''
+Сравнение векторного SectorManager.traffic_stats с поэлементным расчетом по периодам
+функциями funcs.py на синтетических периодах.
+
+python -m benchmarks.traffic_stats_benchmark --sectors 8 --periods 5000 --vehicles 40
+'''
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from funcs import *
+from traffic_observer.period import Period
+from traffic_observer.crossing_log import CROSSING_DTYPE
+from traffic_observer.sector_manager import SectorManager
+from benchmarks.common import ReplayDetector, synthetic_sectors, VEHICLE_CLASSES, VEHICLE_SIZE_COEFFS
+
+FRAME_SIZE = (1280, 720)
+
+
+def fill_periods(sector_manager: SectorManager, periods: int, vehicles: int, rng):
+    next_id = 0
+    for sector in sector_manager.sectors:
+        for i in range(periods):
+            # Каждый 10-й период пустой, чтобы проверить NaN
+            count = 0 if i % 10 == 0 else int(rng.integers(1, 2 * vehicles))
+            rows = np.zeros(count, dtype=CROSSING_DTYPE)
+            rows["track_id"] = np.arange(next_id, next_id + count)
+            rows["class_index"] = rng.integers(0, len(VEHICLE_CLASSES), count)
+            rows["start_time"] = i * 30 + rng.uniform(0, 30, count)
+            rows["end_time"] = rows["start_time"] + rng.uniform(3, 30, count)
+            rows["free_flow"] = rng.random(count) < 0.5
+            next_id += count
+
+            start = len(sector.crossings)
+            sector.crossings.extend(rows)
+            sector.periods_data.append(Period(sector.crossings, start, len(sector.crossings), 30.0))
+
+
+def scalar_period_stats(sector_manager: SectorManager, sector, period: Period) -> dict[str, float]:
+    # Поэлементный расчет на словарях периода, как до векторизации
+    classwise_traveled_count = period.classwise_traveled_count
+    vehicles_travel_time = period.ids_travel_time.values()
+    vehicles_free_time = period.free_travel_time.values()
+    size_coeffs = sector_manager.size_coeffs
+    return {
+        "Интенсивность траффика": traffic_intensity(classwise_traveled_count, size_coeffs, period.observation_time),
+        "Среднее время проезда сек": mean_travel_time(vehicles_travel_time)*SECS_IN_HOUR,
+        "Средняя скорость движения км/ч": mean_vehicle_speed(vehicles_travel_time, sector.length),
+        "Плотность траффика": traffic_density(
+            classwise_traveled_count, size_coeffs, vehicles_travel_time, sector.length,
+            period.observation_time, lane_count=sector.lanes_count
+        ),
+        "Среднее своб. время сек": mean_free_time(vehicles_free_time)*SECS_IN_HOUR,
+        "Средняя задержка сек": mean_vehicle_delay(vehicles_travel_time, vehicles_free_time)*SECS_IN_HOUR,
+        "Временной индекс": time_index(vehicles_travel_time, vehicles_free_time),
+        "Время наблюдения сек": period.observation_time
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sectors", type=int, default=8)
+    parser.add_argument("--periods", type=int, default=5000, help="Периодов на сектор")
+    parser.add_argument("--vehicles", type=int, default=40, help="Среднее кол-во машин за период")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sector_manager = SectorManager(
+        synthetic_sectors(FRAME_SIZE, args.sectors, 1),
+        VEHICLE_CLASSES,
+        1 / 25,
+        30,
+        VEHICLE_SIZE_COEFFS,
+        FRAME_SIZE[::-1],
+        None,
+        render=False,
+        detector=ReplayDetector([None], dict(enumerate(VEHICLE_CLASSES)))
+    )
+    fill_periods(sector_manager, args.periods, args.vehicles, np.random.default_rng(args.seed))
+
+    start = time.perf_counter()
+    reference = [
+        pd.DataFrame([scalar_period_stats(sector_manager, sector, period) for period in sector.periods_data])
+        for sector in sector_manager.sectors
+    ]
+    reference_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = sector_manager.traffic_stats()
+    vectorized_elapsed = time.perf_counter() - start
+
+    matches = all(
+        np.allclose(ref.to_numpy(dtype=float), vec.to_numpy(dtype=float), rtol=1e-9, equal_nan=True)
+        and list(ref.columns) == list(vec.columns)
+        for ref, vec in zip(reference, vectorized)
+    )
+    print(f"Периодов: {args.sectors} x {args.periods}")
+    print(f"Поэлементно: {reference_elapsed * 1000:.1f} мс")
+    print(f"Векторно:    {vectorized_elapsed * 1000:.1f} мс (x{reference_elapsed / vectorized_elapsed:.1f})")
+    print(f"Результаты совпадают: {matches}")
@@ -1,6 +1,6 @@
 import argparse
 
-def load_args():
+def load_args(argv=None):
     # Добавление аргументов запуска
     parser = argparse.ArgumentParser()
     parser.add_argument("--video-path", type=str, required=True, help="Путь к видео")
@@ -8,9 +8,10 @@ def load_args():
     parser.add_argument("--output-path", type=str, required=True, help="Путь для выходного файлы")
     parser.add_argument("--report-path", type=str, required=True, help="Путь для выходного отчета")
     parser.add_argument("--sector_path", type=str, required=True, help="Массив точек областей")
+    parser.add_argument("--resume", action="store_true", help="Продолжить обработку с последней контрольной точки")
 
     # Получение всех аргументов
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Доступ к аргументам
     video_path = args.video_path
@@ -18,5 +19,6 @@ def load_args():
     output_path = args.output_path
     report_path = args.report_path
     sector_path = args.sector_path
+    resume = args.resume
     
-    return video_path, model_path, output_path, report_path, sector_path
\ No newline at end of file
+    return video_path, model_path, output_path, report_path, sector_path, resume
\ No newline at end of file
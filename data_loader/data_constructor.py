@@ -3,11 +3,27 @@ import tomllib
 import logging
 import numpy as np
 import json
+import os
+import hashlib
 
 from data_loader.args_loader import load_args
-from data_loader.video_loader import open_video
+from data_loader.video_loader import (
+    open_video, open_stream, is_stream_url, seek_video, capture_info, probe_video,
+    CaptureSource, FFmpegCapture, LiveCapture, VideoInfo
+)
 from data_loader.data_sector import DataSector
+from data_manager.report_sink import PeriodReportSink, stream_dir_for
+from data_manager.video_writer import H264Writer
 from traffic_observer.sector_manager import SectorManager
+from traffic_observer.stage_profiler import StageProfiler
+from traffic_observer.detector import Detector
+from traffic_observer.backends import create_backend
+from traffic_observer.checkpoint import Checkpointer, checkpoint_path_for, load_checkpoint, resumed_output_path
+from traffic_observer.motion_gate import MotionGate
+from traffic_observer.iou_tracker import IouTracker
+from traffic_observer.track_cache import (
+    TrackCache, TrackCacheWriter, CachedDetector, track_cache_dir, find_track_cache_dir
+)
 
 class Settings:
     def __init__(self):
@@ -20,40 +36,263 @@ class Settings:
         self.target_height = toml_settings["target-height"]
         self.vehicle_classes = toml_settings["vehicle-classes"]
         self.vehicle_size_coeffs = toml_settings["vehicle-size-coeffs"]
+        self.pipelined = toml_settings.get("pipelined", False)
+        self.queue_size = toml_settings.get("queue-size", 8)
+        self.inference_stride = toml_settings.get("inference-stride", 1)
+        self.batch_size = toml_settings.get("batch-size", 1)
+        self.video_decoder = toml_settings.get("video-decoder", "opencv")
+        self.video_encoder = toml_settings.get("video-encoder", "opencv")
+        self.h264_preset = toml_settings.get("h264-preset", "veryfast")
+        self.h264_crf = toml_settings.get("h264-crf", 23)
+        self.output_frame_step = toml_settings.get("output-frame-step", 1)
+        self.headless = toml_settings.get("headless", False)
+        self.track_ttl = toml_settings.get("track-ttl", 30)
+        self.report_stream_format = toml_settings.get("report-stream-format", "")
+        self.excel_report = toml_settings.get("excel-report", True)
+        self.profile_interval = toml_settings.get("profile-interval", 0)
+        self.crossings_spill_dir = toml_settings.get("crossings-spill-dir", "")
+        self.roi_inference = toml_settings.get("roi-inference", False)
+        self.inference_backend = toml_settings.get("inference-backend", "torch")
+        self.model_cache_dir = toml_settings.get("model-cache-dir", "model/cache")
+        self.warmup_frames = toml_settings.get("warmup-frames", 3)
+        self.checkpoint_interval = toml_settings.get("checkpoint-interval", 0)
+        self.track_cache = toml_settings.get("track-cache", "")
+        self.motion_gate = toml_settings.get("motion-gate", False)
+        self.motion_gate_threshold = toml_settings.get("motion-gate-threshold", 25)
+        self.motion_gate_max_skip = toml_settings.get("motion-gate-max-skip", 25)
+        self.track_cache_dir = toml_settings.get("track-cache-dir", "cache/tracks")
+        self.tracker = toml_settings.get("tracker", "ultralytics")
+        self.tracker_match_iou = toml_settings.get("tracker-match-iou", 0.2)
+        self.tracker_buffer = toml_settings.get("tracker-buffer", 30)
+        self.single_resize = toml_settings.get("single-resize", False)
+        self.decoder_process = toml_settings.get("decoder-process", False)
 
 class DataConstructor:
-    def __init__(self):
-        video_path, model_path, output_path, report_path, sector_path = load_args()
+    def __init__(self, argv=None):
+        video_path, model_path, output_path, report_path, sector_path, resume = load_args(argv)
         self.__video_path = video_path
         self.__model_path = model_path
         self.__output_path = output_path
+        # Продолжение возможно только при наличии контрольной точки; без нее прогон начинается заново
+        self.__has_checkpoint = resume and os.path.exists(checkpoint_path_for(report_path))
+        if self.__has_checkpoint and output_path:
+            self.__output_path = resumed_output_path(output_path)
         self.__report_path = report_path
         self.__sector_path = sector_path
+        self.__resume = resume
         self.settings = Settings()
+        # Параметры видео определяются один раз и используются get_video и get_sector_manager
+        self.__video_info: VideoInfo|None = None
+
+    def get_video(self) -> tuple[cv2.VideoCapture|FFmpegCapture|LiveCapture, cv2.VideoWriter|H264Writer|None]:
+        cap, fps = self.get_capture_source().open()
+        if self.__video_info is None:
+            self.__video_info = capture_info(cap.cap if isinstance(cap, LiveCapture) else cap, fps)
+        return cap, self.get_output()
 
-    def get_video(self) -> tuple[cv2.VideoCapture, cv2.VideoWriter]:
-        cap, fps = open_video(self.__video_path)
+    def get_capture_source(self) -> CaptureSource:
+        frame_size = (self.settings.target_width, self.settings.target_height)
+        fps = 0
+        if self.settings.video_decoder == "ffmpeg" and not is_stream_url(self.__video_path):
+            fps = self.get_video_info().fps
+        return CaptureSource(self.__video_path, self.settings.video_decoder, frame_size, fps)
+
+    def get_output(self) -> cv2.VideoWriter|H264Writer|None:
+        if self.settings.headless:
+            # Без отрисовки видео не записывается
+            return None
+        fps = self.get_video_info().fps
+        frame_size = (self.settings.target_width, self.settings.target_height)
+        if self.settings.video_encoder == "ffmpeg":
+            return H264Writer(
+                self.__output_path,
+                fps,
+                frame_size,
+                self.settings.h264_preset,
+                self.settings.h264_crf,
+                self.settings.output_frame_step,
+                self.settings.queue_size
+            )
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        output = cv2.VideoWriter(self.__output_path, fourcc, fps, (self.settings.target_width, self.settings.target_height))
-        return cap, output
+        return cv2.VideoWriter(self.__output_path, fourcc, fps, frame_size)
+
+    def get_video_info(self) -> VideoInfo:
+        if self.__video_info is None:
+            if is_stream_url(self.__video_path):
+                temp_cap, fps = open_stream(self.__video_path)
+                self.__video_info = capture_info(temp_cap.cap, fps)
+                temp_cap.release()
+            elif self.settings.video_decoder == "ffmpeg":
+                self.__video_info = probe_video(self.__video_path)
+            else:
+                temp_cap, fps = open_video(self.__video_path)
+                self.__video_info = capture_info(temp_cap, fps)
+                temp_cap.release()
+        return self.__video_info
     
-    def get_sector_manager(self):
-        temp_cap, fps = open_video(self.__video_path)
-        video_width = int(temp_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    def get_sector_manager(self, warmup: bool = True):
+        cache = None
+        if self.settings.track_cache == "replay":
+            # Повторный анализ: детекции и параметры видео из кэша, видео и модель не открываются
+            cache = TrackCache(self.__get_track_cache_dir())
+            video_info = self.__cached_video_info(cache.meta)
+        else:
+            video_info = self.get_video_info()
+        fps = video_info.fps
         data_sectors = self.__load_sectors()
-        adapted_data_sectors = self.__adapt_sectors_points(data_sectors, video_width, self.settings.target_width)
+        adapted_data_sectors = self.__adapt_sectors_points(data_sectors, video_info.width, self.settings.target_width)
 
-        temp_cap.release()
-        return SectorManager(
+        # При потоковой записи закрытые периоды не хранятся в памяти
+        report_sink = None
+        if self.settings.report_stream_format:
+            report_sink = PeriodReportSink(
+                stream_dir_for(self.__report_path), self.settings.report_stream_format, append=self.__has_checkpoint
+            )
+
+        checkpointer = None
+        if self.settings.checkpoint_interval > 0:
+            checkpoint_fps = fps
+            if checkpoint_fps <= 0:
+                checkpoint_fps = 25
+                logging.warning(f"Частота кадров неизвестна, интервал контрольных точек считается для {checkpoint_fps} FPS")
+            checkpointer = Checkpointer(
+                checkpoint_path_for(self.__report_path), max(1, round(self.settings.checkpoint_interval * checkpoint_fps))
+            )
+
+        imgsize = [self.settings.target_height, self.settings.target_width]
+        if cache is not None:
+            detector = CachedDetector(cache)
+        else:
+            backend = create_backend(
+                self.settings.inference_backend, self.__model_path, self.settings.model_cache_dir, self.settings.batch_size
+            )
+            tracker = None
+            if self.settings.tracker == "iou":
+                tracker = IouTracker(match_iou=self.settings.tracker_match_iou, max_lost=self.settings.tracker_buffer)
+            detector = Detector(None, imgsize, self.settings.inference_stride, backend, tracker)
+            if self.settings.track_cache == "record":
+                detector.recorder = TrackCacheWriter(self.__get_track_cache_dir(), {
+                    "video_path": self.__video_path,
+                    "model_path": self.__model_path,
+                    "fps": fps,
+                    "video_size": [video_info.width, video_info.height],
+                    "video_frames": video_info.frames,
+                    "params": self.__get_track_cache_params(),
+                    "frame_size": [self.settings.target_width, self.settings.target_height],
+                    "class_names": {str(key): name for key, name in detector.class_names.items()},
+                })
+
+        sector_manager = SectorManager(
             adapted_data_sectors,
             self.settings.vehicle_classes,
             1/fps,
             self.settings.observation_time,
             self.settings.vehicle_size_coeffs,
-            [self.settings.target_height, self.settings.target_width],
-            self.__model_path
+            imgsize,
+            self.__model_path,
+            self.settings.inference_stride,
+            not self.settings.headless and self.settings.track_cache != "replay",
+            self.settings.track_ttl,
+            report_sink=report_sink,
+            keep_periods=report_sink is None,
+            profiler=StageProfiler(report_interval=self.settings.profile_interval),
+            crossings_spill_dir=self.settings.crossings_spill_dir or None,
+            roi_inference=self.settings.roi_inference,
+            detector=detector,
+            checkpointer=checkpointer
         )
+
+        # Декодированный кадр масштабируется один раз - сразу во вход модели
+        if self.settings.single_resize and isinstance(detector, Detector):
+            detector.enable_single_resize()
+
+        # Инференс только при движении внутри полигонов секторов
+        if self.settings.motion_gate and isinstance(detector, Detector):
+            detector.motion_gate = MotionGate(
+                sector_manager.start_zones + sector_manager.lane_zones,
+                (self.settings.target_width, self.settings.target_height),
+                self.settings.motion_gate_threshold,
+                self.settings.motion_gate_max_skip
+            )
+
+        # Модель загружается (и при необходимости экспортируется) под итоговый размер входа
+        if warmup:
+            detector.warmup(self.settings.warmup_frames)
+        return sector_manager
     
+    def restore_checkpoint(self, cap, sector_manager: SectorManager):
+        # При --resume состояние восстанавливается из контрольной точки, видео перематывается к ее кадру
+        if not self.__resume:
+            return
+        path = checkpoint_path_for(self.__report_path)
+        if not os.path.exists(path):
+            logging.warning(f"Контрольная точка {path} не найдена, обработка начинается с начала")
+            return
+        if isinstance(sector_manager.detector, Detector) and sector_manager.detector.recorder is not None:
+            # Кэш пишется с первого кадра видео; продолжение записало бы его со смещением
+            logging.warning("Запись кэша детекций при продолжении с контрольной точки отключена")
+            sector_manager.detector.recorder = None
+        state = load_checkpoint(path)
+        sector_manager.load_state(state)
+        if cap is not None:
+            seek_video(cap, sector_manager.frame_index)
+        logging.info(f"Обработка продолжается с кадра {sector_manager.frame_index} ({path})")
+
+    def __cached_video_info(self, meta: dict) -> VideoInfo:
+        if "video_size" not in meta:
+            # Кэш записан до сохранения параметров видео в meta.json
+            return self.get_video_info()
+        width, height = meta["video_size"]
+        self.__video_info = VideoInfo(width, height, meta["fps"], meta.get("video_frames", 0))
+        return self.__video_info
+
+    def __get_track_cache_dir(self) -> str:
+        # Ключ кэша: видео, модель и параметры, влияющие на детекции
+        params = self.__get_track_cache_params()
+        if self.settings.track_cache == "replay" and not (
+                os.path.exists(self.__video_path) and os.path.exists(self.__model_path)):
+            # Отпечатки видео и модели не посчитать: кэш ищется по пути видео и параметрам
+            return find_track_cache_dir(self.settings.track_cache_dir, self.__video_path, params)
+        return track_cache_dir(self.settings.track_cache_dir, self.__video_path, self.__model_path, params)
+
+    def __get_track_cache_params(self) -> dict:
+        params = {
+            "frame_size": [self.settings.target_width, self.settings.target_height],
+            "inference_stride": self.settings.inference_stride,
+            "inference_backend": self.settings.inference_backend,
+            "roi_inference": self.settings.roi_inference,
+            "tracker": self.settings.tracker,
+            "single_resize": self.settings.single_resize,
+            # При проверке движения в кэш пишутся удержанные боксы кадров без инференса
+            "motion_gate": self.settings.motion_gate,
+            "motion_gate_threshold": self.settings.motion_gate_threshold,
+            "motion_gate_max_skip": self.settings.motion_gate_max_skip,
+        }
+        if self.settings.tracker == "iou":
+            params["tracker_params"] = [self.settings.tracker_match_iou, self.settings.tracker_buffer]
+        if self.settings.roi_inference:
+            # Область инференса зависит от полигонов секторов
+            with open(self.__sector_path, "rb") as file:
+                params["sectors"] = hashlib.sha256(file.read()).hexdigest()
+        return params
+
+    def get_frame_size(self) -> tuple[int, int]|None:
+        # Размер кадра для обработки; None - кадры не масштабируются до target-width x target-height:
+        # при single-resize без вывода видео кадр масштабируется только во вход модели
+        if self.settings.single_resize and self.settings.headless:
+            return None
+        return self.settings.target_width, self.settings.target_height
+
+    def get_decoded_frame_size(self) -> tuple[int, int]:
+        # Размер кадров в буфере процесса декодера (decoder-process): без масштабирования - исходное разрешение
+        frame_size = self.get_frame_size()
+        if frame_size is not None:
+            return frame_size
+        if self.settings.video_decoder == "ffmpeg" and not is_stream_url(self.__video_path):
+            return self.settings.target_width, self.settings.target_height
+        video_info = self.get_video_info()
+        return video_info.width, video_info.height
+
     def get_output_paths(self) -> tuple[str, str]:
         return self.__report_path, self.__output_path
 
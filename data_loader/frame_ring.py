@@ -0,0 +1,166 @@
+import math
+import time
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from data_loader.video_loader import CaptureSource, seek_video
+
+# Интервал проверки флага остановки при ожидании слота или кадра
+_POLL_INTERVAL = 0.1
+# Метаданные слота: время захвата (nan - нет) и момент декодирования
+# (time.perf_counter - в Linux монотонные часы, общие для процессов)
+_META_FIELDS = 2
+
+
+class FrameRing:
+    '''
+    Кольцевой буфер кадров в общей памяти для одного процесса-декодера и одного процесса обработки.
+    Слоты заполняются и освобождаются строго по кругу: декодер ждет свободный слот (семафор free,
+    ограничение скорости декодирования), обработка ждет заполненный (семафор filled) и получает кадр
+    как представление NumPy слота без копирования. Слот возвращается декодеру вызовом release
+    после обработки кадра, поэтому представление нельзя использовать после release.
+    Объект передается в процесс декодера аргументом Process и подключается к той же общей памяти.
+    '''
+
+    def __init__(self, slots: int, frame_shape: tuple[int, int, int], context=None):
+        context = context if context is not None else multiprocessing.get_context("spawn")
+        self.slots = max(1, slots)
+        self.frame_shape = tuple(frame_shape)
+        frame_bytes = math.prod(self.frame_shape)
+        meta_bytes = self.slots * _META_FIELDS * np.dtype(np.float64).itemsize
+        self.memory = shared_memory.SharedMemory(create=True, size=self.slots * frame_bytes + meta_bytes)
+        self.owner = True
+
+        self.free = context.Semaphore(self.slots)
+        self.filled = context.Semaphore(0)
+        self.stop = context.Event()
+        # Кол-во записанных кадров после завершения декодирования; -1 - декодирование идет
+        self.total = context.Value("q", -1)
+        self.__attach()
+
+    def __getstate__(self):
+        return {
+            "slots": self.slots, "frame_shape": self.frame_shape, "name": self.memory.name,
+            "free": self.free, "filled": self.filled, "stop": self.stop, "total": self.total,
+        }
+
+    def __setstate__(self, state):
+        self.slots = state["slots"]
+        self.frame_shape = state["frame_shape"]
+        self.free, self.filled = state["free"], state["filled"]
+        self.stop, self.total = state["stop"], state["total"]
+        # При spawn дочерний процесс использует трекер ресурсов родителя: повторная регистрация имени ничего
+        # не меняет, а отмена регистрации здесь сняла бы регистрацию создателя, и unlink в нем завершился бы ошибкой
+        self.memory = shared_memory.SharedMemory(name=state["name"])
+        self.owner = False
+        self.__attach()
+
+    def __attach(self):
+        frame_bytes = math.prod(self.frame_shape)
+        self.frames = np.ndarray((self.slots, *self.frame_shape), dtype=np.uint8, buffer=self.memory.buf)
+        self.meta = np.ndarray(
+            (self.slots, _META_FIELDS), dtype=np.float64, buffer=self.memory.buf, offset=self.slots * frame_bytes
+        )
+        self.write_index = 0
+        self.read_index = 0
+
+    def acquire_slot(self) -> np.ndarray|None:
+        # Декодер: свободный слот для следующего кадра; None - обработка остановлена
+        while not self.stop.is_set():
+            if self.free.acquire(timeout=_POLL_INTERVAL):
+                return self.frames[self.write_index % self.slots]
+        return None
+
+    def commit(self, timestamp: float|None, decoded_at: float):
+        slot = self.write_index % self.slots
+        self.meta[slot] = (math.nan if timestamp is None else timestamp, decoded_at)
+        self.write_index += 1
+        self.filled.release()
+
+    def finish(self):
+        # Декодер: кадров больше не будет
+        self.total.value = self.write_index
+        self.filled.release()
+
+    def get(self, producer=None):
+        '''
+        Обработка: следующий кадр (представление слота, время захвата или None, момент декодирования);
+        None - декодирование завершено и все кадры прочитаны, обработка остановлена
+        или процесс декодера producer завершился, не вызвав finish.
+        '''
+        while not self.stop.is_set():
+            if not self.filled.acquire(timeout=_POLL_INTERVAL):
+                if producer is None or producer.is_alive():
+                    continue
+                # Декодер завершился: забираются только уже записанные кадры
+                if not self.filled.acquire(block=False):
+                    return None
+            if self.read_index == self.total.value:
+                # Сигнал завершения возвращается, чтобы повторный get тоже вернул None
+                self.filled.release()
+                return None
+            slot = self.read_index % self.slots
+            self.read_index += 1
+            timestamp, decoded_at = self.meta[slot]
+            return self.frames[slot], None if math.isnan(timestamp) else float(timestamp), float(decoded_at)
+        return None
+
+    def release(self, count: int = 1):
+        # Обработка: самые старые count прочитанных слотов снова свободны для декодера
+        for _ in range(count):
+            self.free.release()
+
+    def close(self):
+        if self.owner:
+            # Остановка декодера, ожидающего свободный слот
+            self.stop.set()
+        self.frames = self.meta = None
+        try:
+            self.memory.close()
+        except BufferError:
+            # Представление слота еще используется (например, последний кадр у Annotator); память освободится при выходе
+            pass
+        if self.owner:
+            self.memory.unlink()
+
+
+def decode_to_ring(ring: FrameRing, source: CaptureSource, start_frame: int = 0, max_frames: int|None = None):
+    '''
+    Процесс декодера: кадры source по порядку записываются в слоты ring (с масштабированием до размера слота).
+    max_frames - не больше стольких кадров (None - до конца видео).
+    '''
+
+    cap = None
+    height, width = ring.frame_shape[:2]
+    try:
+        # open_video и open_stream завершают процесс при ошибке открытия: finish все равно должен быть вызван
+        cap, _ = source.open()
+        if start_frame > 0:
+            seek_video(cap, start_frame)
+        while cap.isOpened() and not ring.stop.is_set():
+            if max_frames is not None and ring.write_index >= max_frames:
+                break
+            # Сначала свободный слот, затем чтение: у живого потока кадр берется самым свежим на момент записи
+            slot = ring.acquire_slot()
+            if slot is None:
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame.shape[:2] != (height, width):
+                cv2.resize(frame, (width, height), dst=slot)
+            else:
+                slot[...] = frame
+            ring.commit(getattr(cap, "frame_timestamp", None), time.perf_counter())
+    except BaseException:
+        logging.exception("Ошибка в процессе декодера")
+        raise
+    finally:
+        ring.finish()
+        if cap is not None:
+            cap.release()
+        ring.close()
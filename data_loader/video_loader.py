@@ -1,5 +1,11 @@
 import cv2
+import json
 import logging
+import subprocess
+import threading
+import time
+
+import numpy as np
 
 def get_fps(cap) -> float|int:
     major_ver, _, _ = cv2.__version__.split('.')
@@ -7,6 +13,14 @@ def get_fps(cap) -> float|int:
         return cap.get(cv2.CAP_PROP_FPS)
     return cap.get(cv2.cv.CV_CAP_PROP_FPS)
 
+class VideoInfo:
+    def __init__(self, width: int, height: int, fps: float, frames: int = 0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        # Кол-во кадров по метаданным контейнера; 0 - неизвестно (например, живой поток)
+        self.frames = frames
+
 def open_video(video_path: str):
     cap = cv2.VideoCapture(video_path)
 
@@ -21,4 +35,216 @@ def open_video(video_path: str):
         else:
             logging.warning("Частота кадров не может быть определена.")
 
-    return cap, fps
\ No newline at end of file
+    return cap, fps
+
+def is_stream_url(video_path: str) -> bool:
+    # rtsp://, http:// и т.п. обрабатываются как живой поток
+    return "://" in video_path
+
+def open_stream(url: str, fallback_fps: float = 25):
+    cap = LiveCapture(url)
+
+    if not cap.isOpened():
+        logging.error(f"Не удалось открыть поток {url}")
+        quit()
+    logging.info(f"Поток открыт успешно: {url}")
+    fps = get_fps(cap.cap)
+    if fps > 0:
+        logging.info(f"Заявленная частота кадров потока: {fps:.2f} FPS")
+    else:
+        # Частота нужна только для записи видео и начального шага таймера
+        logging.warning(f"Частота кадров потока не определена, используется {fallback_fps} FPS")
+        fps = fallback_fps
+
+    return cap, fps
+
+class CaptureSource:
+    '''
+    Параметры открытия видео: открывает тот же захват, что и DataConstructor.get_video,
+    в том числе в другом процессе (декодер FrameRing), куда сам захват передать нельзя.
+    '''
+
+    def __init__(self, video_path: str, decoder: str = "opencv", frame_size: tuple[int, int]|None = None, fps: float = 0):
+        self.video_path = video_path
+        self.decoder = decoder
+        self.frame_size = frame_size
+        # Частота для ffmpeg известна заранее (ffprobe)
+        self.fps = fps
+
+    def open(self):
+        if is_stream_url(self.video_path):
+            # Живой поток: фоновый захват, обработка всегда получает самый свежий кадр
+            return open_stream(self.video_path)
+        if self.decoder == "ffmpeg":
+            # Кадры приходят уже в целевом разрешении
+            return FFmpegCapture(self.video_path, self.frame_size, self.fps), self.fps
+        return open_video(self.video_path)
+
+def seek_video(cap, frame_index: int):
+    # Переход к кадру frame_index перед продолжением обработки; живой поток не перематывается
+    if isinstance(cap, LiveCapture):
+        return
+    if isinstance(cap, FFmpegCapture):
+        cap.seek(frame_index)
+    else:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    logging.info(f"Видео перемотано к кадру {frame_index}")
+
+def capture_info(cap, fps: float) -> VideoInfo:
+    return VideoInfo(
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        fps,
+        max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+    )
+
+def probe_video(video_path: str) -> VideoInfo:
+    # Размер и частота кадров первого видеопотока через ffprobe, без декодирования
+    command = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height,avg_frame_rate,r_frame_rate,nb_frames", "-of", "json", video_path
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        stream = json.loads(result.stdout)["streams"][0]
+    except (OSError, subprocess.CalledProcessError, KeyError, IndexError) as e:
+        logging.error(f"Не удалось открыть видеофайл {video_path}: {e}")
+        quit()
+
+    fps = 0.0
+    for rate in (stream.get("avg_frame_rate"), stream.get("r_frame_rate")):
+        num, _, den = (rate or "0/0").partition("/")
+        if den and float(den) > 0 and float(num) > 0:
+            fps = float(num) / float(den)
+            break
+    logging.info(f"Видеофайл открыт успешно: {video_path}")
+    if fps > 0:
+        logging.info(f"Частота кадров видеофайла: {fps:.2f} FPS")
+    else:
+        logging.warning("Частота кадров не может быть определена.")
+    frames = stream.get("nb_frames", "0")
+    return VideoInfo(int(stream["width"]), int(stream["height"]), fps, int(frames) if frames.isdigit() else 0)
+
+class FFmpegCapture:
+    '''
+    Декодирование видео процессом ffmpeg с масштабированием до frame_size при декодировании.
+    Кадры BGR читаются из канала сразу в буфер кадра и оборачиваются np.frombuffer без копирования.
+    Интерфейс read/isOpened/release совпадает с cv2.VideoCapture.
+    '''
+
+    def __init__(self, video_path: str, frame_size: tuple[int, int], fps: float = 0):
+        width, height = frame_size
+        self.video_path = video_path
+        self.frame_size = frame_size
+        self.fps = fps
+        self.frame_shape = (height, width, 3)
+        self.frame_bytes = width * height * 3
+        self.__start(0)
+
+    def __start(self, start_seconds: float):
+        width, height = self.frame_size
+        # -ss перед -i: быстрый переход к ближайшему ключевому кадру и точное декодирование до нужного
+        seek = ["-ss", f"{start_seconds:.6f}"] if start_seconds > 0 else []
+        command = [
+            "ffmpeg", "-v", "error", "-nostdin", *seek, "-i", self.video_path,
+            # Билинейная интерполяция, как у cv2.resize по умолчанию
+            "-vf", f"scale={width}:{height}:flags=bilinear",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-"
+        ]
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=self.frame_bytes)
+        self.__opened = True
+
+    def seek(self, frame_index: int):
+        self.release()
+        self.__start(frame_index / self.fps if self.fps > 0 else 0)
+
+    def isOpened(self) -> bool:
+        return self.__opened
+
+    def read(self):
+        buffer = bytearray(self.frame_bytes)
+        view = memoryview(buffer)
+        received = 0
+        while received < self.frame_bytes:
+            count = self.process.stdout.readinto(view[received:])
+            if not count:
+                # Конец потока (неполный последний кадр отбрасывается)
+                self.__opened = False
+                return False, None
+            received += count
+        return True, np.frombuffer(buffer, dtype=np.uint8).reshape(self.frame_shape)
+
+    def release(self):
+        self.__opened = False
+        if self.process.poll() is None:
+            self.process.terminate()
+        self.process.stdout.close()
+        self.process.wait()
+
+class LiveCapture:
+    '''
+    Чтение живого потока (RTSP/HTTP) фоновым потоком-захватчиком.
+    read отдает самый свежий кадр: кадры, которые пришли, пока обработка была занята, отбрасываются
+    (frames_dropped), поэтому задержка не растет, если инференс медленнее реального времени.
+    frame_timestamp - время получения отданного кадра в секундах от открытия потока;
+    по нему SectorManager продвигает таймер вместо фиксированного шага 1/fps.
+    '''
+
+    def __init__(self, url: str, release_timeout: float = 5):
+        self.url = url
+        self.cap = cv2.VideoCapture(url)
+        self.release_timeout = release_timeout
+        self.frames_grabbed = 0
+        self.frames_dropped = 0
+        self.frame_timestamp = None
+
+        self.__condition = threading.Condition()
+        self.__frame = None
+        self.__timestamp = None
+        self.__fresh = False
+        self.__running = self.cap.isOpened()
+        self.__start = time.monotonic()
+        self.__thread = threading.Thread(target=self.__grab, name="live-grabber", daemon=True)
+        if self.__running:
+            self.__thread.start()
+
+    def isOpened(self) -> bool:
+        return self.__running or self.__fresh
+
+    def read(self):
+        with self.__condition:
+            while not self.__fresh and self.__running:
+                self.__condition.wait()
+            if not self.__fresh:
+                return False, None
+            frame, self.frame_timestamp = self.__frame, self.__timestamp
+            self.__fresh = False
+        return True, frame
+
+    def release(self):
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify_all()
+        if self.__thread.is_alive():
+            self.__thread.join(self.release_timeout)
+        self.cap.release()
+        logging.info(f"Поток {self.url}: получено {self.frames_grabbed} кадров, "
+                     f"пропущено {self.frames_dropped} ({self.dropped_share() * 100:.1f}%)")
+
+    def dropped_share(self) -> float:
+        return self.frames_dropped / self.frames_grabbed if self.frames_grabbed else 0.0
+
+    def __grab(self):
+        while self.__running:
+            ret, frame = self.cap.read()
+            timestamp = time.monotonic() - self.__start
+            with self.__condition:
+                if not ret:
+                    self.__running = False
+                else:
+                    self.frames_grabbed += 1
+                    if self.__fresh:
+                        # Предыдущий кадр не был забран обработкой
+                        self.frames_dropped += 1
+                    self.__frame, self.__timestamp, self.__fresh = frame, timestamp, True
+                self.__condition.notify_all()
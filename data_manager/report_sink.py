@@ -0,0 +1,118 @@
+import csv
+import os
+import shutil
+import logging
+
+import pandas as pd
+
+REPORT_STREAM_FORMATS = ("csv", "parquet")
+
+
+def stream_dir_for(report_path: str) -> str:
+    # Каталог потокового отчета рядом с итоговым: output/traffic-stats.xlsx -> output/traffic-stats_periods
+    return os.path.splitext(report_path)[0] + "_periods"
+
+
+class PeriodReportSink:
+    '''
+    Дозапись показателей каждого закрытого периода на диск сразу при вызове new_period.
+    csv: один файл на сектор (sector_<n>.csv), строка на период.
+    parquet: каталог на сектор (sector_<n>/), файл на период - незавершенная запись не портит предыдущие.
+    '''
+
+    def __init__(self, stream_dir: str, stream_format: str = "csv", append: bool = False):
+        if stream_format not in REPORT_STREAM_FORMATS:
+            raise ValueError(f"Неизвестный формат потокового отчета: {stream_format}")
+        if stream_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("Для report-stream-format = \"parquet\" необходим пакет pyarrow")
+
+        self.stream_dir = stream_dir
+        self.stream_format = stream_format
+        self.periods_written: dict[int, int] = {}
+        os.makedirs(stream_dir, exist_ok=True)
+        if append:
+            self.__count_written()
+        else:
+            # Как и xlsx, отчет нового прогона перезаписывает предыдущий
+            self.__clear()
+        logging.info(f"Показатели периодов записываются в {stream_dir} ({stream_format})")
+
+    def write(self, sector_number: int, row: dict):
+        period_number = self.periods_written.get(sector_number, 0)
+        if self.stream_format == "csv":
+            self.__write_csv(sector_number, row)
+        else:
+            self.__write_parquet(sector_number, period_number, row)
+        self.periods_written[sector_number] = period_number + 1
+
+    def truncate(self, periods_written: dict[int, int]):
+        # Удаление периодов сверх periods_written (записанных после контрольной точки)
+        for sector_number, count in list(self.periods_written.items()):
+            keep = periods_written.get(sector_number, 0)
+            if count <= keep:
+                continue
+            if self.stream_format == "csv":
+                path = os.path.join(self.stream_dir, f"sector_{sector_number}.csv")
+                with open(path, "r", encoding="utf-8", newline="") as file:
+                    lines = file.readlines()[:keep + 1]
+                with open(path, "w", encoding="utf-8", newline="") as file:
+                    file.writelines(lines)
+            else:
+                sector_dir = os.path.join(self.stream_dir, f"sector_{sector_number}")
+                for part in sorted(os.listdir(sector_dir))[keep:]:
+                    os.remove(os.path.join(sector_dir, part))
+        self.periods_written = dict(periods_written)
+
+    def __sector_entries(self):
+        for name in os.listdir(self.stream_dir):
+            if name.startswith("sector_"):
+                yield name, os.path.join(self.stream_dir, name)
+
+    def __clear(self):
+        for _, path in self.__sector_entries():
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+    def __count_written(self):
+        for name, path in self.__sector_entries():
+            if os.path.isdir(path):
+                self.periods_written[int(name[len("sector_"):])] = len(os.listdir(path))
+            elif name.endswith(".csv"):
+                with open(path, "r", encoding="utf-8") as file:
+                    # Строка заголовка не считается
+                    self.periods_written[int(name[len("sector_"):-len(".csv")])] = max(0, sum(1 for _ in file) - 1)
+
+    def __write_csv(self, sector_number: int, row: dict):
+        path = os.path.join(self.stream_dir, f"sector_{sector_number}.csv")
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "a", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=list(row))
+            if is_new:
+                writer.writeheader()
+            writer.writerow(row)
+
+    def __write_parquet(self, sector_number: int, period_number: int, row: dict):
+        sector_dir = os.path.join(self.stream_dir, f"sector_{sector_number}")
+        os.makedirs(sector_dir, exist_ok=True)
+        pd.DataFrame([row]).to_parquet(os.path.join(sector_dir, f"period_{period_number:08d}.parquet"))
+
+
+def read_stream(stream_dir: str) -> list[pd.DataFrame]:
+    # Таблицы по секторам из потокового отчета (в порядке номеров секторов)
+    sectors = {}
+    for name in os.listdir(stream_dir):
+        path = os.path.join(stream_dir, name)
+        if name.startswith("sector_") and name.endswith(".csv"):
+            sectors[int(name[len("sector_"):-len(".csv")])] = pd.read_csv(path)
+        elif name.startswith("sector_") and os.path.isdir(path):
+            parts = sorted(os.listdir(path))
+            # Каталог сектора пуст, если при продолжении удалены все его периоды
+            sectors[int(name[len("sector_"):])] = pd.concat(
+                [pd.read_parquet(os.path.join(path, part)) for part in parts], ignore_index=True
+            ) if parts else pd.DataFrame()
+    return [sectors[number] for number in sorted(sectors)]
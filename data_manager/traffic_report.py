@@ -1,25 +1,40 @@
 import pandas as pd
 from pandas.io.excel import ExcelWriter
 from traffic_observer.sector_manager import SectorManager
+from data_manager.report_sink import read_stream
 import logging
 
-def create_stats_report(sector_cluster: SectorManager, report_path: str):
+def sector_dataframes(sector_cluster: SectorManager) -> list[pd.DataFrame]:
+    # Итоговая таблица по каждому сектору: показатели трафика и количества по классам
     traffic_stats = sector_cluster.traffic_stats()
     classwise_stats = sector_cluster.classwise_stats()
     logging.info("Созданы датафреймы со статистикой.")
 
-    res_dataframes = []
-    i = 1
-    for traf_stat, class_stat in zip(traffic_stats, classwise_stats):
-        df_res_tmp = pd.concat([traf_stat, class_stat], axis=1)
-        res_dataframes.append(df_res_tmp)
+    return [pd.concat([traf_stat, class_stat], axis=1) for traf_stat, class_stat in zip(traffic_stats, classwise_stats)]
+
+def collected_dataframes(sector_cluster: SectorManager) -> list[pd.DataFrame]:
+    # При потоковой записи без хранения периодов таблицы читаются с диска
+    if sector_cluster.report_sink is not None and not sector_cluster.keep_periods:
+        return read_stream(sector_cluster.report_sink.stream_dir)
+    return sector_dataframes(sector_cluster)
+
+def write_report(sheets: dict[str, pd.DataFrame], report_path: str):
+    # Запись данных в файл
+    with ExcelWriter(report_path) as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name)
+
+def create_stats_report(sector_cluster: SectorManager, report_path: str):
+    res_dataframes = collected_dataframes(sector_cluster)
 
+    for i, df_res_tmp in enumerate(res_dataframes, start=1):
         print("*********************")
         print(f"Sector #{i}")
         print(df_res_tmp)
-        i += 1
 
-    # Запись данных в файл
-    with ExcelWriter(report_path) as writer:
-        for ind, df in enumerate(res_dataframes):
-            df.to_excel(writer, sheet_name=f"{ind + 1}")
\ No newline at end of file
+    write_report({f"{ind + 1}": df for ind, df in enumerate(res_dataframes)}, report_path)
+
+def create_report_from_stream(stream_dir: str, report_path: str):
+    # Сборка xlsx из потокового отчета (например, после аварийного завершения)
+    res_dataframes = read_stream(stream_dir)
+    write_report({f"{ind + 1}": df for ind, df in enumerate(res_dataframes)}, report_path)
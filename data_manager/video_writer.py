@@ -0,0 +1,81 @@
+import queue
+import logging
+import threading
+import subprocess
+
+
+class H264Writer:
+    '''
+    Запись видео в H.264 (libx264) процессом ffmpeg: кадры BGR передаются в stdin ffmpeg,
+    поэтому итоговый файл сразу пригоден для браузера и отдельный проход remux_to_h264.py не нужен.
+    Кодирование и запись в канал выполняются в отдельном потоке; write только кладет кадр в очередь.
+    frame_step - запись каждого N-го кадра (частота выходного видео fps / frame_step).
+    Интерфейс write/release совпадает с cv2.VideoWriter.
+    '''
+
+    def __init__(
+            self,
+            output_path: str,
+            fps: float,
+            frame_size: tuple[int, int],
+            preset: str = "veryfast",
+            crf: int = 23,
+            frame_step: int = 1,
+            queue_size: int = 8
+    ):
+        width, height = frame_size
+        self.frame_step = max(1, frame_step)
+        self.frames_received = 0
+        self.frames_written = 0
+        output_fps = (fps if fps > 0 else 30) / self.frame_step
+
+        command = [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{output_fps}", "-i", "-",
+            "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p",
+            # Индекс в начале файла, чтобы воспроизведение в браузере начиналось до полной загрузки
+            "-movflags", "+faststart",
+            output_path
+        ]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self.__frames = queue.Queue(maxsize=queue_size)
+        self.__error: BaseException|None = None
+        self.__thread = threading.Thread(target=self.__encode, name="h264-writer", daemon=True)
+        self.__thread.start()
+
+    def write(self, frame):
+        if self.__error is not None:
+            raise self.__error
+        index = self.frames_received
+        self.frames_received += 1
+        if index % self.frame_step == 0:
+            self.__frames.put(frame)
+
+    def release(self):
+        if self.__thread.is_alive():
+            self.__frames.put(None)
+            self.__thread.join()
+        if not self.process.stdin.closed:
+            self.process.stdin.close()
+        returncode = self.process.wait()
+        if returncode != 0:
+            logging.error(f"ffmpeg завершился с кодом {returncode} при записи видео")
+        if self.__error is not None:
+            raise self.__error
+
+    def __encode(self):
+        try:
+            while True:
+                frame = self.__frames.get()
+                if frame is None:
+                    break
+                self.process.stdin.write(frame.tobytes() if not frame.flags.c_contiguous else frame.data)
+                self.frames_written += 1
+        except BaseException as e:
+            logging.exception("Ошибка записи видео в ffmpeg")
+            self.__error = e
+            # Разблокировка write, ожидающего место в очереди
+            while not self.__frames.empty():
+                self.__frames.get_nowait()
+        finally:
+            self.process.stdin.close()
@@ -3,49 +3,75 @@ import logging
 
 from data_manager.traffic_report import create_stats_report
 from data_loader.data_constructor import DataConstructor
+from traffic_observer.pipeline import FramePipeline, SharedMemoryPipeline, run_serial, run_replay
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
 
-dataConstructor = DataConstructor()
-cap, output = dataConstructor.get_video()
-sector_manager = dataConstructor.get_sector_manager()
-settings = dataConstructor.settings
+def main():
+    dataConstructor = DataConstructor()
+    settings = dataConstructor.settings
+    # При воспроизведении кэша детекций видео не декодируется
+    replay = settings.track_cache == "replay"
+    # Процесс декодера открывает видео сам, в основном процессе открывается только запись
+    decoder_process = settings.decoder_process and not replay
+    if replay:
+        cap, output = None, None
+    elif decoder_process:
+        cap, output = None, dataConstructor.get_output()
+    else:
+        cap, output = dataConstructor.get_video()
+    sector_manager = dataConstructor.get_sector_manager()
+    dataConstructor.restore_checkpoint(cap, sector_manager)
 
-# Начало обработки видео
-logging.info("Начало обработки видео...")
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
+    # Начало обработки видео
+    logging.info("Начало обработки видео...")
+    frame_size = dataConstructor.get_frame_size()
+    show = not settings.headless
+    if replay:
+        run_replay(sector_manager, settings.batch_size)
+    elif decoder_process:
+        SharedMemoryPipeline(
+            dataConstructor.get_capture_source(),
+            sector_manager,
+            output,
+            dataConstructor.get_decoded_frame_size(),
+            sector_manager.frame_index,
+            settings.queue_size,
+            show,
+            settings.batch_size
+        ).run()
+    elif settings.pipelined:
+        FramePipeline(cap, sector_manager, output, frame_size, settings.queue_size, show, settings.batch_size).run()
+    else:
+        run_serial(cap, sector_manager, output, frame_size, show, settings.batch_size)
 
-    frame = cv2.resize(frame, (settings.target_width, settings.target_height))
-    sector_manager.update(frame)
+    report_path, output_path  = dataConstructor.get_output_paths()
 
-    # Показ текущего кадра
-    cv2.imshow("frame", frame)
-    output.write(frame)
+    # Освобождаем ресурсы
+    sector_manager.new_period()
+    sector_manager.detector.log_stats()
+    sector_manager.detector.close()
+    logging.info("Обработка видео завершена.")
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+    # Сохранение видеофайла
+    if cap is not None:
+        cap.release()
+    if output is not None:
+        output.release()
+        cv2.destroyAllWindows()
+        logging.info(f"Видеофайл сохранён в {output_path}")
 
-report_path, output_path  = dataConstructor.get_output_paths()
+    # Создание отчёта
+    if settings.excel_report:
+        create_stats_report(sector_manager, report_path)
 
-# Освобождаем ресурсы
-sector_manager.new_period()
-logging.info("Обработка видео завершена.")
 
-# Сохранение видеофайла
-cap.release()
-output.release()
-cv2.destroyAllWindows()
-
-logging.info(f"Видеофайл сохранён в {output_path}")
-
-# Создание отчёта
-create_stats_report(sector_manager, report_path)
+# Точка входа под проверкой: процесс декодера (decoder-process, spawn) импортирует этот модуль заново
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler()
+        ]
+    )
+    main()
@@ -0,0 +1,121 @@
+'''
+Параллельная обработка нескольких камер: каждая камера в отдельном процессе
+со своей моделью и своим SectorManager. Результат - один отчет с листом
+на каждую пару камера/сектор.
+
+python multi_camera.py --cameras cameras.json --model-path model/yolov8s_1280_720.pt \
+    --report-path output/traffic-stats.xlsx --workers 4 --threads-per-worker 2
+'''
+import argparse
+import json
+import logging
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Переменные окружения, ограничивающие потоки вычислительных библиотек
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def load_cameras(cameras_path: str) -> list[dict]:
+    with open(cameras_path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    return data["cameras"]
+
+
+def init_worker(threads: int):
+    # Выполняется до импорта torch/cv2 в процессе камеры
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+
+    import cv2
+    import torch
+    cv2.setNumThreads(threads)
+    torch.set_num_threads(threads)
+
+    logging.basicConfig(level=logging.WARNING, format="%(processName)s %(levelname)s - %(message)s")
+
+
+def process_camera(camera: dict, model_path: str, report_path: str):
+    # Тяжелые модули импортируются только в процессе камеры
+    from data_loader.data_constructor import DataConstructor
+    from data_manager.traffic_report import collected_dataframes
+    from traffic_observer.pipeline import run_serial
+
+    output_path = camera.get("output_path")
+    data_constructor = DataConstructor([
+        "--video-path", camera["video_path"],
+        "--model-path", model_path,
+        "--output-path", output_path or "",
+        # Отдельный путь на камеру, чтобы потоковые отчеты камер не пересекались
+        "--report-path", f"{os.path.splitext(report_path)[0]}_{camera['name']}.xlsx",
+        "--sector_path", camera["sector_path"],
+    ])
+    settings = data_constructor.settings
+    if not output_path:
+        settings.headless = True
+    if settings.crossings_spill_dir:
+        settings.crossings_spill_dir = os.path.join(settings.crossings_spill_dir, camera["name"])
+
+    cap, output = data_constructor.get_video()
+    sector_manager = data_constructor.get_sector_manager()
+    frame_size = data_constructor.get_frame_size()
+
+    start = time.perf_counter()
+    frames = run_serial(cap, sector_manager, output, frame_size, show=False, batch_size=settings.batch_size)
+    elapsed = time.perf_counter() - start
+
+    sector_manager.new_period()
+    sector_manager.detector.close()
+    cap.release()
+    if output is not None:
+        output.release()
+
+    return camera["name"], collected_dataframes(sector_manager), frames, elapsed
+
+
+def run_cameras(cameras: list[dict], model_path: str, report_path: str, workers: int, threads: int) -> dict:
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker, initargs=(threads,)) as executor:
+        futures = [executor.submit(process_camera, camera, model_path, report_path) for camera in cameras]
+        for future in as_completed(futures):
+            name, dataframes, frames, elapsed = future.result()
+            logging.info(f"Камера {name}: {frames} кадров за {elapsed:.1f} с ({frames / elapsed:.2f} FPS)")
+            results[name] = (dataframes, frames)
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cameras", type=str, required=True, help="JSON со списком камер (видео и регионы)")
+    parser.add_argument("--model-path", type=str, required=True, help="Путь к модельке")
+    parser.add_argument("--report-path", type=str, required=True, help="Путь для общего отчета")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Кол-во процессов")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="Кол-во потоков CPU на процесс")
+    args = parser.parse_args()
+
+    cameras = load_cameras(args.cameras)
+    workers = max(1, min(args.workers, len(cameras)))
+
+    start = time.perf_counter()
+    results = run_cameras(cameras, args.model_path, args.report_path, workers, args.threads_per_worker)
+    elapsed = time.perf_counter() - start
+
+    total_frames = sum(frames for _, frames in results.values())
+    logging.info(f"Обработано {len(results)} камер, {total_frames} кадров за {elapsed:.1f} с "
+                 f"({total_frames / elapsed:.2f} FPS суммарно, процессов: {workers})")
+
+    from data_manager.traffic_report import write_report
+
+    # Лист на каждую пару камера/сектор в порядке файла камер
+    sheets = {}
+    for camera in cameras:
+        dataframes, _ = results[camera["name"]]
+        for ind, df in enumerate(dataframes):
+            sheets[f"{camera['name']}_{ind + 1}"[-31:]] = df
+    write_report(sheets, args.report_path)
+    logging.info(f"Отчет сохранён в {args.report_path}")
@@ -0,0 +1,246 @@
+'''
+Параллельная обработка одного длинного видео по временным сегментам: каждый сегмент
+обрабатывается в отдельном процессе со своей моделью, трекером и SectorManager.
+
+Сегмент [start, end) обрабатывается с прогревом: с кадра start - overlap, чтобы трекер и стартовые регионы
+набрали состояние. Проезд учитывается только тем сегментом, в чей [start, end) попадает кадр его завершения,
+поэтому машины на границе сегментов не считаются дважды. Перекрытие должно быть не меньше
+максимального времени проезда сектора, иначе машины, въехавшие до начала прогрева, будут пропущены.
+Журналы проездов сегментов объединяются в одну временную шкалу и делятся на периоды по номерам кадров
+так же, как их закрывает таймер периода при последовательной обработке.
+
+python segment_video.py --video-path video/long.mp4 --model-path model/yolov8s_1280_720.pt \
+    --report-path output/traffic-stats.xlsx --sector_path regions.json --workers 4 --overlap 30
+'''
+import argparse
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from multi_camera import init_worker
+from traffic_observer.step_timer import StepTimer
+
+# Сдвиг id треков сегмента, чтобы id разных сегментов не совпадали в общем журнале
+SEGMENT_ID_OFFSET = 1 << 40
+
+
+class FrameRange:
+    # Отдает не больше max_frames кадров (max_frames=None - до конца видео)
+    def __init__(self, cap, max_frames: int|None):
+        self.cap = cap
+        self.remaining = max_frames
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        if self.remaining is not None:
+            if self.remaining <= 0:
+                return False, None
+            self.remaining -= 1
+        return self.cap.read()
+
+
+def period_frames(time_step: float, observation_time: float) -> tuple[int, float]:
+    '''
+    Длина периода последовательной обработки в кадрах и его время по таймеру. StepTimer накапливает шаги кадров,
+    период закрывается на первом кадре, где время достигло observation-time, и таймер сбрасывается в 0
+    (перебор отбрасывается), поэтому все полные периоды одной длины, даже если observation-time * fps не целое.
+    '''
+    timer = StepTimer(time_step)
+    frames = 0
+    while timer.time < observation_time:
+        timer.step_forward()
+        frames += 1
+    return frames, timer.time
+
+
+def accumulated_time(time_step: float, frames: int) -> float:
+    # Время таймера после frames шагов (время последнего, неполного периода)
+    timer = StepTimer(time_step)
+    for _ in range(frames):
+        timer.step_forward()
+    return timer.time
+
+
+def crossing_frames(end_times: np.ndarray, time_step: float) -> np.ndarray:
+    # Кадр завершения проезда: время фиксируется после шага таймера на этом кадре
+    return np.rint(end_times / time_step).astype(np.int64) - 1
+
+
+def segment_bounds(frame_count: int, workers: int, period_frames: int) -> list[tuple[int, int|None]]:
+    # Равные сегменты, границы кратны длине периода; последний сегмент - до конца видео
+    segments = max(1, workers)
+    size = math.ceil(frame_count / segments / period_frames) * period_frames
+    bounds = []
+    start = 0
+    while start < frame_count:
+        end = start + size
+        bounds.append((start, end if end < frame_count else None))
+        start = end
+    return bounds
+
+
+def main_args(args) -> list[str]:
+    return [
+        "--video-path", args.video_path,
+        "--model-path", args.model_path,
+        "--output-path", "",
+        "--report-path", args.report_path,
+        "--sector_path", args.sector_path,
+    ]
+
+
+def process_segment(argv: list[str], index: int, start: int, end: int|None, overlap_frames: int):
+    # Тяжелые модули импортируются только в процессе сегмента
+    from data_loader.data_constructor import DataConstructor
+    from data_loader.video_loader import seek_video
+    from traffic_observer.pipeline import run_serial
+
+    data_constructor = DataConstructor(argv)
+    settings = data_constructor.settings
+    settings.headless = True
+    settings.report_stream_format = ""
+    settings.checkpoint_interval = 0
+    settings.track_cache = ""
+    if settings.crossings_spill_dir:
+        settings.crossings_spill_dir = os.path.join(settings.crossings_spill_dir, f"segment_{index}")
+
+    cap, _ = data_constructor.get_video()
+    sector_manager = data_constructor.get_sector_manager()
+    frame_size = data_constructor.get_frame_size()
+
+    warm_start = max(0, start - overlap_frames)
+    seek_video(cap, warm_start)
+    start_segment(sector_manager, warm_start)
+
+    max_frames = None if end is None else end - warm_start
+    begin = time.perf_counter()
+    frames = run_serial(FrameRange(cap, max_frames), sector_manager, None, frame_size, show=False,
+                        batch_size=settings.batch_size)
+    elapsed = time.perf_counter() - begin
+    cap.release()
+
+    # Кадры сегмента без прогрева
+    core_frames = max(0, frames - (start - warm_start))
+    return index, segment_crossings(sector_manager, index, start, end), frames, core_frames, elapsed
+
+
+def start_segment(sector_manager, warm_start: int):
+    # Время - от начала видео, период один на весь сегмент: периоды нарезаются после объединения
+    sector_manager.period_timer.unresettable_time = warm_start * sector_manager.period_timer.step
+    sector_manager.observation_period = math.inf
+
+
+def segment_crossings(sector_manager, index: int, start: int, end: int|None) -> list[np.ndarray]:
+    # Проезды секторов, завершившиеся в кадрах [start, end) сегмента, с id, сдвинутыми на номер сегмента
+    crossings = []
+    for sector in sector_manager.sectors:
+        events = np.array(sector.crossings.view())
+        end_frames = crossing_frames(events["end_time"], sector_manager.period_timer.step)
+        core = end_frames >= start
+        if end is not None:
+            core &= end_frames < end
+        events = events[core]
+        events["track_id"] += index * SEGMENT_ID_OFFSET
+        crossings.append(events)
+    return crossings
+
+
+def merge_segments(sector_manager, segments_crossings: list[list[np.ndarray]], frame_count: int):
+    '''
+    Объединение журналов проездов сегментов (в порядке сегментов) в журналы секторов sector_manager
+    и нарезка периодов по кадру завершения проезда, как при последовательной обработке frame_count кадров:
+    период закрывается на каждом period_frames-м кадре до учета проездов этого кадра,
+    последний период закрывается после всех кадров и длится остаток видео.
+    '''
+    from traffic_observer.period import Period
+
+    time_step = sector_manager.period_timer.step
+    frames_per_period, period_time = period_frames(time_step, sector_manager.observation_period)
+    closed_periods = frame_count // frames_per_period
+    last_period_time = accumulated_time(time_step, frame_count - closed_periods * frames_per_period)
+    for sector_index, sector in enumerate(sector_manager.sectors):
+        for crossings in segments_crossings:
+            sector.crossings.extend(crossings[sector_index])
+
+        # Проезды кадра закрытия относятся уже к следующему периоду
+        end_frames = crossing_frames(sector.crossings.view()["end_time"], time_step)
+        period_indices = (end_frames + 1) // frames_per_period
+        boundaries = np.searchsorted(period_indices, np.arange(1, closed_periods + 1), side="left")
+        indices = [0, *boundaries.tolist(), len(sector.crossings)]
+        for k in range(closed_periods + 1):
+            observation_time = period_time if k < closed_periods else last_period_time
+            sector.periods_data.append(Period(sector.crossings, indices[k], indices[k + 1], observation_time))
+        sector.period_start = len(sector.crossings)
+
+
+def run_segments(args) -> None:
+    from data_loader.data_constructor import DataConstructor
+    from data_manager.traffic_report import create_stats_report
+
+    argv = main_args(args)
+    data_constructor = DataConstructor(argv)
+    settings = data_constructor.settings
+    settings.headless = True
+    settings.report_stream_format = ""
+    settings.checkpoint_interval = 0
+    settings.track_cache = ""
+    video_info = data_constructor.get_video_info()
+    fps = video_info.fps
+
+    # Модель в основном процессе не загружается: нужны только сектора и расчет показателей
+    sector_manager = data_constructor.get_sector_manager(warmup=False)
+    if video_info.frames <= 0 or fps <= 0:
+        raise ValueError(f"Не удалось определить длительность видео {args.video_path}")
+    frames_per_period, _ = period_frames(1 / fps, settings.observation_time)
+    bounds = segment_bounds(video_info.frames, args.workers, frames_per_period)
+    overlap_frames = round(args.overlap * fps)
+    logging.info(f"Видео {video_info.frames} кадров разбито на {len(bounds)} сегментов, перекрытие {overlap_frames} кадров")
+
+    start = time.perf_counter()
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(len(bounds), mp_context=context, initializer=init_worker,
+                             initargs=(args.threads_per_worker,)) as executor:
+        futures = [
+            executor.submit(process_segment, argv, index, segment_start, segment_end, overlap_frames)
+            for index, (segment_start, segment_end) in enumerate(bounds)
+        ]
+        for future in futures:
+            index, crossings, frames, core_frames, elapsed = future.result()
+            logging.info(f"Сегмент {index}: {frames} кадров за {elapsed:.1f} с ({frames / elapsed:.2f} FPS)")
+            results[index] = (crossings, frames, core_frames)
+    elapsed = time.perf_counter() - start
+
+    total_frames = sum(frames for _, frames, _ in results.values())
+    # Периоды нарезаются по фактически обработанным кадрам без прогрева, как при последовательной обработке
+    frame_count = sum(core_frames for _, _, core_frames in results.values())
+    duration = frame_count / fps
+    logging.info(f"Обработано {total_frames} кадров (с прогревом) за {elapsed:.1f} с: "
+                 f"{duration / elapsed:.2f}x реального времени, процессов: {len(bounds)}")
+
+    merge_segments(sector_manager, [results[index][0] for index in range(len(bounds))], frame_count)
+    create_stats_report(sector_manager, args.report_path)
+    logging.info(f"Отчет сохранён в {args.report_path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video-path", type=str, required=True, help="Путь к видео")
+    parser.add_argument("--model-path", type=str, required=True, help="Путь к модельке")
+    parser.add_argument("--report-path", type=str, required=True, help="Путь для выходного отчета")
+    parser.add_argument("--sector_path", type=str, required=True, help="Массив точек областей")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Кол-во сегментов (процессов)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="Кол-во потоков CPU на процесс")
+    parser.add_argument("--overlap", type=float, default=30, help="Перекрытие сегментов для прогрева трекера. В секундах")
+    args = parser.parse_args()
+
+    run_segments(args)
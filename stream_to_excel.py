@@ -0,0 +1,14 @@
+import argparse
+
+from data_manager.traffic_report import create_report_from_stream
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("stream_dir", help="Каталог потокового отчета (report-stream-format)")
+    parser.add_argument("report_path", help="Путь для xlsx отчета")
+
+    args = parser.parse_args()
+
+    create_report_from_stream(args.stream_dir, args.report_path)
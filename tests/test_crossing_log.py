@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from traffic_observer.crossing_log import CrossingLog, CROSSING_DTYPE
+from traffic_observer.period import Period
+
+VEHICLE_CLASSES = ["bus", "car", "truck"]
+
+
+def make_rows(count: int, first_id: int = 0) -> np.ndarray:
+    rows = np.zeros(count, dtype=CROSSING_DTYPE)
+    rows["track_id"] = np.arange(first_id, first_id + count)
+    rows["class_index"] = rows["track_id"] % len(VEHICLE_CLASSES)
+    rows["start_time"] = rows["track_id"] * 0.5
+    rows["end_time"] = rows["start_time"] + 7.0
+    rows["free_flow"] = rows["track_id"] % 2 == 0
+    return rows
+
+
+@pytest.fixture(params=["memory", "spill"])
+def crossings(request, tmp_path):
+    spill_path = str(tmp_path / "sector_1.crossings") if request.param == "spill" else None
+    return CrossingLog(VEHICLE_CLASSES, chunk_size=4, spill_path=spill_path)
+
+
+def test_append_grows_past_chunk_size(crossings):
+    rows = make_rows(21)
+    for row in rows:
+        crossings.append(*row.tolist())
+
+    assert len(crossings) == 21
+    assert len(crossings.data) >= 21
+    np.testing.assert_array_equal(crossings.view(), rows)
+    np.testing.assert_array_equal(crossings.view(5, 9), rows[5:9])
+
+
+def test_extend_keeps_earlier_rows(crossings):
+    first, second = make_rows(3), make_rows(10, first_id=3)
+    crossings.extend(first)
+    crossings.extend(second)
+    np.testing.assert_array_equal(crossings.view(), np.concatenate([first, second]))
+
+
+def test_spill_file_holds_rows(tmp_path):
+    path = tmp_path / "sector_1.crossings"
+    crossings = CrossingLog(VEHICLE_CLASSES, chunk_size=4, spill_path=str(path))
+    rows = make_rows(10)
+    crossings.extend(rows)
+    crossings.data.flush()
+
+    assert isinstance(crossings.data, np.memmap)
+    assert path.stat().st_size == len(crossings.data) * CROSSING_DTYPE.itemsize
+    np.testing.assert_array_equal(np.fromfile(path, dtype=CROSSING_DTYPE)[:10], rows)
+
+
+def test_clear_reuses_capacity(crossings):
+    crossings.extend(make_rows(9))
+    capacity = len(crossings.data)
+    crossings.clear()
+
+    assert len(crossings) == 0
+    assert len(crossings.view()) == 0
+    rows = make_rows(5, first_id=100)
+    crossings.extend(rows)
+    assert len(crossings.data) == capacity
+    np.testing.assert_array_equal(crossings.view(), rows)
+
+
+def test_period_views_log_range(crossings):
+    rows = make_rows(9)
+    crossings.extend(rows)
+    period = Period(crossings, 2, 6, 30.0)
+
+    assert period.classwise_traveled_count == {"bus": 1, "car": 1, "truck": 2}
+    assert period.ids_travel_time == {track_id: 7.0 for track_id in range(2, 6)}
+    assert set(period.free_travel_time) == {2, 4}
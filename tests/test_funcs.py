@@ -0,0 +1,70 @@
+import numpy as np
+
+from funcs import *
+
+VEHICLE_CLASSES = ["bus", "car", "truck"]
+SIZE_COEFFS = {"car": 1, "truck": 1.8, "bus": 2.2}
+
+# Периоды: кол-во по классам, (время проезда, свободный проезд) каждой машины, длина сектора, полос, время наблюдения
+PERIODS = [
+    ({"bus": 1, "car": 3, "truck": 0}, [(12.0, True), (15.5, False), (9.0, True), (30.0, False)], 0.2, 2, 30.0),
+    # Пустой период: средние и производные показатели - NaN
+    ({"bus": 0, "car": 0, "truck": 0}, [], 0.2, 2, 30.0),
+    # Нет свободных проездов: своб. время, задержка и временной индекс - NaN
+    ({"bus": 0, "car": 2, "truck": 1}, [(20.0, False), (25.0, False), (40.0, False)], 0.1, 1, 17.3),
+    # Неполный последний период
+    ({"bus": 0, "car": 1, "truck": 0}, [(8.0, True)], 0.35, 3, 4.2),
+]
+
+
+def scalar_stats(classwise, crossings, length, lanes, observation_time) -> list[float]:
+    # Поэлементный расчет функциями funcs.py, как до векторизации
+    travel = [travel_time for travel_time, _ in crossings]
+    free = [travel_time for travel_time, free_flow in crossings if free_flow]
+    return [
+        traffic_intensity(classwise, SIZE_COEFFS, observation_time),
+        mean_travel_time(travel),
+        mean_vehicle_speed(travel, length),
+        traffic_density(classwise, SIZE_COEFFS, travel, length, observation_time, lanes),
+        mean_free_time(free),
+        mean_vehicle_delay(travel, free),
+        time_index(travel, free),
+    ]
+
+
+def test_traffic_stats_arrays_matches_scalar_functions():
+    classwise_counts = np.array([[period[0][name] for name in VEHICLE_CLASSES] for period in PERIODS], dtype=float)
+    travel_times, travel_groups, free_times, free_groups = [], [], [], []
+    for group, (_, crossings, _, _, _) in enumerate(PERIODS):
+        for travel_time, free_flow in crossings:
+            travel_times.append(travel_time)
+            travel_groups.append(group)
+            if free_flow:
+                free_times.append(travel_time)
+                free_groups.append(group)
+
+    stats = traffic_stats_arrays(
+        classwise_counts,
+        np.array([SIZE_COEFFS[name] for name in VEHICLE_CLASSES], dtype=float),
+        np.array(travel_times),
+        np.array(travel_groups, dtype=int),
+        np.array(free_times),
+        np.array(free_groups, dtype=int),
+        np.array([period[2] for period in PERIODS], dtype=float),
+        np.array([period[3] for period in PERIODS], dtype=float),
+        np.array([period[4] for period in PERIODS], dtype=float),
+    )
+
+    names = ["intensity", "travel_time", "speed", "density", "free_time", "delay", "time_index"]
+    vectorized = np.column_stack([stats[name] for name in names])
+    reference = np.array([scalar_stats(*period) for period in PERIODS])
+    np.testing.assert_allclose(vectorized, reference, rtol=1e-12, equal_nan=True)
+
+    # NaN там же, где у поэлементного расчета
+    assert np.isnan(vectorized[1, 1:]).all() and vectorized[1, 0] == 0
+    assert np.isnan(vectorized[2, 4:]).all() and not np.isnan(vectorized[2, :4]).any()
+
+
+def test_grouped_mean_empty_groups():
+    means = grouped_mean(np.array([1.0, 3.0, 10.0]), np.array([0, 0, 2]), 4)
+    np.testing.assert_allclose(means, [2.0, np.nan, 10.0, np.nan], equal_nan=True)
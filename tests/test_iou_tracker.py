@@ -0,0 +1,98 @@
+import numpy as np
+
+from traffic_observer.iou_tracker import IouTracker, iou_matrix, greedy_match
+
+SIZE = 40
+SPEED = 5
+
+
+def box(x: float, y: float) -> list[float]:
+    return [x, y, x + SIZE, y + SIZE]
+
+
+def frame_detections(frame: int, rows=(0, 1), score: float = 0.9):
+    # Две машины в разных рядах едут вправо с постоянной скоростью
+    boxes = [box(10 + SPEED * frame, 100 + 200 * row) for row in rows]
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4), np.full(len(boxes), score), np.array(rows)
+
+
+def ids_by_row(result) -> dict[int, int]:
+    # id трека в каждом ряду по вертикали бокса
+    boxes, ids, _ = result
+    return {int(round((y1 - 100) / 200)): track_id for (_, y1, _, _), track_id in zip(boxes, ids)}
+
+
+def test_iou_matrix_and_greedy_match():
+    a = np.array([box(0, 0), box(100, 0)], dtype=np.float32)
+    b = np.array([box(100, 0), box(20, 0), box(500, 500)], dtype=np.float32)
+    iou = iou_matrix(a, b)
+    np.testing.assert_allclose(iou[0], [0.0, 1 / 3, 0.0], atol=1e-6)
+    np.testing.assert_allclose(iou[1], [1.0, 0.0, 0.0], atol=1e-6)
+
+    rows, cols = greedy_match(iou, 0.2)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 1), (1, 0)]
+
+
+def test_ids_stable_on_constant_motion():
+    tracker = IouTracker()
+    expected = None
+    for frame in range(60):
+        result = tracker.update(*frame_detections(frame))
+        assert result is not None
+        assert len(result[1]) == 2
+        if expected is None:
+            expected = ids_by_row(result)
+        assert ids_by_row(result) == expected
+    assert tracker.next_id == 3
+
+
+def test_id_kept_through_short_occlusion():
+    tracker = IouTracker(max_lost=10)
+    for frame in range(20):
+        first = ids_by_row(tracker.update(*frame_detections(frame)))
+
+    # Нижняя машина пропадает на 5 кадров и появляется там, где ее ожидает постоянная скорость
+    for frame in range(20, 25):
+        assert ids_by_row(tracker.update(*frame_detections(frame, rows=(0,)))) == {0: first[0]}
+    assert ids_by_row(tracker.update(*frame_detections(25))) == first
+
+
+def test_new_id_after_max_lost():
+    tracker = IouTracker(max_lost=3)
+    for frame in range(10):
+        first = ids_by_row(tracker.update(*frame_detections(frame)))
+    for frame in range(10, 15):
+        tracker.update(*frame_detections(frame, rows=(0,)))
+
+    # Трек удален: новый трек выдается со второго попадания
+    assert ids_by_row(tracker.update(*frame_detections(15))) == {0: first[0]}
+    second = ids_by_row(tracker.update(*frame_detections(16)))
+    assert second[0] == first[0]
+    assert second[1] not in first.values()
+
+
+def test_low_score_continues_but_does_not_start_tracks():
+    tracker = IouTracker()
+    for frame in range(5):
+        first = ids_by_row(tracker.update(*frame_detections(frame, rows=(0,))))
+    # Неуверенная детекция продолжает трек, но нового трека не начинает
+    boxes, _, classes = frame_detections(5)
+    result = tracker.update(boxes, np.array([0.3, 0.3]), classes)
+    assert ids_by_row(result) == first
+    assert tracker.next_id == 2
+
+
+def test_state_roundtrip_continues_identically():
+    reference = IouTracker()
+    restored = IouTracker()
+    for frame in range(15):
+        reference.update(*frame_detections(frame))
+        restored.update(*frame_detections(frame))
+
+    resumed = IouTracker()
+    resumed.load_state(restored.state())
+    for frame in range(15, 30):
+        expected = reference.update(*frame_detections(frame))
+        result = resumed.update(*frame_detections(frame))
+        assert result[1] == expected[1]
+        np.testing.assert_array_equal(result[0], expected[0])
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from traffic_observer.model_input import ModelInput
+
+FRAME_SIZE = (1280, 720)
+# Размер входа модели (высота, ширина), кратный 32, как у Detector
+IMGSIZE = (736, 1280)
+PAD_VALUE = 114
+
+
+def decoded_frame(size: tuple[int, int], rect_in_frame: tuple[int, int, int, int]) -> np.ndarray:
+    # Черный кадр размера size с белым прямоугольником, заданным в координатах кадра секторов
+    width, height = size
+    sx, sy = width / FRAME_SIZE[0], height / FRAME_SIZE[1]
+    x0, y0, x1, y1 = rect_in_frame
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[round(y0 * sy):round(y1 * sy), round(x0 * sx):round(x1 * sx)] = 255
+    return frame
+
+
+def input_rect(buffer: np.ndarray) -> np.ndarray:
+    # Бокс белого прямоугольника во входе модели
+    ys, xs = np.nonzero(buffer[:, :, 0] > 127)
+    return np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]], dtype=np.float32)
+
+
+@pytest.mark.parametrize("decoded_size", [(1920, 1080), (1280, 720), (640, 360)])
+def test_to_frame_maps_back_full_frame(decoded_size):
+    rect = (400, 200, 600, 300)
+    model_input = ModelInput(FRAME_SIZE, IMGSIZE)
+    buffer = model_input.prepare([decoded_frame(decoded_size, rect)])[0]
+
+    assert buffer.shape == (*IMGSIZE, 3)
+    # Letterbox 1280x720 во входе 1280x736: поля по 8 строк сверху и снизу
+    assert (buffer[:8] == PAD_VALUE).all() and (buffer[-8:] == PAD_VALUE).all()
+    np.testing.assert_allclose(model_input.to_frame(input_rect(buffer)), [rect], atol=2)
+
+
+def test_to_frame_maps_back_roi():
+    rect = (400, 200, 600, 300)
+    roi = (320, 160, 960, 480)
+    model_input = ModelInput(FRAME_SIZE, IMGSIZE, roi)
+    buffer = model_input.prepare([decoded_frame((1920, 1080), rect)])[0]
+
+    # Область 640x320 масштабируется до 1280x640, поля по 48 строк
+    assert model_input.target_rect == (0, 48, 1280, 688)
+    np.testing.assert_allclose(model_input.to_frame(input_rect(buffer)), [rect], atol=2)
+    # Углы входа без полей - углы области
+    np.testing.assert_allclose(
+        model_input.to_frame(np.array([[0, 48, 1280, 688]], dtype=np.float32)), [roi], atol=1e-3
+    )
+
+
+def test_prepare_reuses_buffers_and_resets_padding_on_geometry_change():
+    model_input = ModelInput(FRAME_SIZE, IMGSIZE)
+    first = model_input.prepare([decoded_frame((1920, 1080), (0, 0, 1280, 720))] * 2)
+    assert len(first) == 2 and first[0] is not first[1]
+
+    # Другие пропорции кадра: поля переходят в столбцы, строки полей прежней геометрии очищаются
+    square = np.full((720, 720, 3), 255, dtype=np.uint8)
+    second = model_input.prepare([square])
+    assert second[0] is first[0]
+    height, width = IMGSIZE
+    pad_x = (width - height) // 2
+    assert (second[0][:, :pad_x] == PAD_VALUE).all()
+    assert (second[0][:, pad_x:pad_x + height] == 255).all()
@@ -0,0 +1,57 @@
+import pytest
+
+from data_manager.report_sink import PeriodReportSink, read_stream
+
+
+def row(sector_number: int, period: int) -> dict:
+    return {"Интенсивность траффика": float(sector_number * 100 + period), "car": period}
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def stream_format(request):
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+    return request.param
+
+
+def write_periods(sink: PeriodReportSink, periods: dict[int, int]):
+    for sector_number, count in periods.items():
+        for period in range(count):
+            sink.write(sector_number, row(sector_number, period))
+
+
+def test_truncate_drops_periods_after_checkpoint(tmp_path, stream_format):
+    sink = PeriodReportSink(str(tmp_path), stream_format)
+    write_periods(sink, {1: 4, 2: 3})
+    sink.truncate({1: 2, 2: 3})
+
+    assert sink.periods_written == {1: 2, 2: 3}
+    sector_1, sector_2 = read_stream(str(tmp_path))
+    assert sector_1["car"].tolist() == [0, 1]
+    assert sector_2["car"].tolist() == [0, 1, 2]
+
+    # Периоды после контрольной точки записываются заново следом за оставшимися
+    sink.write(1, row(1, 2))
+    assert read_stream(str(tmp_path))[0]["car"].tolist() == [0, 1, 2]
+
+
+def test_truncate_missing_sector_removes_all_its_periods(tmp_path, stream_format):
+    sink = PeriodReportSink(str(tmp_path), stream_format)
+    write_periods(sink, {1: 2, 2: 2})
+    sink.truncate({1: 2})
+
+    assert sink.periods_written == {1: 2}
+    sector_1, sector_2 = read_stream(str(tmp_path))
+    assert len(sector_1) == 2 and len(sector_2) == 0
+
+
+def test_append_counts_written_periods(tmp_path, stream_format):
+    write_periods(PeriodReportSink(str(tmp_path), stream_format), {1: 3, 2: 1})
+
+    resumed = PeriodReportSink(str(tmp_path), stream_format, append=True)
+    assert resumed.periods_written == {1: 3, 2: 1}
+
+    # Без append отчет нового прогона перезаписывает предыдущий
+    fresh = PeriodReportSink(str(tmp_path), stream_format)
+    assert fresh.periods_written == {}
+    assert read_stream(str(tmp_path)) == []
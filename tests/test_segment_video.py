@@ -0,0 +1,77 @@
+import pandas as pd
+
+from benchmarks.common import (
+    SyntheticDetector, ReplayDetector, synthetic_sectors, record_detections, VEHICLE_CLASSES, VEHICLE_SIZE_COEFFS
+)
+from segment_video import period_frames, segment_bounds, start_segment, segment_crossings, merge_segments
+from traffic_observer.sector_manager import SectorManager
+from traffic_observer.step_timer import StepTimer
+
+FRAME_SIZE = (1280, 720)
+# Дробная частота: observation-time * fps не целое
+FPS = 29.97
+OBSERVATION_TIME = 2
+FRAMES = 1000
+# Больше максимального времени проезда синтетической машины (~325 кадров)
+OVERLAP_FRAMES = 400
+
+
+def make_sector_manager(detections) -> SectorManager:
+    width, height = FRAME_SIZE
+    return SectorManager(
+        synthetic_sectors(FRAME_SIZE, 2, 2),
+        VEHICLE_CLASSES,
+        1 / FPS,
+        OBSERVATION_TIME,
+        VEHICLE_SIZE_COEFFS,
+        (height, width),
+        None,
+        render=False,
+        detector=ReplayDetector(detections, dict(enumerate(VEHICLE_CLASSES)))
+    )
+
+
+def run_frames(sector_manager: SectorManager, frames: int):
+    for _ in range(frames):
+        sector_manager.update(None)
+
+
+def test_period_frames_match_step_timer():
+    frames, period_time = period_frames(1 / FPS, OBSERVATION_TIME)
+    timer = StepTimer(1 / FPS)
+    for _ in range(frames - 1):
+        timer.step_forward()
+    assert timer.time < OBSERVATION_TIME
+    timer.step_forward()
+    assert timer.time == period_time >= OBSERVATION_TIME
+
+
+def test_segmented_report_equals_serial():
+    detections = record_detections(SyntheticDetector(FRAME_SIZE, 4, 3, FPS, seed=1), FRAMES)
+
+    serial = make_sector_manager(detections)
+    run_frames(serial, FRAMES)
+    serial.new_period()
+
+    frames_per_period, _ = period_frames(1 / FPS, OBSERVATION_TIME)
+    segments_crossings = []
+    for index, (start, end) in enumerate(segment_bounds(FRAMES, 3, frames_per_period)):
+        warm_start = max(0, start - OVERLAP_FRAMES)
+        segment = make_sector_manager(detections[warm_start:])
+        start_segment(segment, warm_start)
+        run_frames(segment, (FRAMES if end is None else end) - warm_start)
+        segments_crossings.append(segment_crossings(segment, index, start, end))
+
+    merged = make_sector_manager(detections)
+    merge_segments(merged, segments_crossings, FRAMES)
+
+    assert sum(len(sector.crossings) for sector in serial.sectors) > 0
+    for serial_sector, merged_sector in zip(serial.sectors, merged.sectors):
+        assert [len(period.events) for period in merged_sector.periods_data] == \
+               [len(period.events) for period in serial_sector.periods_data]
+        assert [period.observation_time for period in merged_sector.periods_data] == \
+               [period.observation_time for period in serial_sector.periods_data]
+    for serial_stats, merged_stats in zip(serial.traffic_stats(), merged.traffic_stats()):
+        pd.testing.assert_frame_equal(merged_stats, serial_stats)
+    for serial_counts, merged_counts in zip(serial.classwise_stats(), merged.classwise_stats()):
+        pd.testing.assert_frame_equal(merged_counts, serial_counts)
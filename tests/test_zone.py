@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+import pytest
+
+from traffic_observer.zone import Zone, ZoneIndex, box_centers, classify_centers
+
+POLYGONS = [
+    # Прямоугольник
+    [[10, 10], [60, 10], [60, 40], [10, 40]],
+    # Треугольник с пологими наклонными ребрами
+    [[5, 5], [80, 20], [30, 50]],
+    # Невыпуклый многоугольник
+    [[0, 0], [50, 0], [50, 50], [30, 50], [30, 20], [20, 20], [20, 50], [0, 50]],
+    # Четырехугольник общего вида, как стартовые регионы и полосы в regions.json
+    [[12, 3], [71, 9], [64, 44], [7, 31]],
+]
+
+
+def point_polygon_test(points, centers: np.ndarray) -> np.ndarray:
+    # Проверка до предварительной растеризации: pointPolygonTest на каждую точку
+    polygon = np.array(points, dtype=np.int32)
+    return np.array([cv2.pointPolygonTest(polygon, (int(x), int(y)), False) >= 0 for x, y in centers])
+
+
+def grid_around(points, margin: int = 3) -> np.ndarray:
+    polygon = np.array(points)
+    xs = np.arange(polygon[:, 0].min() - margin, polygon[:, 0].max() + margin + 1)
+    ys = np.arange(polygon[:, 1].min() - margin, polygon[:, 1].max() + margin + 1)
+    return np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2).astype(np.int32)
+
+
+@pytest.mark.parametrize("points", POLYGONS)
+def test_contains_many_matches_point_polygon_test(points):
+    zone = Zone(points)
+    centers = grid_around(points)
+    np.testing.assert_array_equal(zone.contains_many(centers), point_polygon_test(points, centers))
+
+
+@pytest.mark.parametrize("points", POLYGONS)
+def test_contains_matches_contains_many(points):
+    zone = Zone(points)
+    centers = grid_around(points)
+    expected = zone.contains_many(centers)
+    assert [zone.contains((int(x), int(y))) for x, y in centers] == expected.tolist()
+
+
+def test_classify_centers_all_zones():
+    zones = [Zone(points) for points in POLYGONS]
+    centers = np.random.default_rng(0).integers(-5, 90, size=(500, 2)).astype(np.int32)
+    result = classify_centers(zones, centers)
+    assert result.shape == (len(zones), len(centers))
+    for i, points in enumerate(POLYGONS):
+        np.testing.assert_array_equal(result[i], point_polygon_test(points, centers))
+
+
+def test_box_centers_truncate_like_int():
+    boxes = np.array([[10.2, 20.9, 31.7, 40.4], [0.0, 0.0, 1.0, 3.0], [5.5, 6.5, 5.5, 6.5]], dtype=np.float32)
+    expected = [[int((x1 + x2) / 2), int((y1 + y2) / 2)] for x1, y1, x2, y2 in boxes]
+    assert box_centers(boxes).tolist() == expected
+    assert box_centers(np.empty((0, 4))).shape == (0, 2)
+
+
+@pytest.mark.parametrize("cell_size", [8, 16, 64])
+def test_zone_index_matches_point_polygon_test(cell_size):
+    # Зона, выходящая за край кадра, и центры за пределами кадра
+    polygons = POLYGONS + [[[-10, 60], [40, 55], [45, 90], [-5, 95]]]
+    zones = [Zone(points) for points in polygons]
+    index = ZoneIndex(zones, (85, 80), cell_size)
+    centers = np.random.default_rng(1).integers(-15, 100, size=(2000, 2)).astype(np.int32)
+
+    # Боксы модели не выходят за кадр: центры вне кадра индекс не относит ни к одной зоне
+    in_frame = (centers[:, 0] < 85) & (centers[:, 1] < 80) & (centers >= 0).all(axis=1)
+    result = index.classify(centers)
+    np.testing.assert_array_equal(result, classify_centers(zones, centers) & in_frame)
+    for i, points in enumerate(polygons):
+        np.testing.assert_array_equal(result[i], point_polygon_test(points, centers) & in_frame)
+    assert 0 < index.tests <= len(zones) * len(centers)
+
+
+def test_zone_index_without_centers():
+    index = ZoneIndex([Zone(points) for points in POLYGONS], (85, 80))
+    assert index.classify(np.empty((0, 2), dtype=np.int32)).shape == (len(POLYGONS), 0)
+    assert index.tests == 0
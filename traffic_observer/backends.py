@@ -0,0 +1,96 @@
+import hashlib
+import logging
+import os
+import shutil
+
+from ultralytics import YOLO
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class InferenceBackend:
+    '''
+    Бэкенд инференса ultralytics-модели. Базовый класс - PyTorch (.pt загружается как есть).
+    Наследники экспортируют .pt в свой формат один раз: экспорт кэшируется в
+    cache_dir/<хэш модели>_<высота>x<ширина>[_dynamic]/, так как размер входа экспортированной модели фиксирован.
+    При batch_size > 1 экспорт делается с динамическими размерностями (dynamic): граф с пакетом 1
+    не принимает пакеты кадров, а последний пакет видео может быть неполным.
+    '''
+
+    name = "torch"
+    # Устройство инференса: бэкенды сравниваются на CPU, поэтому PyTorch не переходит на CUDA сам
+    device = "cpu"
+    # Формат ultralytics export и имя результата экспорта model.pt
+    export_format: str|None = None
+    exported_name: str|None = None
+
+    def __init__(self, model_path: str, cache_dir: str, batch_size: int = 1):
+        self.model_path = model_path
+        self.cache_dir = cache_dir
+        self.dynamic = batch_size > 1
+        self.__class_names = None
+
+    @property
+    def class_names(self) -> dict[int, str]:
+        if self.__class_names is None:
+            self.__class_names = YOLO(self.model_path).names
+        return self.__class_names
+
+    def load_model(self, imgsize: tuple[int, int]):
+        return YOLO(self.model_path)
+
+    def exported_path(self, imgsize: tuple[int, int]) -> str:
+        # Уже экспортированная модель (например, каталог OpenVINO) используется напрямую
+        if not self.model_path.endswith(".pt"):
+            if self.dynamic:
+                logging.warning(f"Пакетная детекция с готовой моделью {self.model_path} работает, только если она "
+                                f"экспортирована с dynamic=True")
+            return self.model_path
+
+        height, width = imgsize
+        suffix = "_dynamic" if self.dynamic else ""
+        model_dir = os.path.join(self.cache_dir, f"{file_hash(self.model_path)[:16]}_{height}x{width}{suffix}")
+        exported = os.path.join(model_dir, self.exported_name)
+        if os.path.exists(exported):
+            logging.info(f"Используется кэшированный экспорт {self.name}: {exported}")
+            return exported
+
+        logging.info(f"Экспорт модели {self.model_path} в {self.name} для размера {width}x{height}...")
+        os.makedirs(model_dir, exist_ok=True)
+        source = os.path.join(model_dir, "model.pt")
+        shutil.copyfile(self.model_path, source)
+        YOLO(source).export(format=self.export_format, imgsz=imgsize, dynamic=self.dynamic)
+        return exported
+
+
+class OnnxBackend(InferenceBackend):
+    name = "onnx"
+    export_format = "onnx"
+    exported_name = "model.onnx"
+
+    def load_model(self, imgsize: tuple[int, int]):
+        return YOLO(self.exported_path(imgsize), task="detect")
+
+
+class OpenVinoBackend(InferenceBackend):
+    name = "openvino"
+    export_format = "openvino"
+    exported_name = "model_openvino_model"
+
+    def load_model(self, imgsize: tuple[int, int]):
+        return YOLO(self.exported_path(imgsize), task="detect")
+
+
+BACKENDS = {backend.name: backend for backend in (InferenceBackend, OnnxBackend, OpenVinoBackend)}
+
+
+def create_backend(name: str, model_path: str, cache_dir: str, batch_size: int = 1) -> InferenceBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд инференса: {name}. Доступны: {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_path, cache_dir, batch_size)
@@ -0,0 +1,55 @@
+import os
+import pickle
+import logging
+
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_path_for(report_path: str) -> str:
+    # Контрольная точка рядом с отчетом: output/traffic-stats.xlsx -> output/traffic-stats.checkpoint
+    return os.path.splitext(report_path)[0] + ".checkpoint"
+
+
+def resumed_output_path(output_path: str) -> str:
+    # Видео после продолжения пишется в новый файл, уже записанная часть не перезаписывается:
+    # output/video.mp4 -> output/video_resume_1.mp4 (первый свободный номер)
+    stem, extension = os.path.splitext(output_path)
+    number = 1
+    while os.path.exists(f"{stem}_resume_{number}{extension}"):
+        number += 1
+    return f"{stem}_resume_{number}{extension}"
+
+
+class Checkpointer:
+    '''
+    Сохранение состояния SectorManager (сектора, журналы проездов, таймер, номер кадра, трекер)
+    не реже чем раз в interval_frames кадров. Файл сначала пишется во временный и затем атомарно заменяет
+    предыдущий, поэтому сбой во время записи не портит последнюю контрольную точку.
+    '''
+
+    def __init__(self, path: str, interval_frames: int):
+        self.path = path
+        self.interval_frames = max(1, interval_frames)
+        self.saved_frame_index = 0
+
+    def on_frames(self, sector_manager):
+        # Вызывается после обработки кадра или пакета кадров
+        if sector_manager.frame_index - self.saved_frame_index >= self.interval_frames:
+            self.save(sector_manager)
+
+    def save(self, sector_manager):
+        state = {"version": CHECKPOINT_VERSION, "sector_manager": sector_manager.state()}
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+        self.saved_frame_index = sector_manager.frame_index
+        logging.info(f"Контрольная точка сохранена: кадр {sector_manager.frame_index}")
+
+
+def load_checkpoint(path: str) -> dict:
+    with open(path, "rb") as file:
+        state = pickle.load(file)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия контрольной точки {path}: {state.get('version')}")
+    return state["sector_manager"]
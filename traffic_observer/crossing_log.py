@@ -0,0 +1,71 @@
+import numpy as np
+
+# Одна запись на завершенный проезд сектора
+CROSSING_DTYPE = np.dtype([
+    ("track_id", np.int64),
+    ("class_index", np.int16),
+    ("start_time", np.float64),
+    ("end_time", np.float64),
+    ("free_flow", np.bool_),
+])
+
+
+class CrossingLog:
+    '''
+    Столбцовый журнал проездов сектора в структурированном массиве NumPy.
+    Емкость растет блоками по chunk_size записей (с удвоением), при заданном spill_path
+    журнал хранится в файле, отображенном в память (np.memmap), и не занимает RAM процесса.
+    class_index - номер класса в vehicle_classes.
+    '''
+
+    def __init__(self, vehicle_classes, chunk_size: int = 4096, spill_path: str|None = None):
+        self.vehicle_classes = list(vehicle_classes)
+        self.chunk_size = chunk_size
+        self.spill_path = spill_path
+        self.size = 0
+        self.data = self.__allocate(chunk_size)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, track_id: int, class_index: int, start_time: float, end_time: float, free_flow: bool):
+        if self.size == len(self.data):
+            self.__grow()
+        self.data[self.size] = (track_id, class_index, start_time, end_time, free_flow)
+        self.size += 1
+
+    def extend(self, rows: np.ndarray):
+        required = self.size + len(rows)
+        while required > len(self.data):
+            self.__grow()
+        self.data[self.size:required] = rows
+        self.size = required
+
+    def clear(self):
+        # Записи отбрасываются, выделенная емкость (или файл) используется повторно
+        self.size = 0
+
+    def view(self, first: int = 0, last: int|None = None) -> np.ndarray:
+        last = self.size if last is None else last
+        return self.data[first:last]
+
+    def __grow(self):
+        capacity = len(self.data)
+        new_capacity = capacity + max(self.chunk_size, capacity // self.chunk_size * self.chunk_size)
+        if self.spill_path is None:
+            data = np.empty(new_capacity, dtype=CROSSING_DTYPE)
+            data[:self.size] = self.data[:self.size]
+            self.data = data
+        else:
+            self.data.flush()
+            self.data = self.__allocate(new_capacity, resize=True)
+
+    def __allocate(self, capacity: int, resize: bool = False) -> np.ndarray:
+        if self.spill_path is None:
+            return np.empty(capacity, dtype=CROSSING_DTYPE)
+        if resize:
+            # Файл увеличивается, уже записанные данные остаются на месте
+            with open(self.spill_path, "r+b") as file:
+                file.truncate(capacity * CROSSING_DTYPE.itemsize)
+            return np.memmap(self.spill_path, dtype=CROSSING_DTYPE, mode="r+", shape=(capacity,))
+        return np.memmap(self.spill_path, dtype=CROSSING_DTYPE, mode="w+", shape=(capacity,))
@@ -1,22 +1,301 @@
+import time
+import pickle
+import logging
+
+import numpy as np
+
+from ultralytics.trackers import register_tracker
+from ultralytics.trackers.basetrack import BaseTrack
+
+from traffic_observer.backends import InferenceBackend
+from traffic_observer.iou_tracker import IouTracker
+from traffic_observer.model_input import ModelInput
+
+
 class Detector():
-    def __init__(self, model, imgsize):
+    def __init__(
+            self,
+            model,
+            imgsize,
+            stride: int = 1,
+            backend: InferenceBackend|None = None,
+            tracker: IouTracker|None = None
+    ):
+        # Без model модель загружается бэкендом при прогреве, когда imgsize (с учетом области) известен
         self.model = model
+        # Собственный трекер поверх детекций model.predict; None - трекер ultralytics (model.track)
+        self.tracker = tracker
+        self.backend = backend
+        self.backend_name = backend.name if backend is not None else InferenceBackend.name
+        # Параметры каждого вызова модели; устройство задает бэкенд
+        self.predict_kwargs = {"device": backend.device} if backend is not None else {}
+        # Без model имена классов читаются из модели при первом обращении
+        self.__class_names = model.names if model is not None else None
+
+        # Время запуска (загрузка, экспорт, прогрев) и установившаяся скорость инференса
+        self.startup_time = 0.0
+        self.inference_seconds = 0.0
+        self.inference_frames = 0
 
         # Изменение размера изображения до кратного 32
         height, width = imgsize
+        self.frame_size = (width, height)
         adjusted_width = (width + 32 - 1) // 32 * 32
         adjusted_height = (height + 32 - 1) // 32 * 32
         self.imgsize = (adjusted_height, adjusted_width)
 
+        # Инференс выполняется на каждом stride-м кадре, остальные кадры интерполируются
+        self.stride = max(1, stride)
+        self.frame_index = 0
+        self.__last_result = None
+        self.__velocities = None
+        self.__frames_since_inference = 0
+
+        # Область кадра (x0, y0, x1, y1), в которой выполняется инференс; None - весь кадр
+        self.roi = None
+
+        # Запись результата track каждого кадра (TrackCacheWriter) для повторного анализа без инференса
+        self.recorder = None
+
+        # Проверка движения в секторах перед инференсом (MotionGate); None - инференс всегда
+        self.motion_gate = None
+
+        # Масштабирование декодированного кадра сразу во вход модели (ModelInput); None - кадр передается модели как есть
+        self.model_input = None
+
+    @property
+    def class_names(self) -> dict[int, str]:
+        if self.__class_names is None:
+            self.__class_names = self.backend.class_names
+        return self.__class_names
+
+    def set_roi(self, roi: tuple[int, int, int, int]):
+        self.roi = roi
+        x0, y0, x1, y1 = roi
+        self.imgsize = ((y1 - y0 + 32 - 1) // 32 * 32, (x1 - x0 + 32 - 1) // 32 * 32)
+        if self.model_input is not None:
+            self.enable_single_resize()
+
+    def enable_single_resize(self):
+        # Кадры могут приходить в любом разрешении с пропорциями frame_size; боксы - в координатах frame_size
+        self.model_input = ModelInput(self.frame_size, self.imgsize, self.roi)
+
+    def warmup(self, frames: int = 3):
+        start = time.perf_counter()
+        if self.model is None:
+            self.model = self.backend.load_model(self.imgsize)
+        loaded = time.perf_counter()
+
+        # Прогон пустых кадров до первого реального кадра
+        dummy = np.zeros((*self.imgsize, 3), dtype=np.uint8)
+        for _ in range(frames):
+            self.model.predict(dummy, imgsz=self.imgsize, **self.predict_kwargs)
+
+        self.startup_time = time.perf_counter() - start
+        logging.info(f"Бэкенд {self.backend_name}: запуск {self.startup_time:.2f} с "
+                     f"(загрузка {loaded - start:.2f} с, прогрев {frames} кадров {self.startup_time - (loaded - start):.2f} с)")
+
+    def inference_fps(self) -> float:
+        return self.inference_frames / self.inference_seconds if self.inference_seconds > 0 else 0.0
+
+    def log_stats(self):
+        logging.info(f"Бэкенд {self.backend_name}: запуск {self.startup_time:.2f} с, "
+                     f"инференс {self.inference_fps():.2f} FPS ({self.inference_frames} кадров)")
+        if self.motion_gate is not None:
+            logging.info(f"Без движения пропущено {self.motion_gate.frames_skipped} из {self.motion_gate.frames_checked} "
+                         f"инференсов ({self.motion_gate.skipped_share() * 100:.1f}%)")
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def state(self) -> dict:
+        return {
+            "frame_index": self.frame_index,
+            "last_result": self.__last_result,
+            "velocities": self.__velocities,
+            "frames_since_inference": self.__frames_since_inference,
+            "tracker": self.tracker.state() if self.tracker is not None else self.__tracker_state(),
+            "motion_gate": self.motion_gate.state() if self.motion_gate is not None else None,
+        }
+
+    def load_state(self, state: dict):
+        self.frame_index = state["frame_index"]
+        self.__last_result = state["last_result"]
+        self.__velocities = state["velocities"]
+        self.__frames_since_inference = state["frames_since_inference"]
+        if self.tracker is not None:
+            self.tracker.load_state(state["tracker"])
+        elif state["tracker"] is not None:
+            self.__load_tracker_state(state["tracker"])
+        if self.motion_gate is not None and state.get("motion_gate") is not None:
+            self.motion_gate.load_state(state["motion_gate"])
+
+    def __tracker_state(self):
+        # Трекеры ultralytics хранятся в предикторе модели, счетчик id треков - в BaseTrack
+        trackers = getattr(getattr(self.model, "predictor", None), "trackers", None)
+        if trackers is None:
+            return None
+        try:
+            return {"trackers": pickle.dumps(trackers), "track_count": BaseTrack._count}
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logging.warning(f"Состояние трекера не сохранено, после продолжения id треков начнутся заново: {e}")
+            return None
+
+    def __load_tracker_state(self, state: dict):
+        if self.model is None:
+            self.warmup(0)
+        if self.model.predictor is None:
+            # Предиктор создается первым прогоном модели; трекер в нем не участвует
+            self.model.predict(
+                np.zeros((*self.imgsize, 3), dtype=np.uint8), imgsz=self.imgsize, verbose=False, **self.predict_kwargs
+            )
+        if not hasattr(self.model.predictor, "trackers"):
+            # Колбэки трекинга регистрируются так же, как при первом model.track
+            register_tracker(self.model, persist=True)
+        self.model.predictor.trackers = pickle.loads(state["trackers"])
+        BaseTrack._count = state["track_count"]
+
     def track(
         self,
         frame: tuple,
     ):
-        track_results = self.model.track(frame, persist=True, imgsz=self.imgsize)
-        if track_results[0].boxes.id is not None:
-            boxes = track_results[0].boxes.xyxy.cpu()
-            track_ids = track_results[0].boxes.id.int().cpu().tolist()
-            classes = track_results[0].boxes.cls.cpu().tolist()
+        if self.frame_index % self.stride == 0:
+            if self.__has_motion(frame):
+                result = self.__track_model(frame)
+                self.__update_motion(result)
+            else:
+                result = self.__hold()
+        else:
+            result = self.__predict()
+        self.frame_index += 1
+        if self.recorder is not None:
+            self.recorder.append(result)
+        return result
+
+    def track_batch(self, frames: list) -> list:
+        '''
+        Трекинг последовательных кадров одним пакетом: детекция выполняется на всех кадрах
+        пакета (с учетом stride) за один вызов модели, трекер обновляется по кадрам в исходном
+        порядке, поэтому id треков те же, что при покадровом track.
+        '''
+
+        # Проверка движения идет по кадрам в исходном порядке, до пакетного инференса
+        run_model = [
+            (self.frame_index + i) % self.stride == 0 and self.__has_motion(frame) for i, frame in enumerate(frames)
+        ]
+        inference_frames = [frame for frame, run in zip(frames, run_model) if run]
+        model_results = iter(self.__track_model_batch(inference_frames)) if inference_frames else iter(())
+
+        results = []
+        for run in run_model:
+            if run:
+                result = next(model_results)
+                self.__update_motion(result)
+            elif self.frame_index % self.stride == 0:
+                result = self.__hold()
+            else:
+                result = self.__predict()
+            results.append(result)
+            self.frame_index += 1
+            if self.recorder is not None:
+                self.recorder.append(result)
+        return results
+
+    def __track_model(self, frame):
+        return self.__track_model_batch([frame])[0]
+
+    def __track_model_batch(self, frames: list) -> list:
+        if self.model is None:
+            self.warmup(0)
+        start = time.perf_counter()
+        if self.model_input is not None:
+            # Область инференса учитывается при масштабировании
+            frames = self.model_input.prepare(frames)
+        elif self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            frames = [frame[y0:y1, x0:x1] for frame in frames]
+        # Для списка кадров ultralytics выполняет один прямой проход модели на пакет,
+        # а трекер с persist=True обновляется кадр за кадром
+        source = frames[0] if len(frames) == 1 else frames
+        if self.tracker is not None:
+            # Неуверенные детекции нужны трекеру для второго этапа сопоставления
+            predict_results = self.model.predict(
+                source, imgsz=self.imgsize, conf=self.tracker.low_threshold, verbose=False, **self.predict_kwargs
+            )
+            self.inference_seconds += time.perf_counter() - start
+            self.inference_frames += len(frames)
+            return [self.__update_tracker(predict_result) for predict_result in predict_results]
+        track_results = self.model.track(source, persist=True, imgsz=self.imgsize, **self.predict_kwargs)
+        self.inference_seconds += time.perf_counter() - start
+        self.inference_frames += len(frames)
+        return [self.__parse_result(track_result) for track_result in track_results]
+
+    def __update_tracker(self, predict_result):
+        boxes = self.__to_frame(predict_result.boxes.xyxy.cpu().numpy())
+        scores = predict_result.boxes.conf.cpu().numpy()
+        classes = predict_result.boxes.cls.cpu().numpy()
+        return self.tracker.update(boxes, scores, classes)
+
+    def __parse_result(self, track_result):
+        if track_result.boxes.id is not None:
+            boxes = self.__to_frame(track_result.boxes.xyxy.cpu().numpy())
+            track_ids = track_result.boxes.id.int().cpu().tolist()
+            classes = track_result.boxes.cls.cpu().tolist()
             return boxes, track_ids, classes
         else:
             return None
+
+    def __to_frame(self, boxes: np.ndarray) -> np.ndarray:
+        if self.model_input is not None:
+            return self.model_input.to_frame(boxes)
+        if self.roi is not None:
+            # Перевод боксов из координат области в координаты кадра
+            x0, y0, _, _ = self.roi
+            boxes += np.array([x0, y0, x0, y0], dtype=boxes.dtype)
+        return boxes
+
+    def __update_motion(self, result):
+        # Скорость бокса (пикселей за кадр) по двум последним инференсам одного трека
+        frames_passed = self.__frames_since_inference + 1
+        self.__frames_since_inference = 0
+
+        if result is None:
+            self.__last_result = None
+            self.__velocities = None
+            return
+
+        boxes, track_ids, _ = result
+        velocities = np.zeros_like(boxes)
+        if self.__last_result is not None:
+            last_boxes, last_ids, _ = self.__last_result
+            last_index = {track_id: i for i, track_id in enumerate(last_ids)}
+            for i, track_id in enumerate(track_ids):
+                j = last_index.get(track_id)
+                if j is not None:
+                    velocities[i] = (boxes[i] - last_boxes[j]) / frames_passed
+
+        self.__last_result = result
+        self.__velocities = velocities
+
+    def __has_motion(self, frame) -> bool:
+        return self.motion_gate is None or self.motion_gate.has_motion(frame)
+
+    def __hold(self):
+        # Движения в секторах нет: треки остаются на месте, трекер модели не вызывается
+        self.__frames_since_inference += 1
+        if self.__last_result is None:
+            return None
+        self.__velocities = np.zeros_like(self.__velocities)
+        return self.__last_result
+
+    def __predict(self):
+        # Предсказание боксов на пропущенном кадре по последним трекам (постоянная скорость)
+        self.__frames_since_inference += 1
+        if self.__last_result is None:
+            return None
+
+        boxes, track_ids, classes = self.__last_result
+        predicted = boxes + self.__velocities * self.__frames_since_inference
+        return predicted, track_ids, classes
@@ -0,0 +1,135 @@
+import numpy as np
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    ''' IoU всех пар боксов xyxy: массив (len(boxes_a), len(boxes_b)) '''
+
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+
+def greedy_match(iou: np.ndarray, threshold: float) -> tuple[np.ndarray, np.ndarray]:
+    # Пары (строка, столбец) по убыванию IoU, каждая строка и столбец - не больше одного раза
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    used_rows = np.zeros(iou.shape[0], dtype=bool)
+    used_cols = np.zeros(iou.shape[1], dtype=bool)
+    matched_rows, matched_cols = [], []
+    for row, col in zip(rows[order], cols[order]):
+        if used_rows[row] or used_cols[col]:
+            continue
+        used_rows[row] = used_cols[col] = True
+        matched_rows.append(row)
+        matched_cols.append(col)
+    return np.array(matched_rows, dtype=np.int64), np.array(matched_cols, dtype=np.int64)
+
+
+class IouTracker:
+    '''
+    Трекер в духе ByteTrack на массивах NumPy, не зависящий от модели:
+    на вход - детекции кадра (боксы xyxy, уверенности, классы), на выход - боксы, id и классы треков.
+    Сначала уверенные детекции сопоставляются со всеми треками по IoU с предсказанным
+    (постоянная скорость) боксом, затем неуверенные - с оставшимися треками.
+    Несопоставленные уверенные детекции начинают новые треки, трек удаляется после max_lost кадров без детекций.
+    Трек выдается со второго попадания (min_hits), кроме треков первого кадра.
+    '''
+
+    def __init__(
+            self,
+            high_threshold: float = 0.5,
+            low_threshold: float = 0.1,
+            new_track_threshold: float = 0.6,
+            match_iou: float = 0.2,
+            max_lost: int = 30,
+            min_hits: int = 2
+    ):
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.new_track_threshold = new_track_threshold
+        self.match_iou = match_iou
+        self.max_lost = max_lost
+        self.min_hits = min_hits
+
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.velocities = np.empty((0, 4), dtype=np.float32)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.classes = np.empty(0, dtype=np.int64)
+        self.hits = np.empty(0, dtype=np.int64)
+        self.lost = np.empty(0, dtype=np.int64)
+        self.next_id = 1
+        self.frame_count = 0
+
+    def update(self, boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray):
+        self.frame_count += 1
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float32)
+        classes = np.asarray(classes, dtype=np.int64)
+
+        predicted = self.boxes + self.velocities * (self.lost[:, None] + 1)
+        track_free = np.ones(len(self.ids), dtype=bool)
+        det_free = np.ones(len(boxes), dtype=bool)
+        matched_tracks, matched_dets = [], []
+
+        # Сначала уверенные детекции, затем неуверенные - только с оставшимися треками
+        for det_mask in (scores >= self.high_threshold, (scores >= self.low_threshold) & (scores < self.high_threshold)):
+            dets = np.flatnonzero(det_mask)
+            tracks = np.flatnonzero(track_free)
+            if len(dets) == 0 or len(tracks) == 0:
+                continue
+            rows, cols = greedy_match(iou_matrix(predicted[tracks], boxes[dets]), self.match_iou)
+            track_free[tracks[rows]] = False
+            det_free[dets[cols]] = False
+            matched_tracks.append(tracks[rows])
+            matched_dets.append(dets[cols])
+
+        if matched_tracks:
+            tracks = np.concatenate(matched_tracks)
+            dets = np.concatenate(matched_dets)
+            step = (boxes[dets] - self.boxes[tracks]) / (self.lost[tracks, None] + 1)
+            self.velocities[tracks] = 0.5 * self.velocities[tracks] + 0.5 * step
+            self.boxes[tracks] = boxes[dets]
+            self.classes[tracks] = classes[dets]
+            self.hits[tracks] += 1
+            self.lost[tracks] = 0
+        self.lost[track_free] += 1
+
+        # Новые треки из несопоставленных уверенных детекций
+        new = np.flatnonzero(det_free & (scores >= self.new_track_threshold))
+        first_frame = self.frame_count == 1
+        self.boxes = np.concatenate([self.boxes, boxes[new]])
+        self.velocities = np.concatenate([self.velocities, np.zeros((len(new), 4), dtype=np.float32)])
+        self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + len(new))])
+        self.classes = np.concatenate([self.classes, classes[new]])
+        self.hits = np.concatenate([self.hits, np.full(len(new), self.min_hits if first_frame else 1)])
+        self.lost = np.concatenate([self.lost, np.zeros(len(new), dtype=np.int64)])
+        self.next_id += len(new)
+
+        keep = self.lost <= self.max_lost
+        if not keep.all():
+            self.boxes, self.velocities = self.boxes[keep], self.velocities[keep]
+            self.ids, self.classes = self.ids[keep], self.classes[keep]
+            self.hits, self.lost = self.hits[keep], self.lost[keep]
+
+        visible = (self.lost == 0) & (self.hits >= self.min_hits)
+        if not visible.any():
+            return None
+        return self.boxes[visible].copy(), self.ids[visible].tolist(), self.classes[visible].tolist()
+
+    def state(self) -> dict:
+        return {
+            "boxes": self.boxes, "velocities": self.velocities, "ids": self.ids, "classes": self.classes,
+            "hits": self.hits, "lost": self.lost, "next_id": self.next_id, "frame_count": self.frame_count,
+        }
+
+    def load_state(self, state: dict):
+        self.boxes, self.velocities = state["boxes"], state["velocities"]
+        self.ids, self.classes = state["ids"], state["classes"]
+        self.hits, self.lost = state["hits"], state["lost"]
+        self.next_id, self.frame_count = state["next_id"], state["frame_count"]
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+
+# Цвет полей letterbox, как в ultralytics
+_PAD_VALUE = 114
+
+
+class ModelInput:
+    '''
+    Подготовка входа модели одним масштабированием: декодированный кадр любого размера (или его часть,
+    соответствующая области инференса) масштабируется сразу в буфер размера imgsize с полями letterbox,
+    без промежуточного кадра target-width x target-height. ultralytics получает изображение
+    ровно размера входа и повторно его не масштабирует.
+    Боксы модели переводятся в координаты секторов (frame_size) аналитически: box * scale + offset.
+    '''
+
+    def __init__(self, frame_size: tuple[int, int], imgsize: tuple[int, int], roi: tuple[int, int, int, int]|None = None):
+        self.frame_size = frame_size
+        self.imgsize = imgsize
+        width, height = frame_size
+        self.roi = roi if roi is not None else (0, 0, width, height)
+
+        # Буферы входа по одному на кадр пакета; поля заполняются только при смене геометрии
+        self.buffers: list[np.ndarray] = []
+        self.source_shape = None
+        self.source_rect = None
+        self.target_rect = None
+        self.scale = None
+        self.offset = None
+
+    def prepare(self, frames: list) -> list[np.ndarray]:
+        while len(self.buffers) < len(frames):
+            self.buffers.append(np.full((*self.imgsize, 3), _PAD_VALUE, dtype=np.uint8))
+        inputs = []
+        for frame, buffer in zip(frames, self.buffers):
+            if frame.shape[:2] != self.source_shape:
+                self.__set_geometry(frame.shape[:2])
+            sx0, sy0, sx1, sy1 = self.source_rect
+            tx0, ty0, tx1, ty1 = self.target_rect
+            source = frame[sy0:sy1, sx0:sx1]
+            target = buffer[ty0:ty1, tx0:tx1]
+            if source.shape == target.shape:
+                target[...] = source
+            else:
+                cv2.resize(source, (tx1 - tx0, ty1 - ty0), dst=target, interpolation=cv2.INTER_LINEAR)
+            inputs.append(buffer)
+        return inputs
+
+    def to_frame(self, boxes: np.ndarray) -> np.ndarray:
+        # Боксы xyxy во входе модели -> координаты кадра секторов
+        return boxes * self.scale.astype(boxes.dtype) + self.offset.astype(boxes.dtype)
+
+    def __set_geometry(self, source_shape: tuple[int, int]):
+        source_height, source_width = source_shape
+        width, height = self.frame_size
+        sx, sy = source_width / width, source_height / height
+
+        # Область инференса в координатах декодированного кадра
+        x0, y0, x1, y1 = self.roi
+        sx0, sy0 = int(round(x0 * sx)), int(round(y0 * sy))
+        sx1, sy1 = int(round(x1 * sx)), int(round(y1 * sy))
+        rect_width, rect_height = sx1 - sx0, sy1 - sy0
+
+        # Letterbox: масштаб с сохранением пропорций, поля поровну с двух сторон
+        input_height, input_width = self.imgsize
+        ratio = min(input_width / rect_width, input_height / rect_height)
+        new_width = min(input_width, int(round(rect_width * ratio)))
+        new_height = min(input_height, int(round(rect_height * ratio)))
+        pad_x = (input_width - new_width) // 2
+        pad_y = (input_height - new_height) // 2
+
+        self.source_shape = source_shape
+        self.source_rect = (sx0, sy0, sx1, sy1)
+        self.target_rect = (pad_x, pad_y, pad_x + new_width, pad_y + new_height)
+        for buffer in self.buffers:
+            buffer[...] = _PAD_VALUE
+
+        # x_кадра = ((x_входа - pad) * rect_width / new_width + sx0) / sx
+        kx = rect_width / new_width / sx
+        ky = rect_height / new_height / sy
+        bx = sx0 / sx - pad_x * kx
+        by = sy0 / sy - pad_y * ky
+        self.scale = np.array([kx, ky, kx, ky])
+        self.offset = np.array([bx, by, bx, by])
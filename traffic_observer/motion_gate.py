@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+
+from traffic_observer.zone import Zone
+
+
+class MotionGate:
+    '''
+    Дешевая проверка движения перед инференсом: разность с предыдущим проверенным кадром
+    в уменьшенном сером изображении, только внутри полигонов секторов.
+    Без движения Detector не вызывает модель и оставляет треки на месте.
+    Не реже чем раз в max_skip проверок инференс выполняется принудительно
+    (медленное движение, изменение освещения).
+    '''
+
+    def __init__(
+            self,
+            zones: list[Zone],
+            frame_size: tuple[int, int],
+            pixel_threshold: int = 25,
+            max_skip: int = 25,
+            scale: float = 0.25,
+            min_area: float = 0.002
+    ):
+        width, height = frame_size
+        self.size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        self.pixel_threshold = pixel_threshold
+        self.max_skip = max_skip
+
+        mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(mask, [zone.polygon for zone in zones], 1)
+        self.mask = cv2.resize(mask, self.size, interpolation=cv2.INTER_NEAREST).astype(bool)
+        # Минимальное кол-во изменившихся пикселей внутри секторов (доля площади секторов)
+        self.min_pixels = max(1, int(self.mask.sum() * min_area))
+
+        self.previous = None
+        self.skipped_in_row = 0
+        self.frames_checked = 0
+        self.frames_skipped = 0
+
+    def has_motion(self, frame) -> bool:
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        previous, self.previous = self.previous, gray
+        self.frames_checked += 1
+
+        if previous is None or self.skipped_in_row >= self.max_skip:
+            motion = True
+        else:
+            changed = cv2.absdiff(gray, previous) > self.pixel_threshold
+            motion = np.count_nonzero(changed & self.mask) >= self.min_pixels
+
+        if motion:
+            self.skipped_in_row = 0
+        else:
+            self.skipped_in_row += 1
+            self.frames_skipped += 1
+        return motion
+
+    def skipped_share(self) -> float:
+        return self.frames_skipped / self.frames_checked if self.frames_checked else 0.0
+
+    def state(self) -> dict:
+        return {"previous": self.previous, "skipped_in_row": self.skipped_in_row}
+
+    def load_state(self, state: dict):
+        self.previous = state["previous"]
+        self.skipped_in_row = state["skipped_in_row"]
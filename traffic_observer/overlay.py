@@ -0,0 +1,26 @@
+import numpy as np
+
+
+class StaticOverlay:
+    '''
+    Статичный слой с полигонами регионов и полос.
+    Рисуется один раз под размер кадра и затем копируется на каждый кадр по маске.
+    '''
+
+    def __init__(self, sectors):
+        self.sectors = sectors
+        self.layer = None
+        self.mask = None
+
+    def apply(self, frame):
+        if self.layer is None or self.layer.shape != frame.shape:
+            self.__build(frame.shape, frame.dtype)
+        np.copyto(frame, self.layer, where=self.mask)
+
+    def __build(self, shape, dtype):
+        self.layer = np.zeros(shape, dtype=dtype)
+        for sector in self.sectors:
+            sector.start_region.draw_regions(self.layer)
+            for lane in sector.lanes:
+                lane.draw_lane(self.layer)
+        self.mask = self.layer.any(axis=2, keepdims=True)
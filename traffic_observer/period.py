@@ -1,9 +1,34 @@
+import numpy as np
+
+from traffic_observer.crossing_log import CrossingLog
+
+
 class Period:
-    def __init__(self, ids_travel_time, classwise_traveled_count, free_travel_time, observation_time):
-        # TODO: set type hints
-        self.ids_travel_time = ids_travel_time
-        self.classwise_traveled_count = classwise_traveled_count
-        self.free_travel_time = free_travel_time
-        
+    def __init__(self, crossings: CrossingLog, start_index: int, end_index: int, observation_time):
+        # Период - диапазон записей [start_index, end_index) журнала проездов сектора
+        self.crossings = crossings
+        self.start_index = start_index
+        self.end_index = end_index
+
         # Нужно чтобы использовать время из таймера, так как могло пройти меньше времени, чем observation-time
-        self.observation_time = observation_time 
\ No newline at end of file
+        self.observation_time = observation_time
+
+    @property
+    def events(self) -> np.ndarray:
+        return self.crossings.view(self.start_index, self.end_index)
+
+    @property
+    def ids_travel_time(self) -> dict[int, float]:
+        events = self.events
+        return dict(zip(events["track_id"].tolist(), (events["end_time"] - events["start_time"]).tolist()))
+
+    @property
+    def free_travel_time(self) -> dict[int, float]:
+        events = self.events[self.events["free_flow"]]
+        return dict(zip(events["track_id"].tolist(), (events["end_time"] - events["start_time"]).tolist()))
+
+    @property
+    def classwise_traveled_count(self) -> dict[str, int]:
+        vehicle_classes = self.crossings.vehicle_classes
+        counts = np.bincount(self.events["class_index"], minlength=len(vehicle_classes))
+        return dict(zip(vehicle_classes, counts.tolist()))
@@ -0,0 +1,362 @@
+import queue
+import threading
+import time
+import logging
+import multiprocessing
+
+import cv2
+
+from data_loader.frame_ring import FrameRing, decode_to_ring
+from data_loader.video_loader import CaptureSource, LiveCapture, is_stream_url
+from traffic_observer.sector_manager import SectorManager
+
+# Интервал проверки флага остановки при блокирующих операциях с очередями
+_POLL_INTERVAL = 0.1
+
+
+def frame_timestamp(cap) -> float|None:
+    # Время захвата последнего прочитанного кадра; есть только у живого потока (LiveCapture)
+    return getattr(cap, "frame_timestamp", None)
+
+
+def is_live(cap) -> bool:
+    # Живой поток, в том числе обернутый (LimitedCapture в бенчмарках)
+    return isinstance(cap, LiveCapture) or isinstance(getattr(cap, "cap", None), LiveCapture)
+
+
+def update_frames(sector_manager: SectorManager, frames: list, decoded_at: list[float], timestamps: list[float|None]):
+    '''
+    Обработка накопленных кадров: один кадр - SectorManager.update, несколько - пакетная детекция.
+    Задержка кадра (от декодирования до окончания учета) пишется в стадию "latency".
+    '''
+
+    if len(frames) == 1:
+        sector_manager.update(frames[0], timestamps[0])
+    else:
+        sector_manager.update_batch(frames, timestamps)
+    done = time.perf_counter()
+    for decoded in decoded_at:
+        sector_manager.profiler.add("latency", done - decoded)
+
+
+def run_serial(
+        cap,
+        sector_manager: SectorManager,
+        output,
+        frame_size: tuple[int, int]|None,
+        show: bool = True,
+        batch_size: int = 1
+) -> int:
+    '''
+    Последовательная обработка: декодирование, инференс и запись в одном потоке.
+    frame_size=None - кадры не масштабируются (single-resize: Detector масштабирует их сразу во вход модели).
+    '''
+
+    profiler = sector_manager.profiler
+    frames = 0
+    batch, decoded_at, timestamps = [], [], []
+    stopped = False
+    while not stopped:
+        ret = False
+        if cap.isOpened():
+            with profiler.stage("decode"):
+                ret, frame = cap.read()
+        if ret:
+            if frame_size is not None and frame.shape[1::-1] != frame_size:
+                with profiler.stage("resize"):
+                    frame = cv2.resize(frame, frame_size)
+            batch.append(frame)
+            decoded_at.append(time.perf_counter())
+            timestamps.append(frame_timestamp(cap))
+            if len(batch) < batch_size:
+                continue
+        if not batch:
+            break
+
+        update_frames(sector_manager, batch, decoded_at, timestamps)
+        frames += len(batch)
+
+        for frame in batch:
+            if output is not None:
+                with profiler.stage("encode"):
+                    output.write(frame)
+            if show:
+                # Показ текущего кадра
+                with profiler.stage("display"):
+                    cv2.imshow("frame", frame)
+                    key = cv2.waitKey(1)
+                if key & 0xFF == ord('q'):
+                    stopped = True
+                    break
+        batch, decoded_at, timestamps = [], [], []
+        stopped = stopped or not ret
+
+    return frames
+
+
+def run_replay(sector_manager: SectorManager, batch_size: int = 1) -> int:
+    ''' Повторный анализ по кэшу детекций (CachedDetector): без декодирования, инференса и отрисовки '''
+
+    detector = sector_manager.detector
+    frames = 0
+    # При продолжении с контрольной точки детектор уже стоит на ее кадре
+    remaining = detector.cache.frames - detector.frame_index
+    while frames < remaining:
+        count = min(batch_size, remaining - frames)
+        if count == 1:
+            sector_manager.update(None)
+        else:
+            sector_manager.update_batch([None] * count)
+        frames += count
+    return frames
+
+
+class FramePipeline:
+    '''
+    Конвейерная обработка видео в три стадии:
+    декодер -> инференс и геометрия (SectorManager) и показ -> запись.
+    Показ (cv2.imshow/waitKey) выполняется в основном потоке: HighGUI не потокобезопасен.
+    Стадии связаны ограниченными очередями FIFO, поэтому порядок кадров
+    сохраняется, а SectorManager.update (и StepTimer) вызывается ровно
+    один раз на кадр в исходной последовательности.
+    При batch_size > 1 стадия инференса набирает до batch_size кадров из очереди
+    и обрабатывает их одним пакетом (SectorManager.update_batch).
+    Живой поток читается прямо в стадии инференса, без потока декодера и очереди:
+    иначе в очереди копились бы устаревшие кадры, а LiveCapture и так отдает самый свежий.
+    '''
+
+    def __init__(
+            self,
+            cap,
+            sector_manager: SectorManager,
+            output,
+            frame_size: tuple[int, int]|None,
+            queue_size: int = 8,
+            show: bool = True,
+            batch_size: int = 1
+    ):
+        self.cap = cap
+        self.sector_manager = sector_manager
+        self.output = output
+        self.frame_size = frame_size
+        self.queue_size = queue_size
+        self.show = show
+        self.batch_size = max(1, batch_size)
+        self.live = is_live(cap)
+        self.frames_processed = 0
+
+        self.__stop = threading.Event()
+        self.__errors: list[BaseException] = []
+
+    def run(self) -> int:
+        decoded = queue.Queue(maxsize=self.queue_size)
+        annotated = queue.Queue(maxsize=self.queue_size)
+
+        decoder = threading.Thread(target=self.__guard, args=(self.__decode, decoded), name="decoder", daemon=True)
+        encoder = threading.Thread(target=self.__guard, args=(self.__encode, annotated), name="encoder", daemon=True)
+        if not self.live:
+            decoder.start()
+        encoder.start()
+
+        try:
+            finished = False
+            while not finished and not self.__stop.is_set():
+                batch, decoded_at, timestamps = [], [], []
+                while len(batch) < self.batch_size:
+                    item = self.__read() if self.live else self.__get(decoded)
+                    if item is None:
+                        finished = True
+                        break
+                    frame, decoded_time, timestamp = item
+                    batch.append(frame)
+                    decoded_at.append(decoded_time)
+                    timestamps.append(timestamp)
+                if not batch:
+                    break
+
+                update_frames(self.sector_manager, batch, decoded_at, timestamps)
+                self.frames_processed += len(batch)
+                if self.show:
+                    self.__display(batch)
+                if self.output is not None and not all(self.__put(annotated, frame) for frame in batch):
+                    break
+        finally:
+            # Конец потока для стадии записи; декодер останавливается по флагу
+            while encoder.is_alive():
+                try:
+                    annotated.put(None, timeout=_POLL_INTERVAL)
+                    break
+                except queue.Full:
+                    continue
+            encoder.join()
+            self.__stop.set()
+            if decoder.is_alive():
+                decoder.join()
+
+        if self.__errors:
+            raise self.__errors[0]
+        return self.frames_processed
+
+    def __decode(self, decoded: queue.Queue):
+        while not self.__stop.is_set():
+            item = self.__read()
+            if item is None:
+                break
+            if not self.__put(decoded, item):
+                return
+        self.__put(decoded, None)
+
+    def __read(self):
+        # Следующий кадр (кадр, момент декодирования, время захвата); None - конец видео
+        if not self.cap.isOpened():
+            return None
+        profiler = self.sector_manager.profiler
+        with profiler.stage("decode"):
+            ret, frame = self.cap.read()
+        if not ret:
+            return None
+        timestamp = frame_timestamp(self.cap)
+        if self.frame_size is not None and frame.shape[1::-1] != self.frame_size:
+            with profiler.stage("resize"):
+                frame = cv2.resize(frame, self.frame_size)
+        return frame, time.perf_counter(), timestamp
+
+    def __encode(self, annotated: queue.Queue):
+        profiler = self.sector_manager.profiler
+        while True:
+            frame = annotated.get()
+            if frame is None:
+                break
+
+            if self.output is not None:
+                with profiler.stage("encode"):
+                    self.output.write(frame)
+
+    def __display(self, frames: list):
+        # Показ кадров пакета в основном потоке; 'q' останавливает все стадии
+        profiler = self.sector_manager.profiler
+        for frame in frames:
+            with profiler.stage("display"):
+                cv2.imshow("frame", frame)
+                key = cv2.waitKey(1)
+            if key & 0xFF == ord('q'):
+                self.__stop.set()
+                return
+
+    def __guard(self, stage, stage_queue: queue.Queue):
+        try:
+            stage(stage_queue)
+        except BaseException as e:
+            logging.exception(f"Ошибка в стадии {threading.current_thread().name}")
+            self.__errors.append(e)
+            self.__stop.set()
+
+    def __put(self, stage_queue: queue.Queue, item) -> bool:
+        # Блокирующая запись, прерываемая флагом остановки
+        while not self.__stop.is_set():
+            try:
+                stage_queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __get(self, stage_queue: queue.Queue):
+        while not self.__stop.is_set():
+            try:
+                return stage_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return None
+
+
+class SharedMemoryPipeline:
+    '''
+    Декодирование в отдельном процессе: декодер пишет кадры в кольцевой буфер в общей памяти (FrameRing),
+    процесс обработки читает их как представления NumPy без копирования и сериализации.
+    Декодер ждет свободный слот, если обработка отстает; слот освобождается после учета, записи и показа кадра.
+    Кадры в буфере имеют размер frame_size (масштабирование - в процессе декодера).
+    Для живого потока слотов ровно batch_size: декодер читает кадр только когда слот освободился,
+    поэтому обработка получает самый свежий кадр, а не накопленные в буфере.
+    '''
+
+    def __init__(
+            self,
+            source: CaptureSource,
+            sector_manager: SectorManager,
+            output,
+            frame_size: tuple[int, int],
+            start_frame: int = 0,
+            slots: int = 8,
+            show: bool = True,
+            batch_size: int = 1,
+            max_frames: int|None = None
+    ):
+        self.source = source
+        self.sector_manager = sector_manager
+        self.output = output
+        self.frame_size = frame_size
+        self.start_frame = start_frame
+        self.batch_size = max(1, batch_size)
+        if is_stream_url(source.video_path):
+            self.slots = self.batch_size
+        else:
+            # Пакет целиком находится в буфере, пока обрабатывается, и еще хотя бы один слот - у декодера
+            self.slots = max(slots, self.batch_size + 1)
+        self.show = show
+        self.max_frames = max_frames
+        self.frames_processed = 0
+
+    def run(self) -> int:
+        width, height = self.frame_size
+        context = multiprocessing.get_context("spawn")
+        ring = FrameRing(self.slots, (height, width, 3), context)
+        decoder = context.Process(
+            target=decode_to_ring, args=(ring, self.source, self.start_frame, self.max_frames), name="decoder", daemon=True
+        )
+        decoder.start()
+
+        profiler = self.sector_manager.profiler
+        stopped = False
+        try:
+            finished = False
+            while not finished and not stopped:
+                batch, decoded_at, timestamps = [], [], []
+                while len(batch) < self.batch_size:
+                    # Ожидание кадра от процесса декодера
+                    with profiler.stage("decode"):
+                        item = ring.get(decoder)
+                    if item is None:
+                        finished = True
+                        break
+                    frame, timestamp, decoded_time = item
+                    batch.append(frame)
+                    decoded_at.append(decoded_time)
+                    timestamps.append(timestamp)
+                if not batch:
+                    break
+
+                update_frames(self.sector_manager, batch, decoded_at, timestamps)
+                self.frames_processed += len(batch)
+                for frame in batch:
+                    if self.output is not None:
+                        # H264Writer пишет кадр в своем потоке уже после возврата слота декодеру
+                        with profiler.stage("encode"):
+                            self.output.write(frame.copy())
+                    if self.show:
+                        # Показ текущего кадра
+                        with profiler.stage("display"):
+                            cv2.imshow("frame", frame)
+                            key = cv2.waitKey(1)
+                        if key & 0xFF == ord('q'):
+                            stopped = True
+                            break
+                batch = []
+                ring.release(len(decoded_at))
+        finally:
+            ring.close()
+            decoder.join()
+
+        if decoder.exitcode != 0 and not stopped:
+            raise RuntimeError(f"Процесс декодера завершился с кодом {decoder.exitcode}")
+        return self.frames_processed
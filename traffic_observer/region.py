@@ -1,25 +1,34 @@
 import cv2
-import numpy as np
 
-def is_inside_zone(center, zone):
-    return cv2.pointPolygonTest(np.array(zone, dtype=np.int32), center, False) >= 0
-
-class VehicleID:
-    def __init__(self, class_name: str, bb):
-        self.track_class = class_name
-        self.bb = bb
+from traffic_observer.zone import Zone
+from traffic_observer.track_table import TrackTable, VehicleID
 
 class Region:
-    def __init__(self, points):
+    def __init__(self, points, ttl_frames: int):
         self.points = points
-        self.counted_ids: dict[int, VehicleID] = {}
+        self.zone = Zone(points)
+        self.counted_ids = TrackTable(ttl_frames)
+        # Треки, впервые попавшие в регион на последнем кадре
+        self.new_ids: list[int] = []
 
-    def count_tracklet(self, box, track_id, track_class):
+    def count_tracklet(self, box, track_id, track_class, frame_index: int = 0):
         bbox_center = int((box[0] + box[2]) / 2), int((box[1] + box[3]) / 2)
         crossed_before = track_id in self.counted_ids
 
-        if not crossed_before and is_inside_zone(bbox_center, self.points):
-            self.counted_ids[track_id] = VehicleID(track_class, box)
+        if not crossed_before and self.zone.contains(bbox_center):
+            self.counted_ids.add(track_id, track_class, box, frame_index)
+            self.new_ids.append(track_id)
+
+    def count_inside(self, inside, boxes, track_ids, track_classes, frame_index: int):
+        # inside: результат Zone.contains_many для центров всех боксов кадра.
+        # Уже известные треки обновляются (бокс, класс, кадр) независимо от положения
+        self.new_ids = []
+        for i, track_id in enumerate(track_ids):
+            if self.counted_ids.touch(track_id, track_classes[i], boxes[i], frame_index):
+                continue
+            if inside[i]:
+                self.counted_ids.add(track_id, track_classes[i], boxes[i], frame_index)
+                self.new_ids.append(track_id)
             
     def draw_regions(self, im0):
         for i in range(len(self.points)):
@@ -1,34 +1,73 @@
 from typing import Sequence, List, Callable
+import math
+import os
+import time
 
 import pandas as pd
+import numpy as np
 import cv2
 import logging
 
 from funcs import *
 from traffic_observer.period import Period
+from traffic_observer.crossing_log import CrossingLog, CROSSING_DTYPE
 from traffic_observer.step_timer import StepTimer
 from traffic_observer.region import Region
 from traffic_observer.detector import Detector
 from traffic_observer.lane import Lane
+from traffic_observer.zone import ZoneIndex, box_centers, zones_bounding_rect
+from traffic_observer.overlay import StaticOverlay
+from traffic_observer.stage_profiler import StageProfiler
 
 from data_loader.data_sector import DataSector
 from ultralytics import YOLO
 from ultralytics.utils.plotting import Annotator
 
 class Sector:
-    def __init__(self, data_sector: DataSector, vehicle_classes):
-        self.start_region: Region = Region(data_sector.start_points)
+    def __init__(self, data_sector: DataSector, vehicle_classes, ttl_frames: int, spill_dir: str|None = None):
+        self.start_region: Region = Region(data_sector.start_points, ttl_frames)
         self.lanes: list[Lane] = [Lane(lane_points) for lane_points in data_sector.lanes_points]
         self.lanes_count: int = data_sector.lanes_count
         self.length: int = data_sector.sector_length
         self.max_speed: int = data_sector.max_speed
         self.periods_data: List[Period] = []
-        self.ids_travel_time = {}
-        self.ids_free_time = {}
-        self.classwise_traveled_count = {class_name: 0 for class_name in vehicle_classes}
+        # Завершенные проезды всех периодов; текущий период - записи начиная с period_start
+        spill_path = os.path.join(spill_dir, f"sector_{data_sector.id}.crossings") if spill_dir else None
+        self.crossings = CrossingLog(vehicle_classes, spill_path=spill_path)
+        self.period_start = 0
         self.ids_start_time = {}
         self.ids_blacklist = set()
 
+    def evict(self, frame_index: int):
+        # Треки, не появлявшиеся дольше TTL, удаляются из всех структур сектора
+        for vehicle_id in self.start_region.counted_ids.evict(frame_index):
+            self.ids_start_time.pop(vehicle_id, None)
+            self.ids_blacklist.discard(vehicle_id)
+            for lane in self.lanes:
+                lane.counted_ids.discard(vehicle_id)
+
+    def state(self) -> dict:
+        return {
+            "tracks": self.start_region.counted_ids.state(),
+            "lanes": [(lane.delay, set(lane.counted_ids)) for lane in self.lanes],
+            "crossings": np.array(self.crossings.view()),
+            "periods": [(period.start_index, period.end_index, period.observation_time) for period in self.periods_data],
+            "period_start": self.period_start,
+            "ids_start_time": dict(self.ids_start_time),
+            "ids_blacklist": set(self.ids_blacklist),
+        }
+
+    def load_state(self, state: dict):
+        self.start_region.counted_ids.load_state(state["tracks"])
+        for lane, (delay, counted_ids) in zip(self.lanes, state["lanes"]):
+            lane.delay = delay
+            lane.counted_ids = set(counted_ids)
+        self.crossings.extend(state["crossings"])
+        self.periods_data = [Period(self.crossings, *period) for period in state["periods"]]
+        self.period_start = state["period_start"]
+        self.ids_start_time = dict(state["ids_start_time"])
+        self.ids_blacklist = set(state["ids_blacklist"])
+
 class SectorManager:
     def __init__(
             self,
@@ -38,17 +77,74 @@ class SectorManager:
             observation_time: int,
             vechicle_size_coeffs: dict[str, float],
             imgsize: tuple,
-            model_path:str
+            model_path:str,
+            inference_stride: int = 1,
+            render: bool = True,
+            track_ttl: float = 30,
+            detector: Detector|None = None,
+            report_sink=None,
+            keep_periods: bool = True,
+            profiler: StageProfiler|None = None,
+            crossings_spill_dir: str|None = None,
+            roi_inference: bool = False,
+            checkpointer=None
     ):
         self.size_coeffs = vechicle_size_coeffs
         self.vehicle_classes = vehicle_classes
+        self.class_indices = {class_name: i for i, class_name in enumerate(vehicle_classes)}
         self.observation_period = observation_time
         self.period_timer = StepTimer(time_step)
-        model = YOLO(model_path)
-        self.class_names=model.names
-
-        self.detector = Detector(model, imgsize)
-        self.sectors = [Sector(data_sector, self.vehicle_classes) for data_sector in data_sectors]
+        self.frame_index = 0
+
+        # Приемник показателей закрытых периодов; без хранения периодов память не растет
+        self.report_sink = report_sink
+        self.keep_periods = keep_periods
+
+        # Замер стадий обработки кадра; сводка по интервалу или при закрытии периода
+        self.profiler = profiler if profiler is not None else StageProfiler()
+
+        # Периодическое сохранение состояния для продолжения обработки (--resume)
+        self.checkpointer = checkpointer
+
+        if detector is None:
+            detector = Detector(YOLO(model_path), imgsize, inference_stride)
+        self.detector = detector
+
+        # Время жизни трека без появления в кадре, в кадрах
+        ttl_frames = math.ceil(track_ttl / time_step)
+        if crossings_spill_dir:
+            os.makedirs(crossings_spill_dir, exist_ok=True)
+        self.sectors = [
+            Sector(data_sector, self.vehicle_classes, ttl_frames, crossings_spill_dir) for data_sector in data_sectors
+        ]
+
+        # Полигоны скомпилированы при создании секторов; здесь только списки для пакетной проверки
+        self.start_zones = [sector.start_region.zone for sector in self.sectors]
+        self.lane_zones = [lane.zone for sector in self.sectors for lane in sector.lanes]
+
+        # Сетка кандидатов: центр проверяется только в зонах, пересекающих его ячейку
+        index_frame_size = (imgsize[1], imgsize[0])
+        self.start_index = ZoneIndex(self.start_zones, index_frame_size)
+        self.lane_index = ZoneIndex(self.lane_zones, index_frame_size)
+        # Кол-во проверок точка-зона на последнем кадре
+        self.zone_tests = 0
+
+        # Инференс только в прямоугольнике, охватывающем все сектора
+        if roi_inference and self.sectors:
+            height, width = imgsize
+            roi = zones_bounding_rect(self.start_zones + self.lane_zones, (width, height))
+            self.detector.set_roi(roi)
+            logging.info(f"Инференс в области {roi} кадра {width}x{height}")
+
+        # В режиме без отрисовки (headless) кадры не аннотируются
+        self.render = render
+        self.overlay = StaticOverlay(self.sectors)
+        self.annotator = None
+
+    @property
+    def class_names(self) -> dict[int, str]:
+        # Имена классов берутся у детектора при первом использовании: без кадров модель не загружается
+        return self.detector.class_names
 
     def __annotate(self, im0, annotator, box, track_id, cls):
         annotator.box_label(box, "", color=(255, 0, 0))
@@ -62,7 +158,8 @@ class SectorManager:
         if track_id in sector.ids_start_time:
             color=(255, 0, 0)
             visited = "start"
-        if track_id in sector.ids_travel_time:
+        vehicle = sector.start_region.counted_ids.get(track_id)
+        if vehicle is not None and vehicle.travel_time is not None:
             color = (0, 150, 100)
             visited = "end"
         if visited is not None:
@@ -73,160 +170,253 @@ class SectorManager:
         annotator.box_label(box, label, color)
 
 
-    def update(self, frame: cv2.typing.MatLike):
-        boxes, track_ids, classes = self.detector.track(frame)
+    def __draw(self, frame, boxes, track_ids, classes):
+        # Полигоны берутся из кэшированного слоя, поверх рисуются задержки полос и боксы
+        self.overlay.apply(frame)
+        for sector in self.sectors:
+            for lane in sector.lanes:
+                lane.draw_delay(frame)
+
+        if self.annotator is None:
+            self.annotator = Annotator(frame, line_width=1, example=str(self.class_names))
+        # Annotator создается один раз и переключается на текущий кадр
+        self.annotator.im = frame
 
-        # Обработка детекций
-        annotator = Annotator(frame, line_width=1, example=str(self.class_names))
+        sector = self.sectors[-1]
         for box, track_id, track_class in zip(boxes, track_ids, classes):
-            for sector in self.sectors:
-                # TODO: make method for those
-                # TODO optimize: count tracket only for start regions
-                # if tracklet is not tracked in sector, then only in end region
-                sector.start_region.count_tracklet(box, track_id, track_class)
-                sector.start_region.draw_regions(frame)
-                for lane in sector.lanes:
-                    lane.draw_lane(frame)
-            
-            #self.__annotate(frame, annotator, box, track_id, track_class)
-            self.__annotate_debug(frame, annotator, box, track_id, track_class, sector, self.__get_vehicle_travel_time_debug)
- 
-        logging.info(f"Обработан кадр по времени {self.period_timer.time}")
+            #self.__annotate(frame, self.annotator, box, track_id, track_class)
+            self.__annotate_debug(frame, self.annotator, box, track_id, track_class, sector, self.__get_vehicle_travel_time_debug)
+
+    def update(self, frame: cv2.typing.MatLike, timestamp: float|None = None):
+        # timestamp - время захвата кадра (живой поток); без него таймер идет шагом 1/fps
+        with self.profiler.stage("track"):
+            detections = self.detector.track(frame)
+        self.__process(frame, detections, timestamp)
+        if self.checkpointer is not None:
+            self.checkpointer.on_frames(self)
+
+    def update_batch(self, frames: list[cv2.typing.MatLike], timestamps: list[float|None]|None = None):
+        # Пакетная детекция нескольких кадров, затем учет по каждому кадру в исходном порядке
+        if not frames:
+            return
+        if timestamps is None:
+            timestamps = [None] * len(frames)
+        start = time.perf_counter()
+        batch_detections = self.detector.track_batch(frames)
+        frame_seconds = (time.perf_counter() - start) / len(frames)
+        for frame, detections, timestamp in zip(frames, batch_detections, timestamps):
+            self.profiler.add("track", frame_seconds)
+            self.__process(frame, detections, timestamp)
+        # Сохранение только после всего пакета: детектор уже обработал все его кадры
+        if self.checkpointer is not None:
+            self.checkpointer.on_frames(self)
+
+    def __process(self, frame: cv2.typing.MatLike, detections, timestamp: float|None = None):
+        profiler = self.profiler
+
+        if detections is None:
+            detections = np.empty((0, 4), dtype=np.float32), [], []
+        boxes, track_ids, classes = detections
+
+        # Проверка всех центров боксов во всех стартовых регионах и полосах за один вызов
+        with profiler.stage("geometry"):
+            centers = box_centers(boxes)
+            start_inside = self.start_index.classify(centers)
+            lanes_inside = self.lane_index.classify(centers)
+        self.zone_tests = self.start_index.tests + self.lane_index.tests
+        profiler.count("zone_tests", self.zone_tests)
+
+        with profiler.stage("regions"):
+            for sector, inside in zip(self.sectors, start_inside):
+                sector.start_region.count_inside(inside, boxes, track_ids, classes, self.frame_index)
+
+        # Обработка детекций
+        if self.render:
+            with profiler.stage("annotation"):
+                self.__draw(frame, boxes, track_ids, classes)
 
         # Обновление таймера и периода
-        self.period_timer.step_forward()
+        if timestamp is None:
+            self.period_timer.step_forward()
+        else:
+            self.period_timer.step_to(timestamp)
         if self.period_timer.time >= self.observation_period:
             self.new_period()
 
-        # Итерация по секторам и регионам
-        self.__iterate_through_regions()
+        with profiler.stage("sectors"):
+            # Итерация по секторам и регионам
+            self.__iterate_through_regions()
 
-        # Обработка линий
-        self.__update_lanes(boxes, track_ids)
+            # Обработка линий
+            self.__update_lanes(lanes_inside, track_ids)
 
-        # Итерация по линиям
-        self.__iterate_through_lanes(classes, track_ids)
+            # Итерация по линиям
+            self.__iterate_through_lanes()
 
-        logging.info(f"Обновлены сектора по времени {self.period_timer.time}")
+            # Вытеснение давно не появлявшихся треков
+            for sector in self.sectors:
+                sector.evict(self.frame_index)
+        self.frame_index += 1
+        profiler.frame_done()
 
-    def __update_lanes(self, boxes, track_ids):
+    def __update_lanes(self, lanes_inside, track_ids):
         # Update delay and tracklet intersections for each line in each sector
         # Must be called after __iterate_through_regions as it relies on the data formed in it
+        lanes_hit = lanes_inside.any(axis=1)
+        lane_index = 0
         for sector in self.sectors:
             for lane in sector.lanes:
-                lane.delay += self.period_timer.step
-                for vehicle_id in sector.ids_start_time.keys():
-                    if vehicle_id in track_ids:
-                        lane.count_tracklet(boxes[track_ids.index(vehicle_id)], vehicle_id)
+                # Шаг, реально примененный таймером на этом кадре (с пропущенными кадрами живого потока)
+                lane.delay += self.period_timer.last_step
+                if lanes_hit[lane_index]:
+                    lane.count_inside(lanes_inside[lane_index], track_ids, sector.ids_start_time)
+                else:
+                    # На полосе нет ни одного центра: новых треков нет
+                    lane.new_ids = []
+                lane_index += 1
 
     def __iterate_through_regions(self):
         # Iterate through all sectors and regions to update travel times and vehicle tracking status
         for sector in self.sectors:
             start_counter = sector.start_region
 
-            for vehicle_id in start_counter.counted_ids:
+            for vehicle_id in start_counter.new_ids:
                 if vehicle_id not in sector.ids_start_time and vehicle_id not in sector.ids_blacklist:
                     sector.ids_start_time[vehicle_id] = self.period_timer.unresettable_time
         
-    def __iterate_through_lanes(self, classes, track_ids):
+    def __iterate_through_lanes(self):
         for sector in self.sectors:
             for lane in sector.lanes:
-                for vehicle_id in lane.counted_ids:
+                for vehicle_id in lane.new_ids:
                     if vehicle_id not in sector.ids_blacklist and vehicle_id in sector.ids_start_time:
-                        dt = self.period_timer.unresettable_time - sector.ids_start_time[vehicle_id]
-                        sector.ids_start_time.pop(vehicle_id)
+                        start_time = sector.ids_start_time.pop(vehicle_id)
+                        end_time = self.period_timer.unresettable_time
 
-                        sector.ids_travel_time[vehicle_id] = dt
-
-                        # Update free travel time
-                        if lane.delay < 10:
-                            sector.ids_free_time[vehicle_id] = dt
+                        # Free travel time
+                        free_flow = lane.delay < 10
                         lane.delay = 0
 
-                        track_class = classes[track_ids.index(vehicle_id)]
-                        class_name = self.class_names[track_class]
-                        sector.classwise_traveled_count[class_name] += 1
-                        sector.ids_blacklist.add(vehicle_id)         
+                        vehicle = sector.start_region.counted_ids.get(vehicle_id)
+                        vehicle.travel_time = end_time - start_time
+                        class_index = self.class_indices[self.class_names[vehicle.track_class]]
+                        sector.crossings.append(vehicle_id, class_index, start_time, end_time, free_flow)
+                        sector.ids_blacklist.add(vehicle_id)
 
     def new_period(self):
         # Reset the period timer and store the data for each sector
-        for sector in self.sectors:
-            sector.periods_data.append(Period(
-                sector.ids_travel_time.copy(),
-                sector.classwise_traveled_count.copy(),
-                sector.ids_free_time.copy(),
-                self.period_timer.time
-            ))
-
-            sector.ids_travel_time.clear()
-            sector.ids_free_time.copy()
-            sector.classwise_traveled_count = {class_name: 0 for class_name in self.vehicle_classes}
+        for sector_number, sector in enumerate(self.sectors, start=1):
+            period = Period(sector.crossings, sector.period_start, len(sector.crossings), self.period_timer.time)
+            sector.period_start = period.end_index
+            if self.keep_periods:
+                sector.periods_data.append(period)
+            if self.report_sink is not None:
+                row = self.period_traffic_stats(sector, period)
+                row.update(period.classwise_traveled_count)
+                self.report_sink.write(sector_number, row)
+            if not self.keep_periods:
+                # Период записан и больше не нужен: журнал начинается заново, его размер ограничен одним периодом
+                sector.crossings.clear()
+                sector.period_start = 0
         self.period_timer.reset()
 
-        for sector in self.sectors: # TODO: use another more frequently called method for long periods of time
-            sector.start_region.counted_ids.clear()
-            for lane in sector.lanes:
-                lane.counted_ids.clear()
-            
+        if self.profiler.report_interval <= 0:
+            self.profiler.log_summary()
+
+    def state(self) -> dict:
+        # Состояние после обработки frame_index кадров: продолжение с кадра frame_index дает тот же отчет
+        return {
+            "frame_index": self.frame_index,
+            "timer": (self.period_timer.time, self.period_timer.unresettable_time),
+            "sectors": [sector.state() for sector in self.sectors],
+            "detector": self.detector.state(),
+            "periods_written": dict(self.report_sink.periods_written) if self.report_sink is not None else None,
+        }
+
+    def load_state(self, state: dict):
+        self.frame_index = state["frame_index"]
+        self.period_timer.time, self.period_timer.unresettable_time = state["timer"]
+        for sector, sector_state in zip(self.sectors, state["sectors"]):
+            sector.load_state(sector_state)
+        self.detector.load_state(state["detector"])
+        if self.report_sink is not None and state["periods_written"] is not None:
+            # Периоды, записанные после контрольной точки, будут записаны заново
+            self.report_sink.truncate(state["periods_written"])
+
+    def __stats_columns(self, sectors_periods: list[tuple[Sector, List[Period]]]) -> dict[str, np.ndarray]:
+        # Все периоды всех секторов считаются одним векторным проходом по журналам проездов;
+        # группа - период сектора, периоды сектора идут подряд
+        events, groups, classwise_counts = [], [], []
+        observation_time, sector_length, lane_count = [], [], []
+        groups_count = 0
+        for sector, periods in sectors_periods:
+            if not periods:
+                continue
+            sector_events = sector.crossings.view(periods[0].start_index, periods[-1].end_index)
+            sector_groups = np.repeat(np.arange(len(periods)), [period.end_index - period.start_index for period in periods])
+            counts = np.bincount(
+                sector_groups * len(self.vehicle_classes) + sector_events["class_index"],
+                minlength=len(periods) * len(self.vehicle_classes)
+            )
+
+            events.append(sector_events)
+            groups.append(sector_groups + groups_count)
+            classwise_counts.append(counts.reshape(len(periods), len(self.vehicle_classes)))
+            observation_time.extend(period.observation_time for period in periods)
+            sector_length.extend([float(sector.length)] * len(periods))
+            lane_count.extend([sector.lanes_count] * len(periods))
+            groups_count += len(periods)
+
+        events = np.concatenate(events) if events else np.empty(0, dtype=CROSSING_DTYPE)
+        groups = np.concatenate(groups) if groups else np.empty(0, dtype=int)
+        classwise_counts = np.concatenate(classwise_counts) if classwise_counts else np.empty((0, len(self.vehicle_classes)))
+        observation_time = np.array(observation_time, dtype=float)
+
+        travel_times = events["end_time"] - events["start_time"]
+        free_flow = events["free_flow"]
+        size_coeffs = np.array([self.size_coeffs.get(class_name, 1) for class_name in self.vehicle_classes], dtype=float)
+
+        stats = traffic_stats_arrays(
+            classwise_counts.astype(float),
+            size_coeffs,
+            travel_times,
+            groups,
+            travel_times[free_flow],
+            groups[free_flow],
+            np.array(sector_length, dtype=float),
+            np.array(lane_count, dtype=float),
+            observation_time
+        )
+        return {
+            "Интенсивность траффика": stats["intensity"],
+            "Среднее время проезда сек": stats["travel_time"]*SECS_IN_HOUR,
+            "Средняя скорость движения км/ч": stats["speed"],
+            "Плотность траффика": stats["density"],
+            "Среднее своб. время сек": stats["free_time"]*SECS_IN_HOUR,
+            "Средняя задержка сек": stats["delay"]*SECS_IN_HOUR,
+            "Временной индекс": stats["time_index"],
+            "Время наблюдения сек": observation_time
+        }
+
+    def period_traffic_stats(self, sector: Sector, period: Period) -> dict[str, float]:
+        # Показатели трафика сектора за один закрытый период
+        columns = self.__stats_columns([(sector, [period])])
+        return {name: float(values[0]) for name, values in columns.items()}
+
     def traffic_stats(self) -> List[pd.DataFrame]:
+        columns = self.__stats_columns([(sector, sector.periods_data) for sector in self.sectors])
+
         dataframes = []
-        for sector in self.sectors:
-            stats = {
-                "Интенсивность траффика": [],
-                "Среднее время проезда сек": [],
-                "Средняя скорость движения км/ч": [],
-                "Плотность траффика": [],
-                "Среднее своб. время сек": [],
-                "Средняя задержка сек": [],
-                "Временной индекс": [],
-                "Время наблюдения сек": []
-            }
-            for period in sector.periods_data:
-                stats["Интенсивность траффика"].append(traffic_intensity(
-                    period.classwise_traveled_count,
-                    self.size_coeffs,
-                    period.observation_time
-                ))
-
-                vehicles_travel_time = period.ids_travel_time.values()
-                vehicles_free_time = period.free_travel_time.values()
-                stats["Среднее время проезда сек"].append(mean_travel_time(vehicles_travel_time)*SECS_IN_HOUR)
-                stats["Средняя скорость движения км/ч"].append(mean_vehicle_speed(vehicles_travel_time, sector.length))
-
-                stats["Плотность траффика"].append(traffic_density(
-                    period.classwise_traveled_count,
-                    self.size_coeffs,
-                    vehicles_travel_time,
-                    sector.length,
-                    period.observation_time,
-                    lane_count=sector.lanes_count
-                ))
-
-                stats["Среднее своб. время сек"].append(mean_free_time(
-                    vehicles_free_time
-                )*SECS_IN_HOUR)
-                stats["Средняя задержка сек"].append(mean_vehicle_delay(
-                    vehicles_travel_time,
-                    vehicles_free_time
-                )*SECS_IN_HOUR)
-                stats["Временной индекс"].append(time_index(
-                    vehicles_travel_time,
-                    vehicles_free_time
-                ))
-
-                stats["Время наблюдения сек"].append(period.observation_time)
-            dataframes.append(pd.DataFrame(stats))
+        bounds = np.cumsum([0] + [len(sector.periods_data) for sector in self.sectors])
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            dataframes.append(pd.DataFrame({name: values[first:last] for name, values in columns.items()}))
 
         return dataframes
 
     def classwise_stats(self) -> List[pd.DataFrame]:
         dataframes = []
         for sector in self.sectors:
-            stats = {class_name: [] for class_name in self.vehicle_classes}
-            for period in sector.periods_data:
-                for class_name in self.vehicle_classes:
-                    stats[class_name].append(period.classwise_traveled_count[class_name])
-            dataframes.append(pd.DataFrame(stats))
+            counts = [period.classwise_traveled_count for period in sector.periods_data]
+            dataframes.append(pd.DataFrame(counts, columns=list(self.vehicle_classes)))
 
         return dataframes
 
@@ -235,6 +425,7 @@ class SectorManager:
         for sector in self.sectors:
             if vehicle_id in sector.ids_start_time:
                 return self.period_timer.unresettable_time - sector.ids_start_time[vehicle_id]
-            elif vehicle_id in sector.ids_travel_time:
-                return sector.ids_travel_time[vehicle_id]
+            vehicle = sector.start_region.counted_ids.get(vehicle_id)
+            if vehicle is not None and vehicle.travel_time is not None:
+                return vehicle.travel_time
         return None
@@ -0,0 +1,96 @@
+import time
+import logging
+from collections import deque
+
+import numpy as np
+
+
+class StageTimer:
+    # Замеры одной стадии
+    __slots__ = ("samples",)
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+
+
+class StageMeasure:
+    # Один замер стадии: время начала свое у каждого вызова stage, поэтому одну стадию
+    # можно замерять вложенно и из нескольких потоков (deque.append потокобезопасен)
+    __slots__ = ("samples", "start")
+
+    def __init__(self, samples: deque):
+        self.samples = samples
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+
+
+class StageProfiler:
+    '''
+    Замер длительности стадий обработки кадра со скользящим окном последних window замеров.
+    На кадр приходится лишь пара вызовов perf_counter и append на стадию,
+    перцентили считаются только при выводе сводки.
+    Сводка пишется каждые report_interval секунд; при report_interval <= 0 - только по вызову
+    log_summary (SectorManager вызывает его при закрытии периода).
+    '''
+
+    def __init__(self, window: int = 1000, report_interval: float = 0):
+        self.window = window
+        self.report_interval = report_interval
+        self.stages: dict[str, StageTimer] = {}
+        # Счетчики на кадр (например, кол-во проверок точка-зона); в сводке - среднее на кадр
+        self.counters: dict[str, int] = {}
+
+        self.frames = 0
+        self.__last_report = time.perf_counter()
+        self.__last_report_frames = 0
+
+    def stage(self, name: str) -> StageMeasure:
+        return StageMeasure(self.__timer(name).samples)
+
+    def add(self, name: str, seconds: float):
+        self.__timer(name).samples.append(seconds)
+
+    def __timer(self, name: str) -> StageTimer:
+        timer = self.stages.get(name)
+        if timer is None:
+            timer = self.stages.setdefault(name, StageTimer(self.window))
+        return timer
+
+    def count(self, name: str, value: int):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def frame_done(self):
+        self.frames += 1
+        if self.report_interval > 0 and time.perf_counter() - self.__last_report >= self.report_interval:
+            self.log_summary()
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.__last_report
+        frames = self.frames - self.__last_report_frames
+        stages = {}
+        for name, timer in list(self.stages.items()):
+            samples = np.array(timer.samples)
+            if len(samples) == 0:
+                continue
+            p50, p95 = np.percentile(samples, [50, 95])
+            stages[name] = {"p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "max_ms": samples.max() * 1000}
+        counters = {name: total / frames if frames > 0 else 0.0 for name, total in self.counters.items()}
+        return {"fps": frames / elapsed if elapsed > 0 else 0.0, "frames": frames, "stages": stages, "counters": counters}
+
+    def log_summary(self):
+        summary = self.summary()
+        logging.info(f"Обработано {summary['frames']} кадров, {summary['fps']:.2f} FPS")
+        for name, stage in summary["stages"].items():
+            logging.info(f"    {name}: p50 {stage['p50_ms']:.2f} мс, p95 {stage['p95_ms']:.2f} мс, max {stage['max_ms']:.2f} мс")
+        for name, per_frame in summary["counters"].items():
+            logging.info(f"    {name}: {per_frame:.1f} на кадр")
+
+        self.__last_report = time.perf_counter()
+        self.__last_report_frames = self.frames
+        self.counters.clear()
@@ -8,10 +8,24 @@ class StepTimer:
         self.step = step
         self.time = start_time
         self.unresettable_time = start_time
+        self.last_timestamp = None
+        # Фактический шаг последнего кадра: номинальный или по меткам времени
+        self.last_step = step
 
-    def step_forward(self):
+    def step_forward(self) -> Secs:
         self.time += self.step
         self.unresettable_time += self.step
+        self.last_step = self.step
+        return self.step
+
+    def step_to(self, timestamp: Secs) -> Secs:
+        # Шаг по метке времени кадра (живой поток); первый кадр - номинальный шаг
+        step = self.step if self.last_timestamp is None else max(0.0, timestamp - self.last_timestamp)
+        self.last_timestamp = timestamp
+        self.time += step
+        self.unresettable_time += step
+        self.last_step = step
+        return step
 
     def reset(self, start_time: Secs = 0):
         self.time = start_time
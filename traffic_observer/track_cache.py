@@ -0,0 +1,186 @@
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+
+from traffic_observer.backends import file_hash
+
+# Сколько байт с начала и с конца видео входит в его отпечаток
+_FINGERPRINT_BYTES = 8 << 20
+
+_COUNTS_FILE = "counts.i4"
+_BOXES_FILE = "boxes.f4"
+_IDS_FILE = "ids.i8"
+_CLASSES_FILE = "classes.i2"
+_META_FILE = "meta.json"
+
+
+def video_fingerprint(video_path: str) -> str:
+    # Размер и первые/последние 8 МБ файла: быстро даже для многочасовых записей
+    digest = hashlib.sha256()
+    size = os.path.getsize(video_path)
+    digest.update(str(size).encode())
+    with open(video_path, "rb") as file:
+        digest.update(file.read(_FINGERPRINT_BYTES))
+        if size > _FINGERPRINT_BYTES:
+            file.seek(max(_FINGERPRINT_BYTES, size - _FINGERPRINT_BYTES))
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def model_fingerprint(model_path: str) -> str:
+    # Модель OpenVINO - каталог: хэш всех его файлов
+    if not os.path.isdir(model_path):
+        return file_hash(model_path)
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(model_path)):
+        for name in sorted(files):
+            digest.update(name.encode())
+            digest.update(file_hash(os.path.join(root, name)).encode())
+    return digest.hexdigest()
+
+
+def track_cache_dir(cache_root: str, video_path: str, model_path: str, params: dict) -> str:
+    '''
+    Каталог кэша треков видео: ключ - отпечатки видео и модели и параметры, от которых зависят
+    детекции (размер кадра, шаг инференса, бэкенд, область инференса).
+    '''
+    key = {"video": video_fingerprint(video_path), "model": model_fingerprint(model_path), **params}
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(cache_root, f"{name}_{digest}")
+
+
+def find_track_cache_dir(cache_root: str, video_path: str, params: dict) -> str:
+    '''
+    Поиск завершенного кэша без отпечатков (исходное видео или модель уже удалены):
+    по пути видео и параметрам, сохраненным в meta.json; из нескольких - самый свежий.
+    '''
+    found = []
+    if os.path.isdir(cache_root):
+        for name in os.listdir(cache_root):
+            meta_path = os.path.join(cache_root, name, _META_FILE)
+            if not os.path.exists(meta_path):
+                continue
+            with open(meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+            if meta.get("complete") and meta.get("video_path") == video_path and meta.get("params") == params:
+                found.append((os.path.getmtime(meta_path), os.path.join(cache_root, name)))
+    if not found:
+        raise FileNotFoundError(f"Кэш детекций для {video_path} с текущими параметрами не найден в {cache_root}")
+    return max(found)[1]
+
+
+class TrackCacheWriter:
+    '''
+    Запись результата Detector.track каждого кадра в плоские двоичные файлы:
+    кол-во треков на кадр, боксы (float32 x4), id (int64) и классы (int16) подряд.
+    meta.json с complete=true пишется только в close, поэтому оборванная запись не используется.
+    '''
+
+    def __init__(self, cache_dir: str, meta: dict):
+        self.cache_dir = cache_dir
+        self.meta = dict(meta)
+        self.frames = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        meta_path = os.path.join(cache_dir, _META_FILE)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        self.__files = {
+            name: open(os.path.join(cache_dir, name), "wb")
+            for name in (_COUNTS_FILE, _BOXES_FILE, _IDS_FILE, _CLASSES_FILE)
+        }
+        logging.info(f"Детекции записываются в кэш {cache_dir}")
+
+    def append(self, result):
+        if result is None:
+            self.__files[_COUNTS_FILE].write(np.int32(0).tobytes())
+        else:
+            boxes, track_ids, classes = result
+            self.__files[_COUNTS_FILE].write(np.int32(len(track_ids)).tobytes())
+            self.__files[_BOXES_FILE].write(np.asarray(boxes, dtype=np.float32).reshape(-1, 4).tobytes())
+            self.__files[_IDS_FILE].write(np.asarray(track_ids, dtype=np.int64).tobytes())
+            self.__files[_CLASSES_FILE].write(np.asarray(classes, dtype=np.int16).tobytes())
+        self.frames += 1
+
+    def close(self):
+        for file in self.__files.values():
+            file.close()
+        self.meta.update(frames=self.frames, complete=True)
+        with open(os.path.join(self.cache_dir, _META_FILE), "w", encoding="utf-8") as file:
+            json.dump(self.meta, file, ensure_ascii=False, indent=2)
+        logging.info(f"Кэш детекций сохранен: {self.frames} кадров в {self.cache_dir}")
+
+
+class TrackCache:
+    ''' Чтение кэша треков: файлы отображаются в память, кадр - срез по смещениям '''
+
+    def __init__(self, cache_dir: str):
+        meta_path = os.path.join(cache_dir, _META_FILE)
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Кэш детекций {cache_dir} не найден или не завершен; запустите track-cache = \"record\"")
+        with open(meta_path, "r", encoding="utf-8") as file:
+            self.meta = json.load(file)
+
+        self.cache_dir = cache_dir
+        self.frames = self.meta["frames"]
+        counts = np.fromfile(os.path.join(cache_dir, _COUNTS_FILE), dtype=np.int32)
+        self.offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        self.boxes = self.__map(_BOXES_FILE, np.float32).reshape(-1, 4)
+        self.ids = self.__map(_IDS_FILE, np.int64)
+        self.classes = self.__map(_CLASSES_FILE, np.int16)
+
+    def frame(self, index: int):
+        first, last = self.offsets[index], self.offsets[index + 1]
+        if first == last:
+            return None
+        return self.boxes[first:last], self.ids[first:last].tolist(), self.classes[first:last].tolist()
+
+    def __map(self, name: str, dtype) -> np.ndarray:
+        path = os.path.join(self.cache_dir, name)
+        # np.memmap не отображает пустые файлы
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+
+class CachedDetector:
+    '''
+    Замена Detector при повторном анализе: отдает записанные результаты track кадр за кадром,
+    без декодирования видео и инференса.
+    '''
+
+    def __init__(self, cache: TrackCache):
+        self.cache = cache
+        self.class_names = {int(key): name for key, name in cache.meta["class_names"].items()}
+        self.backend_name = "cache"
+        self.frame_index = 0
+
+    def set_roi(self, roi: tuple[int, int, int, int]):
+        # Область уже учтена при записи
+        pass
+
+    def warmup(self, frames: int = 3):
+        pass
+
+    def track(self, frame):
+        result = self.cache.frame(self.frame_index)
+        self.frame_index += 1
+        return result
+
+    def track_batch(self, frames: list) -> list:
+        return [self.track(frame) for frame in frames]
+
+    def log_stats(self):
+        logging.info(f"Воспроизведено {self.frame_index} кадров из кэша {self.cache.cache_dir}")
+
+    def close(self):
+        pass
+
+    def state(self) -> dict:
+        return {"frame_index": self.frame_index}
+
+    def load_state(self, state: dict):
+        self.frame_index = state["frame_index"]
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from typing import Iterator
+
+
+class VehicleID:
+    __slots__ = ("track_class", "bb", "last_seen", "travel_time")
+
+    def __init__(self, class_name: str, bb, last_seen: int = 0):
+        self.track_class = class_name
+        self.bb = bb
+        self.last_seen = last_seen
+        # Время проезда сектора, когда трек его завершил
+        self.travel_time = None
+
+
+class TrackTable:
+    '''
+    Состояние треков по id: класс, последний бокс и номер кадра, когда трек был виден.
+    Записи упорядочены по последнему появлению, поэтому вытеснение устаревших
+    треков (TTL в кадрах) стоит O(кол-во вытесненных), а поиск бокса и класса - O(1).
+    '''
+
+    def __init__(self, ttl_frames: int):
+        self.ttl_frames = ttl_frames
+        self.tracks: OrderedDict[int, VehicleID] = OrderedDict()
+
+    def __contains__(self, track_id) -> bool:
+        return track_id in self.tracks
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.tracks)
+
+    def get(self, track_id) -> VehicleID|None:
+        return self.tracks.get(track_id)
+
+    def add(self, track_id, track_class, box, frame_index: int):
+        self.tracks[track_id] = VehicleID(track_class, box, frame_index)
+        self.tracks.move_to_end(track_id)
+
+    def touch(self, track_id, track_class, box, frame_index: int) -> bool:
+        # Обновление известного трека; False, если трек в таблице отсутствует
+        vehicle = self.tracks.get(track_id)
+        if vehicle is None:
+            return False
+        vehicle.track_class = track_class
+        vehicle.bb = box
+        vehicle.last_seen = frame_index
+        self.tracks.move_to_end(track_id)
+        return True
+
+    def evict(self, frame_index: int) -> list[int]:
+        # Удаление треков, не появлявшихся дольше ttl_frames кадров
+        evicted = []
+        while self.tracks:
+            track_id, vehicle = next(iter(self.tracks.items()))
+            if frame_index - vehicle.last_seen <= self.ttl_frames:
+                break
+            self.tracks.popitem(last=False)
+            evicted.append(track_id)
+        return evicted
+
+    def clear(self):
+        self.tracks.clear()
+
+    def state(self) -> list[tuple]:
+        # Записи в порядке последнего появления, чтобы вытеснение после восстановления не изменилось
+        return [
+            (track_id, vehicle.track_class, vehicle.bb, vehicle.last_seen, vehicle.travel_time)
+            for track_id, vehicle in self.tracks.items()
+        ]
+
+    def load_state(self, state: list[tuple]):
+        self.tracks.clear()
+        for track_id, track_class, box, last_seen, travel_time in state:
+            self.add(track_id, track_class, box, last_seen)
+            self.tracks[track_id].travel_time = travel_time
@@ -0,0 +1,123 @@
+import cv2
+import numpy as np
+
+
+class Zone:
+    '''
+    Полигон, один раз растеризованный в маску по своему ограничивающему прямоугольнику.
+    Проверка точки сводится к индексации маски вместо cv2.pointPolygonTest на каждый вызов.
+    '''
+
+    def __init__(self, points):
+        self.points = points
+        self.polygon = np.array(points, dtype=np.int32)
+
+        self.x_min, self.y_min = self.polygon.min(axis=0)
+        x_max, y_max = self.polygon.max(axis=0)
+        mask = np.zeros((y_max - self.y_min + 1, x_max - self.x_min + 1), dtype=np.uint8)
+        polygon = self.polygon - (self.x_min, self.y_min)
+        cv2.fillPoly(mask, [polygon], 1)
+
+        # fillPoly растеризует наклонные ребра с точностью до пикселя: пиксели у границы
+        # уточняются pointPolygonTest, чтобы маска совпадала с pointPolygonTest(...) >= 0
+        edges = np.zeros_like(mask)
+        cv2.polylines(edges, [polygon], True, 1, thickness=3)
+        for y, x in zip(*np.nonzero(edges)):
+            mask[y, x] = cv2.pointPolygonTest(polygon, (float(x), float(y)), False) >= 0
+        self.mask = mask.astype(bool)
+
+    def contains(self, center) -> bool:
+        x, y = center[0] - self.x_min, center[1] - self.y_min
+        height, width = self.mask.shape
+        return 0 <= x < width and 0 <= y < height and bool(self.mask[y, x])
+
+    def contains_many(self, centers: np.ndarray) -> np.ndarray:
+        # centers: массив (N, 2) целочисленных координат x, y
+        height, width = self.mask.shape
+        xs = centers[:, 0] - self.x_min
+        ys = centers[:, 1] - self.y_min
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        inside[inside] = self.mask[ys[inside], xs[inside]]
+        return inside
+
+
+def box_centers(boxes) -> np.ndarray:
+    # Центры боксов xyxy, округленные так же, как int((x1 + x2) / 2)
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    centers = np.empty((len(boxes), 2), dtype=np.int32)
+    centers[:, 0] = (boxes[:, 0] + boxes[:, 2]) / 2
+    centers[:, 1] = (boxes[:, 1] + boxes[:, 3]) / 2
+    return centers
+
+
+def classify_centers(zones: list[Zone], centers: np.ndarray) -> np.ndarray:
+    ''' Принадлежность всех центров всем зонам: булев массив (кол-во зон, кол-во центров) '''
+
+    result = np.zeros((len(zones), len(centers)), dtype=bool)
+    for i, zone in enumerate(zones):
+        result[i] = zone.contains_many(centers)
+    return result
+
+
+class ZoneIndex:
+    '''
+    Пространственный индекс зон: сетка по кадру с ячейками cell_size x cell_size,
+    для каждой ячейки - зоны, маска которых ее пересекает. Строится один раз по маскам зон.
+    classify проверяет центр только в зонах его ячейки, tests - кол-во проверок точка-зона за последний вызов.
+    '''
+
+    def __init__(self, zones: list[Zone], frame_size: tuple[int, int], cell_size: int = 64):
+        self.zones = zones
+        self.width, self.height = frame_size
+        self.cell_size = cell_size
+        self.columns = (self.width + cell_size - 1) // cell_size
+        rows = (self.height + cell_size - 1) // cell_size
+        self.tests = 0
+
+        # cell_zones[ячейка, зона] - зона может содержать точки ячейки
+        self.cell_zones = np.zeros((rows * self.columns, len(zones)), dtype=bool)
+        for i, zone in enumerate(zones):
+            ys, xs = np.nonzero(zone.mask)
+            xs = xs + zone.x_min
+            ys = ys + zone.y_min
+            in_frame = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+            cells = ys[in_frame] // cell_size * self.columns + xs[in_frame] // cell_size
+            self.cell_zones[np.unique(cells), i] = True
+
+    def classify(self, centers: np.ndarray) -> np.ndarray:
+        ''' То же, что classify_centers(zones, centers), но только по зонам-кандидатам из ячеек центров '''
+
+        result = np.zeros((len(self.zones), len(centers)), dtype=bool)
+        xs, ys = centers[:, 0], centers[:, 1]
+        in_frame = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        candidates = np.zeros_like(result)
+        cells = ys[in_frame] // self.cell_size * self.columns + xs[in_frame] // self.cell_size
+        candidates[:, in_frame] = self.cell_zones[cells].T
+
+        for i in np.flatnonzero(candidates.any(axis=1)):
+            subset = np.flatnonzero(candidates[i])
+            result[i, subset] = self.zones[i].contains_many(centers[subset])
+        self.tests = int(candidates.sum())
+        return result
+
+
+def zones_bounding_rect(zones: list[Zone], frame_size: tuple[int, int], multiple: int = 32) -> tuple[int, int, int, int]:
+    '''
+    Ограничивающий прямоугольник всех зон (x0, y0, x1, y1), стороны которого
+    по возможности кратны multiple; прямоугольник расширяется, не выходя за кадр.
+    '''
+
+    width, height = frame_size
+    x0 = max(0, min(int(zone.x_min) for zone in zones))
+    y0 = max(0, min(int(zone.y_min) for zone in zones))
+    x1 = min(width, max(int(zone.x_min) + zone.mask.shape[1] for zone in zones))
+    y1 = min(height, max(int(zone.y_min) + zone.mask.shape[0] for zone in zones))
+
+    def align(start, end, limit):
+        size = min(limit, (end - start + multiple - 1) // multiple * multiple)
+        start = max(0, min(start, limit - size))
+        return start, start + size
+
+    x0, x1 = align(x0, x1, width)
+    y0, y1 = align(y0, y1, height)
+    return x0, y0, x1, y1